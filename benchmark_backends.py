@@ -0,0 +1,86 @@
+import argparse
+import os
+from time import perf_counter
+
+import cv2
+import numpy as np
+
+from inference_backends import BACKENDS, calibration_images, load_backend
+from pose_processing import MIN_DRAW_CONFIDENCE, extract_poses, select_largest
+
+
+def load_frames(source, max_frames):
+    """Reads frames from a video file or a folder of images."""
+    frames = []
+    if os.path.isdir(source):
+        for path in calibration_images(source)[:max_frames]:
+            frame = cv2.imread(path)
+            if frame is not None:
+                frames.append(frame)
+        return frames
+
+    capture = cv2.VideoCapture(source)
+    while len(frames) < max_frames:
+        ok, frame = capture.read()
+        if not ok:
+            break
+        frames.append(frame)
+    capture.release()
+    return frames
+
+
+def run_backend(backend, frames):
+    """Returns (fps, largest-person keypoints per frame) for one backend."""
+    keypoints = []
+    start = perf_counter()
+    for frame in frames:
+        pose_frame = extract_poses(backend.predict(frame, verbose=False))
+        keypoints.append(None if pose_frame is None else pose_frame.keypoints[select_largest(pose_frame)])
+    elapsed = perf_counter() - start
+    return len(frames) / elapsed, keypoints
+
+
+def keypoint_error(baseline, candidate):
+    """Mean pixel distance over keypoints both models are confident in, and detection agreement rate."""
+    distances = []
+    agreed = 0
+    for base, cand in zip(baseline, candidate):
+        if (base is None) == (cand is None):
+            agreed += 1
+        if base is None or cand is None:
+            continue
+        visible = (base[:, 2] > MIN_DRAW_CONFIDENCE) & (cand[:, 2] > MIN_DRAW_CONFIDENCE)
+        if visible.any():
+            distances.append(np.linalg.norm(base[visible, :2] - cand[visible, :2], axis=1).mean())
+    mean_distance = float(np.mean(distances)) if distances else float("nan")
+    return mean_distance, agreed / max(len(baseline), 1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare fps and keypoint accuracy of the inference backends against PyTorch.")
+    parser.add_argument("source", help="video file or folder of frames to benchmark on")
+    parser.add_argument("--weights", default="yolo11n-pose.pt")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--calibration", default=None, help="folder of frames for INT8 calibration, enables INT8 variants")
+    args = parser.parse_args()
+
+    frames = load_frames(args.source, args.frames)
+    if not frames:
+        raise SystemExit(f"No frames could be read from {args.source}")
+    print(f"Benchmarking on {len(frames)} frames at imgsz={args.imgsz}")
+
+    variants = [(name, False) for name in BACKENDS]
+    if args.calibration:
+        variants += [("onnx", True), ("openvino", True)]
+
+    baseline = None
+    print(f"{'backend':<16}{'fps':>8}{'kpt err px':>12}{'det agree':>11}")
+    for name, int8 in variants:
+        backend = load_backend(name, args.weights, args.imgsz, int8=int8, calibration_dir=args.calibration)
+        fps, keypoints = run_backend(backend, frames)
+        if baseline is None:
+            baseline = keypoints
+        error, agreement = keypoint_error(baseline, keypoints)
+        label = f"{name}-int8" if int8 else name
+        print(f"{label:<16}{fps:>8.1f}{error:>12.2f}{agreement:>10.0%}")
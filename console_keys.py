@@ -0,0 +1,52 @@
+import os
+import sys
+
+if os.name == "nt":
+    import msvcrt
+    from time import monotonic, sleep
+else:
+    import select
+    import termios
+    import tty
+
+ESC = "\x1b"
+
+
+class ConsoleKeyReader:
+    """
+    Reads single key presses from the terminal without waiting for Enter, so
+    ESC can stop the drone when there is no OpenCV window to catch it.
+    Use as a context manager; the terminal mode is restored on exit.
+    """
+    def __init__(self):
+        self.available = sys.stdin is not None and sys.stdin.isatty()
+        self.__saved_mode = None
+
+    def __enter__(self):
+        if self.available and os.name != "nt":
+            self.__saved_mode = termios.tcgetattr(sys.stdin)
+            tty.setcbreak(sys.stdin.fileno())
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.__saved_mode is not None:
+            termios.tcsetattr(sys.stdin, termios.TCSADRAIN, self.__saved_mode)
+            self.__saved_mode = None
+
+    def read_key(self, timeout):
+        """Returns the next key pressed within timeout seconds, or None."""
+        if not self.available:
+            return None
+
+        if os.name == "nt":
+            deadline = monotonic() + timeout
+            while monotonic() < deadline:
+                if msvcrt.kbhit():
+                    return msvcrt.getwch()
+                sleep(0.05)
+            return None
+
+        ready, _, _ = select.select([sys.stdin], [], [], timeout)
+        if ready:
+            return sys.stdin.read(1)
+        return None
@@ -0,0 +1,193 @@
+import copy
+from time import monotonic, sleep
+from types import SimpleNamespace
+
+from latency_trace import LatencyHistogram
+from pose_processing import extract_poses, select_largest
+from target_lock import TargetLock
+
+# Ultralytics' bytetrack.yaml defaults, spelled out so the tracker is built from its public export alone
+BYTETRACK_SETTINGS = {
+    "tracker_type": "bytetrack",
+    "track_high_thresh": 0.25,
+    "track_low_thresh": 0.1,
+    "new_track_thresh": 0.25,
+    "track_buffer": 30,
+    "match_thresh": 0.8,
+    "fuse_score": True,
+}
+
+
+class CommandFanout:
+    """
+    Stands in for command_queue in fleet mode: spoken commands go to every
+    drone's own queue. Each drone gets a copy because command_thread adds its
+    Tello to the params.
+    """
+    def __init__(self, queues):
+        self.queues = queues
+
+    def put(self, command):
+        for command_queue in self.queues:
+            command_queue.put(copy.deepcopy(command))
+
+
+class StreamTracker:
+    """
+    ByteTrack for one drone's stream. Batched predict() calls do not track,
+    and model.track() keeps one tracker per batch position, so each stream
+    runs its own tracker over its predict results instead.
+    """
+    def __init__(self, settings=None, frame_rate=30):
+        from ultralytics.trackers import BYTETracker
+
+        settings = {**BYTETRACK_SETTINGS, **(settings or {})}
+        # track_buffer is in frames at 30 fps; scaled here since newer BYTETracker versions take no frame rate
+        settings["track_buffer"] = int(frame_rate / 30 * settings["track_buffer"])
+        self.__tracker = BYTETracker(SimpleNamespace(**settings))
+
+    def update(self, result):
+        """Returns a PoseFrame with track IDs for one predict() result, or None if nobody is tracked."""
+        import torch
+
+        tracks = self.__tracker.update(result.boxes.cpu().numpy(), result.orig_img)
+        if len(tracks) == 0:
+            return None
+        # as Ultralytics' own track callback: keep tracked detections and swap in boxes carrying the IDs
+        result = result[tracks[:, -1].astype(int)]
+        result.update(boxes=torch.as_tensor(tracks[:, :-1]))
+        return extract_poses([result])
+
+
+class FleetStream:
+    """
+    The inference side of one fleet drone: where its frames come from and its results go.
+    is_following says whether the drone is in follow mode, where its target lock applies.
+    """
+    def __init__(self, name, frame_slot, result_slot, stats, is_following):
+        self.name = name
+        self.is_following = is_following
+        self.frame_slot = frame_slot
+        self.result_slot = result_slot
+        self.stats = stats
+        self.tracker = StreamTracker()
+        self.target_lock = TargetLock()
+        self.last_seq = 0
+
+        self.inferred = 0
+        self.budget_misses = 0
+        self.batch_wait = LatencyHistogram()
+
+
+class BatchScheduler:
+    """
+    Runs one model for every drone, batching the newest frame of each stream
+    into a single predict() call.
+
+    A batch is sent as soon as every stream has a new frame, or when waiting
+    any longer for the others would push its oldest frame past budget_ms given
+    the measured inference time for the next batch size. Frames that finish
+    over budget are still delivered and counted per drone.
+    """
+    def __init__(self, model, budget_ms=150, imgsz=None, max_batch=None, poll_interval=0.002):
+        self.model = model
+        self.budget_ms = budget_ms
+        self.imgsz = imgsz
+        self.max_batch = max_batch
+        self.poll_interval = poll_interval
+        self.streams = []
+        self.__batch_ms = {}  # batch size -> EWMA inference time
+        self.__first_stream = 0
+
+        self.batches = 0
+        self.batched_frames = 0
+
+    def add_stream(self, stream):
+        self.streams.append(stream)
+
+    def run(self, stop_event):
+        print(f"Batch scheduler started for {len(self.streams)} streams, budget {self.budget_ms} ms")
+        while not stop_event.is_set():
+            batch = self.__collect(stop_event)
+            if batch:
+                self.__infer(batch)
+        print("Batch scheduler finished")
+
+    def expected_ms(self, size):
+        """Estimated inference time for a batch of this size, extrapolated from the closest smaller measured size."""
+        if size in self.__batch_ms:
+            return self.__batch_ms[size]
+        smaller = [n for n in self.__batch_ms if n < size]
+        if not smaller:
+            return 0.0
+        known = max(smaller)
+        return self.__batch_ms[known] * size / known
+
+    def summary(self):
+        sizes = " ".join(f"{size}:{ms:.1f}ms" for size, ms in sorted(self.__batch_ms.items()))
+        mean_batch = self.batched_frames / self.batches if self.batches else 0
+        return f"{self.batches} batches, mean size {mean_batch:.2f}, inference by size {sizes or 'n/a'}"
+
+    def stream_summary(self, stream):
+        wait = stream.batch_wait
+        return (f"{stream.inferred} inferred, {stream.budget_misses} over budget, "
+                f"batch wait p50={wait.percentile(0.5):.1f} p95={wait.percentile(0.95):.1f}ms")
+
+    def __collect(self, stop_event):
+        """Takes the newest frame of each stream until the batch is full or its deadline comes."""
+        max_batch = self.max_batch or len(self.streams)
+        # start from a different stream each batch so a max_batch below the stream count stays fair
+        self.__first_stream = (self.__first_stream + 1) % len(self.streams)
+        streams = self.streams[self.__first_stream:] + self.streams[:self.__first_stream]
+        batch = {}
+        while not stop_event.is_set():
+            for stream in streams:
+                if len(batch) >= max_batch and stream.name not in batch:
+                    continue
+                seq, item = stream.frame_slot.get(stream.last_seq, timeout=0)
+                if item is not None:
+                    # a newer frame replaces one already waiting in the batch
+                    stream.last_seq = seq
+                    batch[stream.name] = (stream, seq, item)
+            if len(batch) >= max_batch:
+                break
+            if batch:
+                oldest = min(trace.arrival for _, _, (_, trace) in batch.values())
+                waited_ms = (monotonic() - oldest) * 1000
+                if waited_ms + self.expected_ms(len(batch) + 1) >= self.budget_ms:
+                    break
+            sleep(self.poll_interval)
+        return list(batch.values())
+
+    def __infer(self, batch):
+        started = monotonic()
+        for stream, _, (_, trace) in batch:
+            trace.mark("inference_start", at=started)
+            stream.batch_wait.add((started - trace.stamps["converted"]) * 1000)
+
+        frames = [frame for _, _, (frame, _) in batch]
+        results = self.model.predict(frames, imgsz=self.imgsz, verbose=False)
+        finished = monotonic()
+        self.__record(len(batch), (finished - started) * 1000)
+
+        for (stream, seq, (frame, trace)), result in zip(batch, results):
+            pose_frame = stream.tracker.update(result)
+            if stream.is_following():
+                target_index = stream.target_lock.update(pose_frame, True)
+            else:
+                # as inference_stage: the lock starts over when follow mode begins
+                stream.target_lock.reset()
+                target_index = select_largest(pose_frame) if pose_frame is not None else None
+            trace.mark("inferred", at=finished)
+            stream.inferred += 1
+            stream.stats.increment("inferred")
+            if (finished - trace.arrival) * 1000 > self.budget_ms:
+                stream.budget_misses += 1
+            stream.result_slot.put(seq, (frame, pose_frame, target_index, trace))
+
+    def __record(self, size, ms):
+        previous = self.__batch_ms.get(size)
+        self.__batch_ms[size] = ms if previous is None else previous + 0.2 * (ms - previous)
+        self.batches += 1
+        self.batched_frames += size
+
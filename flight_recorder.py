@@ -0,0 +1,161 @@
+import glob
+import json
+import os
+import queue
+import threading
+from datetime import datetime
+from time import monotonic, time
+
+import cv2
+
+
+class FlightRecorder:
+    """
+    Records what the drone saw into rolling, time-segmented video files.
+
+    The vision pipeline hands frames and per-frame metadata to a bounded queue
+    that a dedicated writer thread drains. When the writer falls behind, new
+    items are dropped instead of blocking the vision loop. Each segment is a
+    raw video, an optional overlay video, and a JSON-lines file of timestamps,
+    rc values and pose data keyed by frame sequence number. The oldest segments
+    are deleted once the recordings folder exceeds max_disk_mb. With a frame
+    pool, queued copies go into pooled buffers that return once written.
+    """
+    def __init__(self, directory="recordings", segment_seconds=60, max_disk_mb=2000, fps=30,
+                 queue_size=90, record_overlay=False, codec="mp4v", frame_pool=None):
+        self.directory = directory
+        self.segment_seconds = segment_seconds
+        self.max_disk_bytes = max_disk_mb * 1024 * 1024
+        self.fps = fps
+        self.overlay_enabled = record_overlay
+        self.__fourcc = cv2.VideoWriter_fourcc(*codec)
+        self.__frame_pool = frame_pool
+
+        self.__queue = queue.Queue(maxsize=queue_size)
+        self.__thread = None
+        self.__segment_name = None
+        self.__segment_started = 0
+        self.__raw_writer = None
+        self.__overlay_writer = None
+        self.__metadata_file = None
+        self.__frame_index = 0
+        self.__overlay_index = 0
+
+        self.written_count = 0
+        self.dropped_count = 0
+        self.deleted_segments = 0
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self.__thread = threading.Thread(target=self.__write_loop, daemon=True)
+        self.__thread.start()
+        print(f"Flight recorder writing to {self.directory}")
+
+    def stop(self):
+        self.__queue.put(None) # blocking on purpose: shutdown must reach the writer
+        if self.__thread:
+            self.__thread.join()
+        print(f"Flight recorder stopped: {self.written_count} frames written, {self.dropped_count} dropped")
+
+    def record_frame(self, seq, frame, captured_at):
+        """Queues a copy of the raw frame; the caller keeps drawing on the original."""
+        if self.__queue.full():
+            self.dropped_count += 1
+            return
+        self.__enqueue(("frame", seq, self.__copy(frame), captured_at, time()))
+
+    def record_overlay(self, seq, frame):
+        if not self.overlay_enabled:
+            return
+        if self.__queue.full():
+            self.dropped_count += 1
+            return
+        self.__enqueue(("overlay", seq, self.__copy(frame)))
+
+    def record_metadata(self, seq, **fields):
+        self.__enqueue(("metadata", seq, fields))
+
+    def __copy(self, frame):
+        return self.__frame_pool.copy(frame) if self.__frame_pool is not None else frame.copy()
+
+    def __enqueue(self, item):
+        try:
+            self.__queue.put_nowait(item)
+        except queue.Full:
+            self.dropped_count += 1
+
+    def __write_loop(self):
+        while True:
+            item = self.__queue.get()
+            if item is None:
+                break
+            try:
+                kind, seq = item[0], item[1]
+                if kind == "frame":
+                    self.__write_frame(seq, *item[2:])
+                elif kind == "overlay":
+                    if self.__overlay_writer is not None:
+                        self.__overlay_writer.write(item[2])
+                        self.__write_metadata({"seq": seq, "overlay_index": self.__overlay_index})
+                        self.__overlay_index += 1
+                elif self.__metadata_file is not None:
+                    self.__write_metadata({"seq": seq, **item[2]})
+            except Exception as e:
+                print(f"Flight recorder failed to write {item[0]}: {e}")
+            # let go of the frame now rather than while waiting for the next one
+            item = None
+        self.__close_segment()
+
+    def __write_frame(self, seq, frame, captured_at, wall_time):
+        if self.__raw_writer is None or monotonic() - self.__segment_started > self.segment_seconds:
+            self.__close_segment()
+            self.__open_segment(frame.shape)
+
+        self.__raw_writer.write(frame)
+        self.__write_metadata({"seq": seq, "frame_index": self.__frame_index, "captured_at": captured_at, "time": wall_time})
+        self.__frame_index += 1
+        self.written_count += 1
+
+    def __write_metadata(self, record):
+        self.__metadata_file.write(json.dumps(record))
+        self.__metadata_file.write("\n")
+
+    def __open_segment(self, frame_shape):
+        height, width = frame_shape[:2]
+        self.__segment_name = os.path.join(self.directory, datetime.now().strftime("flight_%Y%m%d_%H%M%S"))
+        self.__raw_writer = cv2.VideoWriter(f"{self.__segment_name}_raw.mp4", self.__fourcc, self.fps, (width, height))
+        if self.overlay_enabled:
+            self.__overlay_writer = cv2.VideoWriter(f"{self.__segment_name}_overlay.mp4", self.__fourcc, self.fps, (width, height))
+        self.__metadata_file = open(f"{self.__segment_name}_meta.jsonl", "w")
+        self.__segment_started = monotonic()
+        self.__frame_index = 0
+        self.__overlay_index = 0
+
+    def __close_segment(self):
+        if self.__raw_writer is None:
+            return
+        self.__raw_writer.release()
+        if self.__overlay_writer is not None:
+            self.__overlay_writer.release()
+        self.__metadata_file.close()
+        self.__raw_writer = None
+        self.__overlay_writer = None
+        self.__metadata_file = None
+        self.__enforce_disk_cap()
+
+    def __enforce_disk_cap(self):
+        segments = {}
+        for path in glob.glob(os.path.join(self.directory, "flight_*")):
+            prefix = path.rsplit("_", 1)[0]
+            segments.setdefault(prefix, []).append(path)
+
+        total = sum(os.path.getsize(path) for paths in segments.values() for path in paths)
+        # segment names sort by start time, so the oldest go first
+        for prefix in sorted(segments):
+            if total <= self.max_disk_bytes:
+                break
+            for path in segments[prefix]:
+                total -= os.path.getsize(path)
+                os.remove(path)
+            self.deleted_segments += 1
+            print(f"Flight recorder deleted old segment {prefix} to stay under the disk cap")
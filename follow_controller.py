@@ -0,0 +1,190 @@
+import threading
+from time import monotonic, sleep
+
+from simple_pid import PID
+
+from latency_trace import LatencyHistogram
+from pose_processing import MIN_DRAW_CONFIDENCE, measure_target
+from target_filter import TargetPredictor
+
+# (Kp, Ki, Kd) per axis
+DEFAULT_GAINS = {
+    "cc": (0.25, 0.2, 0.2),
+    "ud": (0.3, 0.3, 0.3),
+    "fb": (0.35, 0.2, 0.3),
+}
+OUTPUT_LIMITS = {"cc": 70, "ud": 80, "fb": 50}
+
+
+class FollowController:
+    """
+    The follow mode PID loop: turns a TargetMeasurement into yaw (cc),
+    vertical (ud) and forward/back (fb) commands.
+
+    Kept free of any Tello or display code so replays, benchmarks and the
+    simulator drive exactly the controller that flies.
+    """
+    def __init__(self, gains=DEFAULT_GAINS, dead_band_xy=20, dead_band_fb=25, desired_shoulder_dist=150, climb_speed=-50, verbose=True):
+        self.verbose = verbose
+        self.dead_band_xy = dead_band_xy
+        self.dead_band_fb = dead_band_fb
+        self.desired_shoulder_dist = desired_shoulder_dist
+        self.climb_speed = climb_speed
+
+        limits = {axis: (-limit, limit) for axis, limit in OUTPUT_LIMITS.items()}
+        self.pid_cc = PID(*gains["cc"], setpoint=0, output_limits=limits["cc"])
+        self.pid_ud = PID(*gains["ud"], setpoint=0, output_limits=limits["ud"])
+        self.pid_fb = PID(*gains["fb"], setpoint=0, output_limits=limits["fb"])
+
+        self.cc = 0
+        self.ud = 0
+        self.fb = 0
+
+    def reset(self):
+        self.cc, self.ud, self.fb = 0, 0, 0
+        self.pid_cc.reset()
+        self.pid_ud.reset()
+        self.pid_fb.reset()
+
+    def update(self, target, dt=None):
+        """
+        Returns the new (cc, ud, fb). target is None when nobody is tracked.
+        dt overrides the PIDs' wall-clock time step, for replays that run faster than real time.
+        """
+        if target is None:
+            self.reset()
+            return self.cc, self.ud, self.fb
+
+        if target.nose_visible:
+            self.cc = int(self.pid_cc(target.errorx, dt=dt)) if abs(target.errorx) > self.dead_band_xy else 0
+            self.ud = int(self.pid_ud(target.errory, dt=dt)) if abs(target.errory) > self.dead_band_xy else 0
+        else:
+            if target.sees_body:
+                self.ud = self.climb_speed
+                if self.verbose:
+                    print("moving up")
+            else:
+                self.cc, self.ud = 0, 0
+                self.pid_cc.reset()
+                self.pid_ud.reset()
+
+        if target.shoulders_visible:
+            errorFB = self.desired_shoulder_dist - target.shoulder_dist
+            self.fb = int(self.pid_fb(errorFB, dt=dt)) if abs(errorFB) > self.dead_band_fb else 0
+        else:
+            self.fb = 0
+            self.pid_fb.reset()
+
+        return self.cc, self.ud, self.fb
+
+    def rc_command(self):
+        """(left_right, forward_backward, up_down, yaw) for send_rc_control, with the Tello's sign convention."""
+        return 0, -self.fb, -self.ud, -self.cc
+
+
+class FollowLoop:
+    """
+    Runs the follow controller at a fixed rate, independent of how fast frames
+    are inferred.
+
+    Detections are submitted with their frame's capture time. Every tick the
+    target is predicted forward to the current time by TargetPredictor and the
+    PIDs are stepped with the real tick interval, so control stays smooth when
+    inference is slow and compensates for pipeline latency.
+
+    With a tracer, the first rc command sent after each new measurement adds
+    its frame's age to the tracer's arrival_to_rc_queued histogram, which
+    frames handed to the loop never stamp themselves.
+    """
+    def __init__(self, controller, send_rc, is_active, rate_hz=30, target_timeout=0.6, max_prediction=0.5, tracer=None):
+        self.controller = controller
+        self.rate_hz = rate_hz
+        self.target_timeout = target_timeout
+        self.__send_rc = send_rc
+        self.__is_active = is_active
+        self.__tracer = tracer
+        self.__predictor = TargetPredictor(max_prediction=max_prediction)
+        self.__lock = threading.Lock()
+        self.__frame_shape = None
+        self.__pending = None
+        self.__age_histogram = LatencyHistogram()
+
+        self.ticks = 0
+        self.overruns = 0
+        self.rc_sent = 0
+
+    def submit(self, target, captured_at, frame_shape):
+        """Hands over the newest measurement (None when the target was not found)."""
+        with self.__lock:
+            self.__pending = (target, captured_at)
+            self.__frame_shape = frame_shape
+
+    def run(self, stop_event):
+        print(f"Follow loop started at {self.rate_hz} Hz")
+        period = 1 / self.rate_hz
+        next_tick = monotonic()
+        last_tick = None
+        last_rc = None
+        traced_at = None # capture time of the last measurement recorded in the tracer
+        active = False
+        while not stop_event.is_set():
+            now = monotonic()
+            if now < next_tick:
+                sleep(next_tick - now)
+                now = monotonic()
+            next_tick += period
+            if now - next_tick > period:
+                # fell more than a tick behind; skip ahead instead of bursting
+                self.overruns += 1
+                next_tick = now + period
+            self.ticks += 1
+
+            if not self.__is_active():
+                if active:
+                    # leaving follow mode: stop the drone and forget the target
+                    self.__send_rc(0, 0, 0, 0)
+                    self.controller.reset()
+                    self.__predictor.reset()
+                    last_rc = None
+                    active = False
+                last_tick = None
+                continue
+            active = True
+
+            target = self.__step_predictor(now)
+            dt = None if last_tick is None else now - last_tick
+            last_tick = now
+            self.controller.update(target, dt=dt)
+
+            rc = self.controller.rc_command()
+            if rc != last_rc:
+                self.__send_rc(*rc)
+                self.rc_sent += 1
+                last_rc = rc
+                measured_at = self.__predictor.measured_at
+                if self.__tracer is not None and target is not None and measured_at != traced_at:
+                    self.__tracer.record("arrival_to_rc_queued", (monotonic() - measured_at) * 1000)
+                    traced_at = measured_at
+        print("Follow loop finished")
+
+    def age_summary(self):
+        """How old the measurement behind each command was, in ms."""
+        h = self.__age_histogram
+        return f"p50={h.percentile(0.5):.1f} p95={h.percentile(0.95):.1f} p99={h.percentile(0.99):.1f} max={h.max:.1f}ms"
+
+    def __step_predictor(self, now):
+        with self.__lock:
+            pending, self.__pending = self.__pending, None
+            frame_shape = self.__frame_shape
+
+        # a frame without the target leaves the prediction running until target_timeout expires
+        if pending is not None and pending[0] is not None:
+            target, captured_at = pending
+            confident = target.keypoints[:, 2] > MIN_DRAW_CONFIDENCE
+            self.__predictor.add(target.keypoints, confident, captured_at)
+
+        measured_at = self.__predictor.measured_at
+        if measured_at is None or now - measured_at > self.target_timeout:
+            return None
+        self.__age_histogram.add((now - measured_at) * 1000)
+        return measure_target(self.__predictor.keypoints_at(now), frame_shape)
@@ -0,0 +1,318 @@
+import argparse
+import csv
+import itertools
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+
+import numpy as np
+
+from follow_controller import DEFAULT_GAINS, FollowController
+from pose_processing import measure_target
+
+FRAME_SHAPE = (720, 960, 3)
+FOCAL_PX = 685 # about 70 degrees of horizontal view across 960 pixels
+MIN_DEPTH_CM = 30
+SHOULDER_WIDTH_CM = 40
+SYNTHETIC_KINDS = ("step", "walk", "circle", "crouch")
+
+# where each of the 17 keypoints sits relative to the nose, as (right, up) in cm, for a person facing the camera
+BODY_TEMPLATE = np.array([
+    (0, 0), (-3, 3), (3, 3), (-7, 1), (7, 1),                # nose, eyes, ears
+    (-20, -25), (20, -25), (-24, -55), (24, -55),            # shoulders, elbows
+    (-26, -80), (26, -80), (-12, -80), (12, -80),            # wrists, hips
+    (-12, -125), (12, -125), (-12, -165), (12, -165),        # knees, ankles
+], dtype=float)
+
+
+class Trajectory:
+    """Where the followed person's nose is over time: x, y on the ground and height z, all in cm."""
+    def __init__(self, name, times, positions):
+        self.name = name
+        self.times = np.asarray(times, dtype=float)
+        self.positions = np.asarray(positions, dtype=float)
+
+    @property
+    def duration(self):
+        return float(self.times[-1] - self.times[0])
+
+    def position_at(self, t):
+        t = self.times[0] + t
+        return np.array([np.interp(t, self.times, self.positions[:, axis]) for axis in range(3)])
+
+
+class DroneModel:
+    """
+    Tello flight response to rc commands: each axis approaches the commanded
+    velocity with a first-order lag. Speeds are per unit of rc command.
+    """
+    def __init__(self, x=0.0, y=0.0, height=120.0, yaw=0.0, speed_per_rc=1.0, climb_per_rc=0.8,
+                 yaw_per_rc=1.0, time_constant=0.3):
+        self.x, self.y, self.height, self.yaw = x, y, height, yaw # cm, cm, cm, radians
+        self.speed_per_rc = speed_per_rc
+        self.climb_per_rc = climb_per_rc
+        self.yaw_per_rc = math.radians(yaw_per_rc)
+        self.time_constant = time_constant
+        self.velocity = np.zeros(4) # right, forward, up (cm/s), yaw rate (rad/s)
+
+    def step(self, rc, dt):
+        """Advances dt seconds under an rc command (left_right, forward_backward, up_down, yaw)."""
+        left_right, forward_backward, up_down, yaw = rc
+        target = np.array([left_right * self.speed_per_rc, forward_backward * self.speed_per_rc,
+                           up_down * self.climb_per_rc, yaw * self.yaw_per_rc])
+        self.velocity += (target - self.velocity) * min(1.0, dt / self.time_constant)
+        right, forward, up, yaw_rate = self.velocity
+        self.x += (forward * math.cos(self.yaw) - right * math.sin(self.yaw)) * dt
+        self.y += (forward * math.sin(self.yaw) + right * math.cos(self.yaw)) * dt
+        self.height += up * dt
+        self.yaw += yaw_rate * dt
+
+    def to_camera(self, position):
+        """(right, up relative to the camera, depth) of a world position, in cm."""
+        dx, dy = position[0] - self.x, position[1] - self.y
+        depth = dx * math.cos(self.yaw) + dy * math.sin(self.yaw)
+        right = -dx * math.sin(self.yaw) + dy * math.cos(self.yaw)
+        return right, position[2] - self.height, depth
+
+    def to_world(self, right, up, depth):
+        x = self.x + depth * math.cos(self.yaw) - right * math.sin(self.yaw)
+        y = self.y + depth * math.sin(self.yaw) + right * math.cos(self.yaw)
+        return x, y, self.height + up
+
+
+def render_keypoints(drone, nose_position, frame_shape=FRAME_SHAPE, noise_px=0.0, rng=None):
+    """The (17, 3) keypoints a perfect pose model would report, optionally with pixel noise."""
+    height, width = frame_shape[:2]
+    keypoints = np.zeros((17, 3))
+    right, up, depth = drone.to_camera(nose_position)
+    if depth < MIN_DEPTH_CM:
+        return keypoints
+    scale = FOCAL_PX / depth
+    keypoints[:, 0] = width / 2 + (right + BODY_TEMPLATE[:, 0]) * scale
+    keypoints[:, 1] = height / 2 - (up + BODY_TEMPLATE[:, 1]) * scale
+    if noise_px and rng is not None:
+        keypoints[:, :2] += rng.normal(0, noise_px, (17, 2))
+    inside = (keypoints[:, 0] >= 0) & (keypoints[:, 0] < width) & (keypoints[:, 1] >= 0) & (keypoints[:, 1] < height)
+    keypoints[:, 2] = np.where(inside, 0.9, 0.0)
+    return keypoints
+
+
+def synthetic_trajectory(kind, duration=20.0, rate=30, distance=250.0, nose_height=165.0):
+    """A person in front of a drone at the origin facing +x."""
+    times = np.arange(0, duration, 1 / rate)
+    x = np.full_like(times, distance)
+    y = np.zeros_like(times)
+    z = np.full_like(times, nose_height)
+    if kind == "step":
+        # standing still off to the side and too far away
+        y[:] = 120
+        x[:] = distance + 150
+    elif kind == "walk":
+        y = 150 * np.sin(2 * math.pi * times / 8)
+        x = distance + 100 * np.sin(2 * math.pi * times / 11)
+    elif kind == "circle":
+        # walking a circle around the drone's start point
+        angle = 2 * math.pi * times / duration
+        x = distance * np.cos(angle)
+        y = distance * np.sin(angle)
+    elif kind == "crouch":
+        y[:] = 40
+        z = nose_height - 60 * (np.sin(2 * math.pi * times / 5) > 0)
+    else:
+        raise ValueError(f"Unknown trajectory '{kind}', expected one of {SYNTHETIC_KINDS}")
+    return Trajectory(kind, times, np.column_stack([x, y, z]))
+
+
+def recorded_trajectory(meta_path, frame_shape=FRAME_SHAPE):
+    """
+    Rebuilds the person's path from a flight recorder metadata file: the
+    drone's pose is integrated from the recorded rc commands with DroneModel,
+    and the person is placed from the target keypoints, with depth taken from
+    the shoulder width.
+    """
+    frames, metadata = {}, {}
+    with open(meta_path) as f:
+        for line in f:
+            record = json.loads(line)
+            if "captured_at" in record:
+                frames[record["seq"]] = record["captured_at"]
+            elif "target_keypoints" in record:
+                metadata[record["seq"]] = record
+
+    drone = DroneModel()
+    height, width = frame_shape[:2]
+    times, positions = [], []
+    previous_t, rc = None, (0, 0, 0, 0)
+    for seq in sorted(set(frames) & set(metadata)):
+        t = frames[seq]
+        if previous_t is not None:
+            drone.step(rc, t - previous_t)
+        previous_t = t
+        record = metadata[seq]
+        rc = tuple(record["rc"]) if record.get("rc") else (0, 0, 0, 0)
+        if record["target_keypoints"] is None:
+            continue
+        keypoints = np.array(record["target_keypoints"])
+        target = measure_target(keypoints, frame_shape)
+        if not (target.nose_visible and target.shoulders_visible) or target.shoulder_dist < 1:
+            continue
+        depth = FOCAL_PX * SHOULDER_WIDTH_CM / target.shoulder_dist
+        nose_x, nose_y = keypoints[0, :2]
+        right = (nose_x - width / 2) * depth / FOCAL_PX
+        up = (height / 2 - nose_y) * depth / FOCAL_PX
+        times.append(t)
+        positions.append(drone.to_world(right, up, depth))
+    if len(times) < 2:
+        raise ValueError(f"{meta_path} has too few frames with a visible target to rebuild a trajectory")
+    return Trajectory(os.path.basename(meta_path), times, positions)
+
+
+def overshoot(errors):
+    """Largest error, on either side, from the first time the error crosses the setpoint onwards."""
+    signs = np.sign(errors)
+    crossings = np.flatnonzero(signs[1:] * signs[:-1] < 0)
+    if not len(crossings):
+        return 0.0
+    return float(np.abs(errors[crossings[0] + 1:]).max())
+
+
+def simulate(trajectory, gains=DEFAULT_GAINS, dead_band_xy=20, dead_band_fb=25, latency=0.1, frame_rate=30,
+             noise_px=2.0, dropout=0.02, seed=0, frame_shape=FRAME_SHAPE):
+    """
+    Flies one follow-mode run: every frame the target is rendered from the
+    drone's true pose, reaches the controller latency seconds later, and the
+    resulting rc command drives the drone model.
+    """
+    rng = np.random.default_rng(seed)
+    controller = FollowController(gains, dead_band_xy, dead_band_fb, verbose=False)
+    drone = DroneModel()
+    dt = 1 / frame_rate
+    delay_frames = max(0, round(latency * frame_rate))
+    observations = []
+    errors = {"x": [], "y": [], "dist": []}
+    lost = 0
+    rc = (0, 0, 0, 0)
+    rc_history = []
+
+    steps = int(trajectory.duration * frame_rate)
+    for step in range(steps):
+        t = step * dt
+        drone.step(rc, dt)
+        keypoints = render_keypoints(drone, trajectory.position_at(t), frame_shape, noise_px, rng)
+        visible = keypoints[:, 2].any() and rng.random() >= dropout
+        observations.append(keypoints if visible else None)
+
+        if keypoints[:, 2].any():
+            truth = measure_target(keypoints, frame_shape)
+            errors["x"].append(truth.errorx)
+            errors["y"].append(truth.errory)
+            errors["dist"].append(truth.shoulder_dist - controller.desired_shoulder_dist)
+        else:
+            lost += 1
+
+        if len(observations) > delay_frames:
+            seen = observations[-1 - delay_frames]
+            target = measure_target(seen, frame_shape) if seen is not None else None
+            controller.update(target, dt=dt)
+            rc = controller.rc_command()
+        rc_history.append(rc)
+
+    rc_array = np.array(rc_history)
+    changes = np.abs(np.diff(rc_array, axis=0))
+    result = {"lost_fraction": lost / max(steps, 1),
+              "rc_changes_per_s": float((changes.sum(axis=1) > 0).sum()) / trajectory.duration,
+              "rc_activity": float(changes.sum()) / trajectory.duration}
+    for axis, values in errors.items():
+        values = np.array(values) if values else np.zeros(1)
+        result[f"rms_{axis}"] = float(np.sqrt(np.mean(values ** 2)))
+        result[f"overshoot_{axis}"] = overshoot(values)
+    return result
+
+
+def score(result, frame_shape=FRAME_SHAPE, desired_shoulder_dist=150, rc_weight=0.01):
+    """Lower is better: tracking error relative to the frame and follow distance, time lost, and rc chatter."""
+    height, width = frame_shape[:2]
+    return (result["rms_x"] / width + result["rms_y"] / height + result["rms_dist"] / desired_shoulder_dist
+            + result["lost_fraction"] + rc_weight * result["rc_changes_per_s"])
+
+
+def run_config(job):
+    """Process pool entry point: one parameter setting over every trajectory."""
+    config, trajectories, settings = job
+    gains = {axis: tuple(config[f"{term}_{axis}"] for term in ("kp", "ki", "kd")) for axis in ("cc", "ud", "fb")}
+    runs = [simulate(trajectory, gains, config["dead_band_xy"], config["dead_band_fb"], settings["latency"],
+                     settings["frame_rate"], settings["noise_px"], settings["dropout"], seed)
+            for seed, trajectory in enumerate(trajectories)]
+    summary = {key: float(np.mean([run[key] for run in runs])) for key in runs[0]}
+    summary["score"] = float(np.mean([score(run, rc_weight=settings["rc_weight"]) for run in runs]))
+    return config, summary
+
+
+def parameter_grid(args):
+    """Every combination of the comma-separated values given for each gain and dead-band."""
+    axes = {}
+    for axis in ("cc", "ud", "fb"):
+        for term, default in zip(("kp", "ki", "kd"), DEFAULT_GAINS[axis]):
+            values = getattr(args, f"{term}_{axis}")
+            axes[f"{term}_{axis}"] = [float(v) for v in values.split(",")] if values else [default]
+    axes["dead_band_xy"] = [float(v) for v in args.dead_band_xy.split(",")]
+    axes["dead_band_fb"] = [float(v) for v in args.dead_band_fb.split(",")]
+    keys = list(axes)
+    return [dict(zip(keys, values)) for values in itertools.product(*(axes[key] for key in keys))]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate follow mode on recorded or synthetic trajectories and sweep PID gains and dead-bands.")
+    parser.add_argument("--trajectory", action="append", default=None,
+                        help=f"synthetic kind ({', '.join(SYNTHETIC_KINDS)}) or a flight recorder *_meta.jsonl file; repeatable")
+    parser.add_argument("--duration", type=float, default=20, help="seconds per synthetic trajectory")
+    for axis in ("cc", "ud", "fb"):
+        for term in ("kp", "ki", "kd"):
+            parser.add_argument(f"--{term}-{axis}", default=None, help=f"comma-separated {term} values for {axis}")
+    parser.add_argument("--dead-band-xy", default="20")
+    parser.add_argument("--dead-band-fb", default="25")
+    parser.add_argument("--latency", type=float, default=0.1, help="seconds from capture to rc command")
+    parser.add_argument("--frame-rate", type=float, default=30)
+    parser.add_argument("--noise-px", type=float, default=2.0, help="keypoint noise standard deviation")
+    parser.add_argument("--dropout", type=float, default=0.02, help="fraction of frames with no detection")
+    parser.add_argument("--rc-weight", type=float, default=0.01, help="score penalty per rc change per second")
+    parser.add_argument("--workers", type=int, default=None, help="process pool size (default: all cores)")
+    parser.add_argument("--top", type=int, default=10, help="settings to print")
+    parser.add_argument("--csv", default=None, help="write every setting's results to this CSV file")
+    args = parser.parse_args()
+
+    trajectories = []
+    for name in args.trajectory or list(SYNTHETIC_KINDS):
+        if name in SYNTHETIC_KINDS:
+            trajectories.append(synthetic_trajectory(name, args.duration))
+        else:
+            trajectories.append(recorded_trajectory(name))
+    settings = {"latency": args.latency, "frame_rate": args.frame_rate, "noise_px": args.noise_px,
+                "dropout": args.dropout, "rc_weight": args.rc_weight}
+    grid = parameter_grid(args)
+    print(f"Simulating {len(grid)} settings over {len(trajectories)} trajectories")
+
+    start = perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        jobs = [(config, trajectories, settings) for config in grid]
+        results = list(pool.map(run_config, jobs, chunksize=max(1, len(jobs) // (4 * (os.cpu_count() or 1)))))
+    elapsed = perf_counter() - start
+    print(f"Done in {elapsed:.1f}s ({len(grid) / elapsed * 60:.0f} settings per minute)")
+
+    results.sort(key=lambda item: item[1]["score"])
+    columns = ("score", "rms_x", "rms_y", "rms_dist", "overshoot_x", "overshoot_dist", "lost_fraction", "rc_changes_per_s")
+    print(f"{'rank':<6}" + "".join(f"{column:>18}" for column in columns) + "  setting")
+    swept = [key for key in grid[0] if len(set(config[key] for config in grid)) > 1]
+    for rank, (config, summary) in enumerate(results[:args.top], start=1):
+        changed = {key: config[key] for key in swept}
+        print(f"{rank:<6}" + "".join(f"{summary[column]:>18.3f}" for column in columns) + f"  {changed or 'defaults'}")
+
+    if args.csv:
+        with open(args.csv, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(grid[0]) + list(results[0][1]))
+            writer.writeheader()
+            for config, summary in results:
+                writer.writerow({**config, **summary})
+        print(f"Results written to {args.csv}")
@@ -0,0 +1,75 @@
+from time import monotonic
+
+import cv2
+import numpy as np
+
+# SSIM stabilising constants for 8-bit images
+SSIM_C1 = (0.01 * 255) ** 2
+SSIM_C2 = (0.03 * 255) ** 2
+
+
+def thumbnail(frame, size):
+    """Small grayscale float copy of a BGR frame; area averaging also smooths out sensor noise."""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    return cv2.resize(gray, size, interpolation=cv2.INTER_AREA).astype(np.float32)
+
+
+def ssim(a, b):
+    """Mean structural similarity of two same-sized grayscale images, 1.0 for identical ones."""
+    blur = lambda image: cv2.GaussianBlur(image, (7, 7), 1.5)
+    mean_a, mean_b = blur(a), blur(b)
+    var_a = blur(a * a) - mean_a * mean_a
+    var_b = blur(b * b) - mean_b * mean_b
+    covariance = blur(a * b) - mean_a * mean_b
+    ssim_map = (((2 * mean_a * mean_b + SSIM_C1) * (2 * covariance + SSIM_C2))
+                / ((mean_a * mean_a + mean_b * mean_b + SSIM_C1) * (var_a + var_b + SSIM_C2)))
+    return float(ssim_map.mean())
+
+
+class FrameNovelty:
+    """
+    Decides whether a frame is worth sending to the memory model. Each frame
+    is compared to the last one sent, both shrunk to a thumbnail, and passes
+    when their structural similarity has dropped by min_change. A frame also
+    passes once max_staleness seconds have gone by since the last one, so a
+    slow change that never crosses the threshold still gets through.
+    """
+    def __init__(self, size=(64, 48), min_change=0.08, max_staleness=30.0):
+        self.size = size
+        self.min_change = min_change
+        self.max_staleness = max_staleness
+        self.__reference = None
+        self.__sent_at = None
+
+        self.checked = 0
+        self.skipped = 0
+        self.selected = {"first": 0, "changed": 0, "stale": 0}
+
+    def select(self, frame, now=None):
+        """Returns why the frame should be sent ("first", "changed" or "stale"), or None to skip it."""
+        now = monotonic() if now is None else now
+        self.checked += 1
+        current = thumbnail(frame, self.size)
+        if self.__reference is None:
+            reason = "first"
+        elif 1 - ssim(self.__reference, current) >= self.min_change:
+            reason = "changed"
+        elif now - self.__sent_at >= self.max_staleness:
+            reason = "stale"
+        else:
+            self.skipped += 1
+            return None
+        self.__reference = current
+        self.__sent_at = now
+        self.selected[reason] += 1
+        return reason
+
+    def mark(self, frame, now=None):
+        """Makes a frame sent for some other reason the one later frames are compared to."""
+        self.__reference = thumbnail(frame, self.size)
+        self.__sent_at = monotonic() if now is None else now
+
+    def summary(self):
+        sent = sum(self.selected.values())
+        reasons = ", ".join(f"{count} {reason}" for reason, count in self.selected.items())
+        return f"{sent} of {self.checked} frames sent ({reasons}), {self.skipped} unchanged"
@@ -0,0 +1,80 @@
+import resource
+import threading
+import weakref
+from time import monotonic
+
+import numpy as np
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far; ru_maxrss is in kilobytes on Linux."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class FramePool:
+    """
+    Reusable frame buffers, so capture converts into memory it already has
+    instead of allocating a new 2 MB array for every frame.
+
+    acquire() hands out an array backed by a free buffer. The buffer goes back
+    to the pool when the last reference to that array, or to any slice of it,
+    is dropped. CPython frees on the spot, so handing a frame on is handing
+    over a reference, and a latest-value slot that overwrites a frame, the
+    memory thread or the recorder letting go of one releases it with no
+    release calls to forget.
+
+    With pooled=False every acquire() allocates, which gives the allocation
+    rate and peak RSS to compare against. Past max_buffers the pool also
+    allocates rather than keeps growing.
+    """
+    def __init__(self, max_buffers=48, pooled=True):
+        self.max_buffers = max_buffers
+        self.pooled = pooled
+        # reentrant: garbage collection can run a buffer's finalizer, which takes it too, inside acquire()
+        self.__lock = threading.RLock()
+        self.__free = {}  # (shape, dtype) -> buffers ready for reuse
+        self.__started = monotonic()
+        self.buffers = 0
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.allocations = 0
+        self.reuses = 0
+
+    def acquire(self, shape, dtype=np.uint8):
+        """An uninitialised array of this shape, e.g. for cv2.cvtColor(..., dst=pool.acquire(raw.shape))."""
+        key = (tuple(shape), np.dtype(dtype))
+        with self.__lock:
+            free = self.__free.setdefault(key, [])
+            if free:
+                memory = free.pop()
+                self.reuses += 1
+            else:
+                self.allocations += 1
+                if not self.pooled or self.buffers >= self.max_buffers:
+                    return np.empty(shape, dtype)
+                memory = bytearray(int(np.prod(shape)) * key[1].itemsize)
+                self.buffers += 1
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+
+        # every view of the frame keeps this array alive, since its own base is not an array
+        root = np.frombuffer(memory, dtype=dtype)
+        weakref.finalize(root, self.__give_back, key, memory)
+        return root.reshape(shape)
+
+    def copy(self, frame):
+        """frame.copy(), into a pooled buffer."""
+        pooled = self.acquire(frame.shape, frame.dtype)
+        np.copyto(pooled, frame)
+        return pooled
+
+    def summary(self):
+        rate = self.allocations / max(monotonic() - self.__started, 1e-9)
+        mode = f"{self.buffers} buffers" if self.pooled else "unpooled"
+        return (f"{mode}, {self.in_use} in use (peak {self.peak_in_use}), {self.allocations} allocations "
+                f"({rate:.1f}/s), {self.reuses} reuses, peak RSS {peak_rss_mb():.0f} MB")
+
+    def __give_back(self, key, memory):
+        with self.__lock:
+            self.__free[key].append(memory)
+            self.in_use -= 1
@@ -0,0 +1,83 @@
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+HEADER_FIELDS = 2 # per slot: sequence number, capture timestamp
+WRITING = -1.0
+
+
+class FrameRing:
+    """
+    Fixed-size ring of video frames in shared memory, written by one process
+    and read by others without copying.
+
+    Each slot has a small header holding the sequence number of the frame it
+    contains. The writer marks a slot as being written before filling it and
+    publishes the new sequence number afterwards, so readers can tell whether
+    the view they are holding was overwritten while they used it.
+    """
+    def __init__(self, shape, slots=4, name=None, create=False):
+        self.shape = tuple(shape)
+        self.slots = slots
+        header_bytes = slots * HEADER_FIELDS * 8
+        frame_bytes = int(np.prod(self.shape))
+        size = header_bytes + slots * frame_bytes
+
+        self.__shm = shared_memory.SharedMemory(name=name, create=create, size=size if create else 0)
+        self.name = self.__shm.name
+        self.__owner = create
+        if not create:
+            # only the creating process may unlink the segment, so attaching must not register it for cleanup
+            resource_tracker.unregister(self.__shm._name, "shared_memory")
+        self.__header = np.ndarray((slots, HEADER_FIELDS), dtype=np.float64, buffer=self.__shm.buf)
+        self.__frames = np.ndarray((slots,) + self.shape, dtype=np.uint8, buffer=self.__shm.buf, offset=header_bytes)
+        if create:
+            self.__header[:] = 0
+        self.__write_seq = int(self.__header[:, 0].max())
+
+    @classmethod
+    def attach(cls, name, shape, slots):
+        return cls(shape, slots, name=name)
+
+    def begin_write(self):
+        """Claims the next slot and returns (seq, view) for the caller to decode straight into."""
+        seq = self.__write_seq + 1
+        slot = seq % self.slots
+        self.__header[slot, 0] = WRITING
+        return seq, self.__frames[slot]
+
+    def commit(self, seq, captured_at):
+        slot = seq % self.slots
+        self.__header[slot, 1] = captured_at
+        self.__header[slot, 0] = seq
+        self.__write_seq = seq
+
+    def write(self, frame, captured_at):
+        seq, view = self.begin_write()
+        view[:] = frame
+        self.commit(seq, captured_at)
+        return seq
+
+    def latest(self, last_seq=0):
+        """Returns (seq, view, captured_at) of the newest frame after last_seq, or None."""
+        slot = int(np.argmax(self.__header[:, 0]))
+        seq, captured_at = self.__header[slot]
+        if seq <= last_seq:
+            return None
+        return int(seq), self.__frames[slot], float(captured_at)
+
+    def frame(self, seq):
+        """View of frame seq if it is still in the ring, else None."""
+        if not self.is_current(seq):
+            return None
+        return self.__frames[seq % self.slots]
+
+    def is_current(self, seq):
+        return self.__header[seq % self.slots, 0] == seq
+
+    def close(self):
+        # views must go before the mapping can be closed
+        del self.__header, self.__frames
+        self.__shm.close()
+        if self.__owner:
+            self.__shm.unlink()
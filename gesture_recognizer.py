@@ -0,0 +1,93 @@
+from pose_processing import (LEFT_ELBOW, LEFT_SHOULDER, LEFT_WRIST, NOSE, RIGHT_ELBOW, RIGHT_SHOULDER,
+                             RIGHT_WRIST)
+
+BOTH_HANDS_UP = "both_hands_up"
+ARM_OUT = "arm_out"
+
+# the command each gesture stands for; the control stage sends them straight to the Tello I/O lanes
+GESTURE_COMMANDS = {
+    BOTH_HANDS_UP: "land",
+    ARM_OUT: "hover",
+}
+
+
+def classify_pose(keypoints, min_confidence=0.5, out_ratio=1.2, level_ratio=0.4):
+    """
+    The gesture one person's keypoints show in a single frame, or None.
+
+    Distances are relative to shoulder width, so the same pose is recognized
+    near and far from the camera.
+    """
+    confident = keypoints[:, 2] > min_confidence
+    if not (confident[LEFT_SHOULDER] and confident[RIGHT_SHOULDER]):
+        return None
+    x = keypoints[:, 0]
+    y = keypoints[:, 1]
+    shoulder_width = abs(x[LEFT_SHOULDER] - x[RIGHT_SHOULDER])
+    if shoulder_width < 1:
+        return None
+
+    # both wrists above the head; without the nose, a shoulder width above the shoulders
+    head_y = y[NOSE] if confident[NOSE] else min(y[LEFT_SHOULDER], y[RIGHT_SHOULDER]) - shoulder_width
+    if confident[LEFT_WRIST] and confident[RIGHT_WRIST] and y[LEFT_WRIST] < head_y and y[RIGHT_WRIST] < head_y:
+        return BOTH_HANDS_UP
+
+    # one arm held straight out sideways at shoulder height
+    for shoulder, elbow, wrist in ((LEFT_SHOULDER, LEFT_ELBOW, LEFT_WRIST), (RIGHT_SHOULDER, RIGHT_ELBOW, RIGHT_WRIST)):
+        if not (confident[elbow] and confident[wrist]):
+            continue
+        reach = abs(x[wrist] - x[shoulder])
+        level = abs(y[wrist] - y[shoulder]) < level_ratio * shoulder_width and abs(y[elbow] - y[shoulder]) < level_ratio * shoulder_width
+        elbow_between = min(x[shoulder], x[wrist]) <= x[elbow] <= max(x[shoulder], x[wrist])
+        if level and elbow_between and reach > out_ratio * shoulder_width:
+            return ARM_OUT
+    return None
+
+
+class GestureRecognizer:
+    """
+    Debounces per-frame gestures of the follow target into commands.
+
+    A gesture fires once it has been held for hold_seconds over at least
+    min_frames consecutive inferred frames. It then has to be released before
+    it can fire again, and no gesture fires within cooldown seconds of the last.
+    """
+    def __init__(self, hold_seconds=0.6, min_frames=4, cooldown=3.0, **classify_args):
+        self.hold_seconds = hold_seconds
+        self.min_frames = min_frames
+        self.cooldown = cooldown
+        self.__classify_args = classify_args
+        self.__gesture = None
+        self.__since = None
+        self.__frames = 0
+        self.__fired = False
+        self.__last_fired = None
+
+        self.recognized = {gesture: 0 for gesture in GESTURE_COMMANDS}
+
+    def reset(self):
+        self.__gesture = None
+        self.__since = None
+        self.__frames = 0
+        self.__fired = False
+
+    def update(self, keypoints, now):
+        """Feeds one frame's target keypoints (None when there is no target); returns a gesture that just fired."""
+        gesture = classify_pose(keypoints, **self.__classify_args) if keypoints is not None else None
+        if gesture != self.__gesture:
+            self.__gesture = gesture
+            self.__since = now
+            self.__frames = 0
+            self.__fired = False
+        if gesture is None:
+            return None
+        self.__frames += 1
+
+        if self.__fired or now - self.__since < self.hold_seconds or self.__frames < self.min_frames:
+            return None
+        if self.__last_fired is not None and now - self.__last_fired < self.cooldown:
+            return None
+        self.__fired = True
+        self.__last_fired = now
+        self.recognized[gesture] += 1
+        return gesture
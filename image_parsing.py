@@ -2,27 +2,71 @@ import json
 import requests
 import mimetypes
 import os
+import math
+import cv2
+import numpy as np
 
 HOST_FILE = "https://genai-service.stage.commandcentral.com/app-gateway"
 
-def send_file(api_key, image, sessionID):
+# file extension and OpenCV quality flag for each upload format
+IMAGE_FORMATS = {
+    "jpeg": (".jpg", cv2.IMWRITE_JPEG_QUALITY),
+    "webp": (".webp", cv2.IMWRITE_WEBP_QUALITY),
+}
+
+def encode_frame(frame, image_format="jpeg", quality=80, max_width=640):
+    """Encodes a BGR frame in memory, scaled down to at most max_width pixels wide. Returns (bytes, filename)."""
+    extension, quality_flag = IMAGE_FORMATS[image_format]
+    height, width = frame.shape[:2]
+    if max_width and width > max_width:
+        frame = cv2.resize(frame, (max_width, round(height * max_width / width)), interpolation=cv2.INTER_AREA)
+    ok, encoded = cv2.imencode(extension, frame, [quality_flag, quality])
+    if not ok:
+        raise ValueError(f"could not encode frame as {image_format}")
+    return encoded.tobytes(), f"frame{extension}"
+
+def tile_frames(frames, labels, tile_width=640):
+    """Lays frames out in a near-square grid, left to right then top to bottom, each captioned with its label."""
+    columns = math.ceil(math.sqrt(len(frames)))
+    rows = math.ceil(len(frames) / columns)
+    height, width = frames[0].shape[:2]
+    tile_height = round(height * tile_width / width)
+    grid = np.zeros((rows * tile_height, columns * tile_width, 3), dtype=np.uint8)
+    for index, (frame, label) in enumerate(zip(frames, labels)):
+        row, column = divmod(index, columns)
+        tile = grid[row * tile_height:(row + 1) * tile_height, column * tile_width:(column + 1) * tile_width]
+        cv2.resize(frame, (tile_width, tile_height), dst=tile, interpolation=cv2.INTER_AREA)
+        cv2.putText(tile, label, (8, 28), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 0), 4, cv2.LINE_AA)
+        cv2.putText(tile, label, (8, 28), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2, cv2.LINE_AA)
+    return grid
+
+def send_file(api_key, image, sessionID, filename=None):
+    """Uploads an image file, or encoded image bytes named by filename, to the session."""
     ENDPOINT_FILE = f"/api/v2/upload/{sessionID}"
     url_for_image = f"{HOST_FILE}{ENDPOINT_FILE}"
     file_field_name = "file"
-    mime_type,_ = mimetypes.guess_type(image)
+    in_memory = isinstance(image, (bytes, bytearray, memoryview))
+    if in_memory:
+        filename = filename or "frame.jpg"
+    mime_type,_ = mimetypes.guess_type(filename if in_memory else image)
     headers = {
         "x-msi-genai-api-key": api_key,
     }
     try:
-        with open(image, "rb") as f:
-            files = {file_field_name: (os.path.basename(image),f,mime_type)}
-            
-            # print(f"Attempting to upload file to: {url_for_image}")
-            # print(f"File to upload: {image} (as field '{file_field_name}')\n")
-
+        if in_memory:
+            files = {file_field_name: (filename, bytes(image), mime_type)}
             response = requests.post(url_for_image,headers=headers,files=files)
             response_image_dict = response.json()
-            # print(response_image_dict)
+        else:
+            with open(image, "rb") as f:
+                files = {file_field_name: (os.path.basename(image),f,mime_type)}
+
+                # print(f"Attempting to upload file to: {url_for_image}")
+                # print(f"File to upload: {image} (as field '{file_field_name}')\n")
+
+                response = requests.post(url_for_image,headers=headers,files=files)
+                response_image_dict = response.json()
+                # print(response_image_dict)
         response.raise_for_status()
         # print("\nFile upload successful!")
         # print(f"Status Code: {response.status_code}\n")
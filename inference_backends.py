@@ -0,0 +1,186 @@
+import glob
+import hashlib
+import os
+import shutil
+from time import perf_counter
+
+import cv2
+import numpy as np
+import yaml
+from ultralytics import YOLO
+
+BACKENDS = ("pytorch", "onnx", "openvino")
+MODEL_CACHE_DIR = "model_cache"
+CALIBRATION_IMAGE_PATTERNS = ("*.jpg", "*.jpeg", "*.png", "*.bmp")
+MAX_CALIBRATION_IMAGES = 300
+
+
+class InferenceBackend:
+    """
+    Thin wrapper around an Ultralytics model so the vision loop can call
+    track/predict the same way whichever runtime actually executes the network.
+    """
+    def __init__(self, name, model, imgsz, dynamic, artifact_path):
+        self.name = name
+        self.imgsz = imgsz
+        self.dynamic = dynamic # True when the network accepts input sizes other than imgsz
+        self.artifact_path = artifact_path
+        self.__model = model
+
+    def track(self, frame, imgsz=None, **kwargs):
+        return self.__model.track(frame, imgsz=self.__input_size(imgsz), **kwargs)
+
+    def predict(self, frame, imgsz=None, **kwargs):
+        return self.__model.predict(frame, imgsz=self.__input_size(imgsz), **kwargs)
+
+    def warm_up(self, frame_shape=(720, 960, 3), runs=3):
+        """Runs a few dummy frames so graph compilation and allocator growth happen before takeoff."""
+        dummy = np.zeros(frame_shape, dtype=np.uint8)
+        start = perf_counter()
+        for _ in range(runs):
+            self.predict(dummy, verbose=False)
+        print(f"Inference backend '{self.name}' warmed up in {perf_counter() - start:.2f}s")
+
+    def __input_size(self, imgsz):
+        if imgsz is None or not self.dynamic:
+            return self.imgsz
+        return imgsz
+
+
+def file_hash(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cached_artifact_path(weights, backend, imgsz, int8=False, dynamic=False, cache_dir=MODEL_CACHE_DIR):
+    """Path of the exported model for this weights file and export settings."""
+    stem = os.path.splitext(os.path.basename(weights))[0]
+    key = f"{stem}-{file_hash(weights)[:12]}-{imgsz}"
+    if int8:
+        key += "-int8"
+    if dynamic:
+        key += "-dynamic"
+
+    if backend == "onnx":
+        return os.path.join(cache_dir, f"{key}.onnx")
+    # Ultralytics recognizes OpenVINO models by this directory suffix
+    return os.path.join(cache_dir, f"{key}_openvino_model")
+
+
+def calibration_images(calibration_dir):
+    paths = []
+    for pattern in CALIBRATION_IMAGE_PATTERNS:
+        paths.extend(glob.glob(os.path.join(calibration_dir, pattern)))
+    return sorted(paths)[:MAX_CALIBRATION_IMAGES]
+
+
+def load_backend(backend="pytorch", weights="yolo11n-pose.pt", imgsz=640, int8=False,
+                 calibration_dir=None, dynamic=False, cache_dir=MODEL_CACHE_DIR, warm_up=True):
+    """
+    Loads the pose model on the requested runtime, exporting it on first use.
+
+    Exported artifacts are cached under cache_dir keyed by the weights hash, input
+    size and export options, so later runs load them directly. INT8 needs a folder
+    of representative frames in calibration_dir.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{backend}', expected one of {BACKENDS}")
+    if int8 and not calibration_dir:
+        raise ValueError("INT8 quantization needs a calibration_dir of sample frames")
+
+    if backend == "pytorch":
+        inference_backend = InferenceBackend(backend, YOLO(weights), imgsz, True, weights)
+    else:
+        artifact = cached_artifact_path(weights, backend, imgsz, int8, dynamic, cache_dir)
+        if os.path.exists(artifact):
+            print(f"Using cached {backend} model: {artifact}")
+        else:
+            os.makedirs(cache_dir, exist_ok=True)
+            if backend == "onnx":
+                export_onnx(weights, artifact, imgsz, int8, calibration_dir, dynamic)
+            else:
+                export_openvino(weights, artifact, imgsz, int8, calibration_dir, dynamic)
+        inference_backend = InferenceBackend(backend, YOLO(artifact, task="pose"), imgsz, dynamic, artifact)
+
+    if warm_up:
+        inference_backend.warm_up()
+    return inference_backend
+
+
+def export_onnx(weights, artifact, imgsz, int8, calibration_dir, dynamic):
+    print(f"Exporting {weights} to ONNX (imgsz={imgsz}, int8={int8})")
+    exported = YOLO(weights).export(format="onnx", imgsz=imgsz, dynamic=dynamic, simplify=True)
+    if not int8:
+        shutil.move(exported, artifact)
+        return
+
+    # Ultralytics only quantizes ONNX through other formats, so use ONNX Runtime's static quantizer
+    from onnxruntime.quantization import QuantFormat, QuantType, quantize_static
+    quantize_static(exported, artifact, _OnnxCalibrationReader(exported, calibration_dir, imgsz),
+                    quant_format=QuantFormat.QDQ, activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8)
+    os.remove(exported)
+
+
+def export_openvino(weights, artifact, imgsz, int8, calibration_dir, dynamic):
+    print(f"Exporting {weights} to OpenVINO (imgsz={imgsz}, int8={int8})")
+    data = None
+    if int8:
+        data = _write_calibration_dataset(calibration_dir)
+    try:
+        exported = YOLO(weights).export(format="openvino", imgsz=imgsz, int8=int8, data=data, dynamic=dynamic)
+    finally:
+        if data:
+            os.remove(data)
+    if os.path.exists(artifact):
+        shutil.rmtree(artifact)
+    shutil.move(exported, artifact)
+
+
+def _write_calibration_dataset(calibration_dir):
+    """Ultralytics takes its INT8 calibration frames from a dataset yaml, so point one at the folder."""
+    path = os.path.join(calibration_dir, "calibration.yaml")
+    dataset = {
+        "path": os.path.abspath(calibration_dir),
+        "train": ".",
+        "val": ".",
+        "names": {0: "person"},
+        "kpt_shape": [17, 3],
+    }
+    with open(path, "w") as f:
+        yaml.safe_dump(dataset, f)
+    return path
+
+
+def letterbox(image, imgsz):
+    """Resizes keeping aspect ratio and pads to a square imgsz input, like Ultralytics does."""
+    height, width = image.shape[:2]
+    scale = min(imgsz / height, imgsz / width)
+    resized = cv2.resize(image, (int(round(width * scale)), int(round(height * scale))), interpolation=cv2.INTER_LINEAR)
+    padded = np.full((imgsz, imgsz, 3), 114, dtype=np.uint8)
+    top = (imgsz - resized.shape[0]) // 2
+    left = (imgsz - resized.shape[1]) // 2
+    padded[top:top + resized.shape[0], left:left + resized.shape[1]] = resized
+    return padded
+
+
+class _OnnxCalibrationReader:
+    """Feeds letterboxed calibration frames to onnxruntime's static quantizer."""
+    def __init__(self, model_path, calibration_dir, imgsz):
+        import onnxruntime
+        session = onnxruntime.InferenceSession(model_path, providers=["CPUExecutionProvider"])
+        self.__input_name = session.get_inputs()[0].name
+        self.__paths = iter(calibration_images(calibration_dir))
+        self.__imgsz = imgsz
+
+    def get_next(self):
+        for path in self.__paths:
+            image = cv2.imread(path)
+            if image is None:
+                continue
+            blob = letterbox(image, self.__imgsz)[:, :, ::-1].transpose(2, 0, 1)
+            blob = np.ascontiguousarray(blob, dtype=np.float32)[None] / 255.0
+            return {self.__input_name: blob}
+        return None
@@ -0,0 +1,116 @@
+import threading
+
+# (imgsz, stride, max_det) from best quality to cheapest. stride N means only every Nth new frame
+# is inferred; max_det caps how many people NMS and the tracker have to carry per frame.
+DEFAULT_LEVELS = [
+    (640, 1, 10),
+    (512, 1, 10),
+    (416, 1, 5),
+    (320, 1, 5),
+    (320, 2, 3),
+    (256, 2, 3),
+    (256, 3, 1),
+]
+
+
+class InferenceGovernor:
+    """
+    Holds the vision loop to a latency budget by stepping through a ladder of
+    cheaper inference settings when frames come out late, and back up once
+    there is comfortable headroom again.
+
+    Latency is smoothed with an EWMA and a level change needs several
+    consecutive samples past a threshold plus a cooldown, so one slow frame
+    does not make the settings oscillate. max_imgsz caps the ladder at the
+    input size the model was configured with, so it never steps above it.
+    """
+    def __init__(self, budget_ms, levels=DEFAULT_LEVELS, allow_resize=True, max_imgsz=None, smoothing=0.2,
+                 upgrade_ratio=0.6, degrade_samples=5, upgrade_samples=30, cooldown_samples=15):
+        self.budget_ms = budget_ms
+        self.smoothing = smoothing
+        self.upgrade_ratio = upgrade_ratio
+        self.degrade_samples = degrade_samples
+        self.upgrade_samples = upgrade_samples
+        self.cooldown_samples = cooldown_samples
+
+        if max_imgsz is not None:
+            levels = [(min(imgsz, max_imgsz), stride, max_det) for imgsz, stride, max_det in levels]
+        if not allow_resize:
+            # static-shape models ignore imgsz, so only stride and max_det can change
+            levels = [(levels[0][0], stride, max_det) for _, stride, max_det in levels]
+        self.__levels = list(dict.fromkeys(levels))
+        self.__lock = threading.Lock()
+        self.__level = 0
+        self.__latency_ms = None
+        self.__over = 0
+        self.__under = 0
+        self.__cooldown = 0
+        self.__frames = 0
+        self.changes = 0
+
+    @property
+    def imgsz(self):
+        return self.__levels[self.__level][0]
+
+    @property
+    def stride(self):
+        return self.__levels[self.__level][1]
+
+    @property
+    def max_det(self):
+        return self.__levels[self.__level][2]
+
+    def should_infer(self):
+        """Called for every new frame; False means skip it to honour the current stride."""
+        self.__frames += 1
+        return self.__frames % self.stride == 0
+
+    def record(self, latency_ms):
+        """Feeds one frame's capture-to-result latency and adjusts the level if needed."""
+        with self.__lock:
+            if self.__latency_ms is None:
+                self.__latency_ms = latency_ms
+            else:
+                self.__latency_ms += self.smoothing * (latency_ms - self.__latency_ms)
+
+            if self.__cooldown > 0:
+                self.__cooldown -= 1
+                return
+
+            if self.__latency_ms > self.budget_ms:
+                self.__over += 1
+                self.__under = 0
+            elif self.__latency_ms < self.budget_ms * self.upgrade_ratio:
+                self.__under += 1
+                self.__over = 0
+            else:
+                self.__over = 0
+                self.__under = 0
+
+            if self.__over >= self.degrade_samples and self.__level < len(self.__levels) - 1:
+                self.__change_level(self.__level + 1)
+            elif self.__under >= self.upgrade_samples and self.__level > 0:
+                self.__change_level(self.__level - 1)
+
+    def settings(self):
+        with self.__lock:
+            imgsz, stride, max_det = self.__levels[self.__level]
+            return {
+                "level": self.__level,
+                "imgsz": imgsz,
+                "stride": stride,
+                "max_det": max_det,
+                "latency_ms": round(self.__latency_ms or 0.0, 1),
+                "budget_ms": self.budget_ms,
+            }
+
+    def __change_level(self, level):
+        direction = "Degrading" if level > self.__level else "Upgrading"
+        self.__level = level
+        self.__over = 0
+        self.__under = 0
+        self.__cooldown = self.cooldown_samples
+        self.changes += 1
+        imgsz, stride, max_det = self.__levels[level]
+        print(f"GOVERNOR: {direction} to level {level} (imgsz={imgsz}, stride={stride}, max_det={max_det}), "
+              f"latency {self.__latency_ms:.0f}ms vs budget {self.budget_ms}ms")
@@ -0,0 +1,109 @@
+import threading
+from collections import deque
+from time import monotonic, time
+
+
+class KeyframeTrigger:
+    """
+    Picks out frames worth a memory update from what the vision pipeline
+    already detects, so the memory thread hears about a new person the frame
+    they show up instead of on its next poll.
+
+    A frame is a keyframe when a track ID appears that has not been seen
+    before, or when a tracked person has gone unseen for leave_after seconds
+    and leave_passes results. Results without track IDs fall back to the
+    number of people, which must hold for min_frames frames before it counts
+    as changed. Only full-frame results should be passed in: crop passes and
+    flow only see the target. Follow mode runs those between full-frame
+    passes that can be seconds apart, hence leave_passes as well as time.
+
+    update() runs on the vision side and queues keyframes for the memory
+    thread, which takes several at once with wait() when it is ready. A
+    keyframe within min_interval of the last one queued replaces it, and
+    past max_pending the oldest is dropped.
+    """
+    def __init__(self, copy=None, leave_after=3.0, leave_passes=3, min_frames=5, min_interval=1.0, max_pending=8):
+        self.copy = copy if copy is not None else (lambda frame: frame.copy())
+        self.leave_after = leave_after
+        self.leave_passes = leave_passes
+        self.min_frames = min_frames
+        self.min_interval = min_interval
+        self.__condition = threading.Condition()
+        self.__pending = deque(maxlen=max_pending)  # (frame, reasons, wall-clock time), oldest first
+        self.__queued_at = None
+        self.__last_seen = {}     # track ID -> (monotonic time, update number)
+        self.__updates = 0
+        self.__count = 0
+        self.__candidate_count = 0
+        self.__candidate_frames = 0
+
+        self.events = {"new_track": 0, "track_left": 0, "count_changed": 0}
+        self.keyframes = 0
+        self.coalesced = 0
+        self.dropped = 0
+
+    def update(self, frame, pose_frame, now=None):
+        """Checks one pipeline result. Returns the reasons it is a keyframe, or an empty list."""
+        now = monotonic() if now is None else now
+        reasons = []
+        self.__updates += 1
+        if pose_frame is not None and pose_frame.track_ids is not None:
+            for track_id in pose_frame.track_ids.tolist():
+                if track_id not in self.__last_seen:
+                    reasons.append("new_track")
+                self.__last_seen[track_id] = (now, self.__updates)
+        else:
+            reasons += self.__count_change(len(pose_frame) if pose_frame is not None else 0)
+        for track_id, (seen, seen_update) in list(self.__last_seen.items()):
+            if now - seen > self.leave_after and self.__updates - seen_update >= self.leave_passes:
+                del self.__last_seen[track_id]
+                reasons.append("track_left")
+        if not reasons:
+            return reasons
+
+        for reason in reasons:
+            self.events[reason] += 1
+        reasons = list(dict.fromkeys(reasons))
+        # the control stage draws on the frame after this
+        keyframe = self.copy(frame)
+        with self.__condition:
+            if self.__pending and now - self.__queued_at < self.min_interval:
+                _, queued_reasons, _ = self.__pending.pop()
+                reasons = queued_reasons + [reason for reason in reasons if reason not in queued_reasons]
+                self.coalesced += 1
+            else:
+                if len(self.__pending) == self.__pending.maxlen:
+                    self.dropped += 1
+                self.__queued_at = now
+            self.__pending.append((keyframe, reasons, time()))
+            self.__condition.notify_all()
+        return reasons
+
+    def wait(self, timeout, max_count=1):
+        """
+        Waits up to timeout seconds for keyframes. Returns up to max_count of them, oldest first,
+        as (frame, reasons, wall-clock time); an empty list when none came.
+        """
+        with self.__condition:
+            self.__condition.wait_for(lambda: self.__pending, timeout)
+            batch = [self.__pending.popleft() for _ in range(min(max_count, len(self.__pending)))]
+        self.keyframes += len(batch)
+        return batch
+
+    def summary(self):
+        events = ", ".join(f"{count} {event}" for event, count in self.events.items())
+        return f"{self.keyframes} keyframes ({events}, {self.coalesced} coalesced, {self.dropped} dropped)"
+
+    def __count_change(self, count):
+        if count == self.__count:
+            self.__candidate_frames = 0
+            return []
+        if count != self.__candidate_count:
+            self.__candidate_count = count
+            self.__candidate_frames = 0
+        self.__candidate_frames += 1
+        if self.__candidate_frames < self.min_frames:
+            return []
+        self.__count = count
+        self.__candidate_frames = 0
+        return ["count_changed"]
@@ -0,0 +1,120 @@
+from time import monotonic
+
+import cv2
+import numpy as np
+
+from pose_processing import MIN_DRAW_CONFIDENCE, PoseFrame
+from target_lock import xywh_to_xyxy
+
+KEYPOINT_COUNT = 17
+MIN_TRACKED_KEYPOINTS = 3
+
+
+class KeypointFlow:
+    """
+    Carries the follow target's keypoints and box corners from one frame to
+    the next with pyramidal Lucas-Kanade optical flow, so the controller gets
+    a measurement for every camera frame while YOLO only runs now and then.
+
+    Each point is checked by flowing it back again; points that do not return
+    within max_fb_error pixels are dropped. The track confidence decays every
+    frame and is capped by the share of points that survived the last step.
+    Keypoint confidences are scaled by it, so weak points fall below the
+    visibility threshold on their own. Below redetect_confidence, or after
+    max_age seconds, a new detection is requested; below min_confidence the
+    track is dropped.
+    """
+    def __init__(self, win_size=21, max_level=3, decay=0.97, redetect_confidence=0.6, min_confidence=0.3,
+                 max_fb_error=2.0, max_age=0.5):
+        self.win_size = (win_size, win_size)
+        self.max_level = max_level
+        self.decay = decay
+        self.redetect_confidence = redetect_confidence
+        self.min_confidence = min_confidence
+        self.max_fb_error = max_fb_error
+        self.max_age = max_age
+
+        self.tracked_frames = 0
+        self.lost_tracks = 0
+        self.reset()
+
+    def reset(self):
+        self.confidence = 0.0
+        self.__gray = None
+        self.__points = None          # (21, 2): 17 keypoints then 4 box corners
+        self.__alive = None
+        self.__keypoint_confidence = None
+        self.__box = None             # xyxy
+        self.__track_id = None
+        self.__anchored_at = None
+
+    @property
+    def active(self):
+        return self.__gray is not None
+
+    def needs_detection(self):
+        """True when the next frame should get a YOLO pass."""
+        return (not self.active or self.confidence < self.redetect_confidence
+                or monotonic() - self.__anchored_at > self.max_age)
+
+    @staticmethod
+    def gray(frame):
+        """Converted once per frame, then used as flow destination and, on the next frame, as source."""
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+    def start(self, gray, pose_frame, target_index):
+        """Anchors the track on a detection made in the frame this grayscale image came from."""
+        keypoints = pose_frame.keypoints[target_index]
+        x1, y1, x2, y2 = xywh_to_xyxy(pose_frame.boxes[target_index])
+        corners = np.array([[x1, y1], [x2, y1], [x1, y2], [x2, y2]], dtype=np.float32)
+        self.__points = np.vstack([keypoints[:, :2].astype(np.float32), corners])
+        self.__alive = np.concatenate([keypoints[:, 2] > MIN_DRAW_CONFIDENCE, np.ones(4, dtype=bool)])
+        self.__keypoint_confidence = keypoints[:, 2].copy()
+        self.__box = np.array([x1, y1, x2, y2], dtype=np.float32)
+        self.__track_id = None if pose_frame.track_ids is None else pose_frame.track_ids[target_index:target_index + 1]
+        self.__gray = gray
+        self.__anchored_at = monotonic()
+        self.confidence = 1.0
+
+    def track(self, gray):
+        """Moves the track onto a new frame. Returns (pose_frame, 0) for the target, or (None, None) once lost."""
+        if not self.active:
+            return None, None
+        alive = np.flatnonzero(self.__alive)
+        points = self.__points[alive].reshape(-1, 1, 2)
+        moved, status, _ = cv2.calcOpticalFlowPyrLK(self.__gray, gray, points, None,
+                                                    winSize=self.win_size, maxLevel=self.max_level)
+        returned, back_status, _ = cv2.calcOpticalFlowPyrLK(gray, self.__gray, moved, None,
+                                                            winSize=self.win_size, maxLevel=self.max_level)
+        fb_error = np.linalg.norm(points - returned, axis=2).ravel()
+        good = (status.ravel() == 1) & (back_status.ravel() == 1) & (fb_error < self.max_fb_error)
+
+        moved = moved.reshape(-1, 2)
+        if good.any():
+            shift = np.median(moved[good] - points.reshape(-1, 2)[good], axis=0)
+        self.__points[alive[good]] = moved[good]
+        self.__alive[alive[~good]] = False
+        self.__gray = gray
+        self.confidence = min(self.confidence * self.decay, float(good.mean()) if len(good) else 0.0)
+
+        if self.confidence < self.min_confidence or self.__alive[:KEYPOINT_COUNT].sum() < MIN_TRACKED_KEYPOINTS:
+            self.lost_tracks += 1
+            self.reset()
+            return None, None
+
+        if self.__alive[KEYPOINT_COUNT:].all():
+            corners = self.__points[KEYPOINT_COUNT:]
+            self.__box = np.concatenate([corners.min(axis=0), corners.max(axis=0)])
+        else:
+            self.__box += np.tile(shift, 2)
+        self.tracked_frames += 1
+        return self.__pose_frame(), 0
+
+    def __pose_frame(self):
+        keypoints = np.zeros((KEYPOINT_COUNT, 3), dtype=np.float32)
+        keypoints[:, :2] = self.__points[:KEYPOINT_COUNT]
+        alive = self.__alive[:KEYPOINT_COUNT]
+        keypoints[:, 2] = np.where(alive, self.__keypoint_confidence * self.confidence, 0.0)
+        x1, y1, x2, y2 = self.__box
+        box = np.array([[(x1 + x2) / 2, (y1 + y2) / 2, x2 - x1, y2 - y1]], dtype=np.float32)
+        return PoseFrame(box, keypoints[None], self.__track_id, full_frame=False)
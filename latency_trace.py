@@ -0,0 +1,161 @@
+import json
+import math
+import os
+import threading
+from time import monotonic
+
+# Stamps a frame collects on its way from arrival to an rc command, in pipeline order.
+# Each stage's duration is measured from the previous stamp the frame actually has.
+# rc_queued is when the setpoint is handed to the Tello I/O rc lane; the lane's own
+# setpoint-to-wire time is in its rtt figures.
+STAMPS = ("arrival", "converted", "inference_start", "inferred", "processed", "rc_queued")
+STAGE_NAMES = {
+    "converted": "convert",
+    "inference_start": "queue",
+    "inferred": "inference",
+    "processed": "process",
+    "rc_queued": "queue_rc",
+}
+PERCENTILES = (0.5, 0.95, 0.99)
+STAGE_ROWS = {stage: row for row, stage in enumerate(STAGE_NAMES.values(), start=1)}
+
+
+class FrameTrace:
+    """Monotonic timestamps for one frame, keyed by stamp name."""
+    def __init__(self, seq, arrival=None):
+        self.seq = seq
+        self.stamps = {"arrival": monotonic() if arrival is None else arrival}
+
+    @property
+    def arrival(self):
+        return self.stamps["arrival"]
+
+    def mark(self, stamp, at=None):
+        self.stamps[stamp] = monotonic() if at is None else at
+
+    def age_ms(self):
+        return (monotonic() - self.arrival) * 1000
+
+
+class LatencyHistogram:
+    """Log-bucketed histogram of milliseconds; percentiles are accurate to about the bucket growth."""
+    def __init__(self, growth=1.05, min_ms=0.01):
+        self.__log_growth = math.log(growth)
+        self.__min_ms = min_ms
+        self.__buckets = {}
+        self.count = 0
+        self.max = 0.0
+
+    def add(self, ms):
+        bucket = int(math.log(max(ms, self.__min_ms) / self.__min_ms) / self.__log_growth)
+        self.__buckets[bucket] = self.__buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.max = max(self.max, ms)
+
+    def percentile(self, q):
+        if not self.count:
+            return float("nan")
+        target = q * self.count
+        seen = 0
+        for bucket in sorted(self.__buckets):
+            seen += self.__buckets[bucket]
+            if seen >= target:
+                # upper edge of the bucket, so the estimate errs on the slow side
+                return self.__min_ms * math.exp((bucket + 1) * self.__log_growth)
+        return self.max
+
+
+class LatencyTracer:
+    """
+    Aggregates finished FrameTraces into per-stage and end-to-end histograms,
+    and optionally writes them as a Chrome trace-event file that opens in
+    chrome://tracing or Perfetto.
+    """
+    def __init__(self, trace_path=None):
+        self.__lock = threading.Lock()
+        self.__histograms = {}
+        self.__pending_events = []
+        self.__trace_file = None
+        self.__first_event = True
+        if trace_path:
+            os.makedirs(os.path.dirname(trace_path) or ".", exist_ok=True)
+            self.__trace_file = open(trace_path, "w")
+            self.__trace_file.write("[\n")
+            # name one viewer row per stage
+            self.__pending_events = [
+                {"name": "thread_name", "ph": "M", "pid": 1, "tid": row, "args": {"name": stage}}
+                for stage, row in STAGE_ROWS.items()
+            ]
+
+    def finish(self, trace):
+        """Records a frame whose last stamp has been set."""
+        previous_stamp = "arrival"
+        events = []
+        with self.__lock:
+            for stamp in STAMPS[1:]:
+                if stamp not in trace.stamps:
+                    continue
+                start = trace.stamps[previous_stamp]
+                end = trace.stamps[stamp]
+                stage = STAGE_NAMES[stamp]
+                self.__add(stage, (end - start) * 1000)
+                if self.__trace_file is not None:
+                    events.append(_trace_event(stage, start, end, trace.seq))
+                previous_stamp = stamp
+
+            last = trace.stamps[previous_stamp]
+            self.__add("end_to_end", (last - trace.arrival) * 1000)
+            if "rc_queued" in trace.stamps:
+                self.__add("arrival_to_rc_queued", (trace.stamps["rc_queued"] - trace.arrival) * 1000)
+            self.__pending_events.extend(events)
+
+    def record(self, name, ms):
+        """Adds one measurement to a histogram, for stages that run outside a FrameTrace."""
+        with self.__lock:
+            self.__add(name, ms)
+
+    def summary(self):
+        with self.__lock:
+            lines = []
+            for name, histogram in self.__histograms.items():
+                quantiles = " ".join(f"p{int(q * 100)}={histogram.percentile(q):.1f}" for q in PERCENTILES)
+                lines.append(f"{name}: {quantiles} max={histogram.max:.1f}ms n={histogram.count}")
+            return "\n".join(lines)
+
+    def flush(self):
+        """Writes buffered trace events; called off the frame path."""
+        with self.__lock:
+            events, self.__pending_events = self.__pending_events, []
+        if self.__trace_file is None or not events:
+            return
+        for event in events:
+            if not self.__first_event:
+                self.__trace_file.write(",\n")
+            self.__trace_file.write(json.dumps(event))
+            self.__first_event = False
+        self.__trace_file.flush()
+
+    def close(self):
+        self.flush()
+        if self.__trace_file is not None:
+            self.__trace_file.write("\n]\n")
+            self.__trace_file.close()
+            self.__trace_file = None
+
+    def __add(self, name, ms):
+        histogram = self.__histograms.get(name)
+        if histogram is None:
+            histogram = self.__histograms[name] = LatencyHistogram()
+        histogram.add(ms)
+
+
+def _trace_event(stage, start, end, seq):
+    return {
+        "name": stage,
+        "ph": "X",
+        "ts": start * 1e6,
+        "dur": (end - start) * 1e6,
+        "pid": 1,
+        "tid": STAGE_ROWS[stage],
+        "args": {"seq": seq},
+    }
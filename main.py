@@ -4,11 +4,10 @@ import threading
 import json
 import warnings
 import multiprocessing
-from time import sleep
+import signal
+from time import sleep, monotonic
 from datetime import datetime, timedelta
 
-from simple_pid import PID
-from ultralytics import YOLO
 # from pygame.locals import *
 from djitellopy import Tello
 with warnings.catch_warnings(action="ignore"):
@@ -18,64 +17,138 @@ from textToCommand import TextToCommand
 from tts2 import play_text_to_speech
 from window import CWMManager
 from DeviceControllers import Radio
+from vision_pipeline import LatestSlot, PipelineStats, LagProbe
+from latency_trace import FrameTrace, LatencyTracer
+from inference_backends import load_backend
+from pose_processing import extract_poses, select_largest, measure_target, draw_target
+from target_lock import TargetLock
+from inference_governor import InferenceGovernor
+from preview_server import PreviewServer
+from console_keys import ConsoleKeyReader, ESC
+from flight_recorder import FlightRecorder
+from vision_process import VisionProcess
+from follow_controller import FollowController, FollowLoop
+from tello_io import TelloIO
+from gesture_recognizer import GESTURE_COMMANDS, GestureRecognizer
+from fleet import BatchScheduler, CommandFanout, FleetStream
+from keypoint_flow import KeypointFlow
+from safety_monitor import SafetyMonitor
+from frame_pool import FramePool
+from frame_novelty import FrameNovelty
+from keyframe_trigger import KeyframeTrigger
+from memory_history import MemoryHistory, parse_time_window
+from stream_replay import ReplayTello
 
 flight_mode = None
 
 # --- Configuration (These are safe in global scope) ---
-ttc_manager = TextToCommand()
-model = YOLO("yolo11n-pose.pt")
+# ttc_manager and model are created in __main__ so a spawned vision process does not repeat them
+
+# --- Inference Backend ---
+INFERENCE_BACKEND = "pytorch" # "pytorch", "onnx" or "openvino"; exported models are cached in model_cache/
+INFERENCE_IMGSZ = 640
+INFERENCE_INT8 = False # needs INFERENCE_CALIBRATION_DIR, a folder of representative drone frames
+INFERENCE_CALIBRATION_DIR = None
+INFERENCE_DYNAMIC = False # export with dynamic input shapes so imgsz can change at runtime
+INFERENCE_WEIGHTS = "yolo11n-pose.pt"
+
+# --- Replay ---
+REPLAY_CLIP = None # folder recorded with stream_replay.py; replays it instead of connecting to a Tello
+
+# --- Vision Process ---
+VISION_PROCESS_ENABLED = False # decode and infer in a separate process, sharing frames through shared memory
+VISION_FRAME_SHAPE = (720, 960, 3) # Tello camera frames; the shared-memory ring is sized for this
+VISION_RING_SLOTS = 8
 
 # --- Event to signal threads to stop (Safe in global scope) ---
 stop_event = threading.Event()
 
+# --- Vision Pipeline ---
+CAPTURE_POLL_INTERVAL = 0.002 # seconds to wait before re-reading when no new frame has been decoded
+STAGE_WAIT_TIMEOUT = 0.5 # how long a stage waits on its input slot before re-checking stop_event
+DISPLAY_WAIT_TIMEOUT = 0.03 # kept short so cv2.waitKey still pumps the window while idle
+STATS_PRINT_INTERVAL = 10 # seconds between vision pipeline counter printouts
+TRACE_FILE = None # e.g. "traces/vision.json"; per-frame stage timings for chrome://tracing or Perfetto
+LATENCY_BUDGET_MS = 120 # capture-to-result latency the inference governor tries to hold
+HEADLESS = False # True removes every OpenCV window call; stop with ESC in the terminal, Ctrl+C or SIGTERM
+FRAME_POOL_ENABLED = True # convert frames into reused buffers; False allocates per frame, to compare RSS and allocation rate
+FRAME_POOL_MAX_BUFFERS = 48
+
+# --- Preview Server (MJPEG over HTTP, encoded only while a client is watching) ---
+PREVIEW_SERVER_ENABLED = False
+PREVIEW_PORT = 8080
+PREVIEW_FPS = 10
+PREVIEW_SCALE = 0.5
+PREVIEW_JPEG_QUALITY = 70
+
+# --- Flight Recorder ---
+RECORDING_ENABLED = False
+RECORDING_DIR = "recordings"
+RECORDING_SEGMENT_SECONDS = 60
+RECORDING_MAX_DISK_MB = 4000 # oldest segments are deleted beyond this
+RECORDING_OVERLAY = False # also write a video of the annotated frames
+
+# --- Follow Mode Target Lock ---
+TARGET_LOCK_ENABLED = True
+ROI_IMGSZ = 320 # input size for crop passes; only takes effect on backends with dynamic input shapes
+ROI_REACQUIRE_INTERVAL = 15 # crop passes between full-frame re-acquisition passes
+ROI_MAX_MISSES = 5 # consecutive misses before the lock is dropped and the largest person is picked again
+ROI_PADDING = 0.6 # crop margin around the last box, as a fraction of its size on each side
+
+# --- Keypoint Flow ---
+KEYPOINT_FLOW_ENABLED = True # in follow mode, carry the target forward with optical flow and run YOLO only when needed
+FLOW_REDETECT_CONFIDENCE = 0.6 # flow confidence below which the next frame goes to YOLO
+FLOW_MAX_AGE = 0.5 # seconds since the last detection before one is requested however well flow is doing
+FLOW_HISTORY = 8 # grayscale frames kept so a detection is anchored on the frame it was made from
+FLOW_POLL_INTERVAL = 0.005 # the flow stage waits on frames and detections in turn
+
+# --- Fleet ---
+FLEET = [] # fly several drones at once, one entry each, e.g. {"name": "alpha", "host": "192.168.1.21", "video_port": 11111}
+FLEET_LATENCY_BUDGET_MS = 150 # per drone, from frame arrival to inference result, including waiting for a batch
+FLEET_MAX_BATCH = None # most frames per inference call; None batches every drone together
+
+# --- Gestures ---
+GESTURES_ENABLED = True # both hands above the head lands, one arm held out sideways stops following
+GESTURE_HOLD_SECONDS = 0.6 # how long a gesture must be held before it fires
+GESTURE_COOLDOWN = 3 # seconds after a gesture before another one can fire
+
+# --- Tello I/O ---
+RC_RATE_HZ = 20 # most rc commands sent per second; setpoints in between are coalesced
+KEEP_ALIVE_INTERVAL = 3 # seconds of silence before a keep-alive is sent
+MANEUVER_QUEUE_SIZE = 8
+
+# --- Safety Monitor (checks every Tello state packet while flying) ---
+SAFETY_MONITOR_ENABLED = True
+SAFETY_MIN_TOF_CM = 30 # climbs when the downward time-of-flight distance drops below this
+SAFETY_MAX_HEIGHT_CM = 300 # descends above this
+SAFETY_MIN_BATTERY = 15 # lands below this battery percentage
+SAFETY_MAX_TEMPERATURE = 85 # lands when the hottest sensor goes above this, in C
+
+# --- Memory Updates ---
+MEMORY_KEYFRAME_TRIGGERS = True # update memory when a tracked person appears or leaves, not only on a timer
+MEMORY_KEYFRAME_MIN_INTERVAL = 1 # seconds; keyframes coming faster are merged into the next update
+MEMORY_BACKGROUND_INTERVAL = 10 # seconds between checks of the latest frame when keyframe triggers are on
+MEMORY_UPDATE_INTERVAL = 1 # seconds between checks of the latest frame when they are off
+MEMORY_MIN_CHANGE = 0.08 # drop in structural similarity to the last frame sent that counts as a new scene
+MEMORY_MAX_STALENESS = 30 # seconds after which a frame is sent even if nothing seems to have changed
+MEMORY_IMAGE_FORMAT = "jpeg" # "jpeg" or "webp"; frames are encoded in memory, never written to disk
+MEMORY_IMAGE_QUALITY = 80
+MEMORY_IMAGE_MAX_WIDTH = 640 # frames are scaled down to this width before encoding; None keeps the full 960
+MEMORY_MAX_BATCH = 4 # most keyframes sent as one grid image; the batch grows with gateway latency up to this
+MEMORY_INCREMENTAL = True # the model returns edits to numbered memory entries instead of rewriting the whole memory
+MEMORY_RECONCILE_EVERY = 20 # updates between asking for the complete memory to correct drift; 0 never asks
+
+# --- Memory History (on-disk log of every memory update, for questions about earlier on) ---
+MEMORY_HISTORY_DIR = "memory_history" # None keeps no history
+MEMORY_HISTORY_SNAPSHOT_EVERY = 20 # edit records between full snapshots; bounds how far back a time window reads
+MEMORY_HISTORY_DURABLE = True # fsync every record, so a crash loses at most the update being written
+
 # --- PID Controllers ---
-pid_cc = PID(0.25, 0.2, 0.2, setpoint=0, output_limits=(-70, 70))
-pid_ud = PID(0.3, 0.3, 0.3, setpoint=0, output_limits=(-80, 80))
-pid_fb = PID(0.35,0.2,0.3, setpoint=0, output_limits=(-50, 50))
-
-# KEYPOINT_DICT = {
-#    0: "nose",
-#    1: "left_eye",
-#    2: "right_eye",
-#    3: "left_ear",
-#    4: "right_ear",
-#    5: "left_shoulder",
-#    6: "right_shoulder",
-#    7: "left_elbow",
-#    8: "right_elbow",
-#    9: "left_wrist",
-#    10: "right_wrist",
-#    11: "left_hip",
-#    12: "right_hip",
-#    13: "left_knee",
-#    14: "right_knee",
-#    15: "left_ankle",
-#    16: "right_ankle",
-# }
-
-# Define connections for drawing the skeleton
-# This is a list of tuples, where each tuple represents a connection between two keypoints (by index)
-POSE_CONNECTIONS = [
-   # Face
-   (0, 1), (0, 2), (1, 3), (2, 4),
-   # Torso
-   (5, 6), (5, 11), (6, 12), (11, 12),
-   # Left Arm
-   (5, 7), (7, 9),
-   # Right Arm
-   (6, 8), (8, 10),
-   # Left Leg
-   (11, 13), (13, 15),
-   # Right Leg
-   (12, 14), (14, 16)
-]
-
-# --- Drawing Parameters ---
-MIN_DRAW_CONFIDENCE = 0.3 # Only draw keypoints/lines if confidence is above this
-POINT_COLOR = (0, 255, 0) # Green for keypoints
-LINE_COLOR = (255, 0, 0)  # Blue for skeleton lines
-POINT_RADIUS = 3
-LINE_THICKNESS = 2
+follow_controller = FollowController()
+FIXED_RATE_CONTROL = True # run the PIDs at CONTROL_RATE_HZ on Kalman-predicted targets instead of once per inferred frame
+CONTROL_RATE_HZ = 30
+TARGET_TIMEOUT = 0.6 # seconds without a detection before the follow loop treats the target as lost
+MAX_PREDICTION = 0.5 # seconds the target is extrapolated past its last detection
 
 # Drone control inputs
 drone_cc = 0
@@ -83,130 +156,578 @@ drone_ud = 0
 drone_fb = 0
 
 # FOR FOLLOW MODE
-def process_frame(results, overlay_image):
+def measure_frame(pose_frame, target_index, overlay_image, draw_overlay=True):
+    """Computes the follow error terms for the target in this frame, or None if there is no target."""
+    if pose_frame is None or target_index is None:
+        return None
+    target = measure_target(pose_frame.keypoints[target_index], overlay_image.shape)
+    if draw_overlay:
+        draw_target(overlay_image, target)
+    return target
+
+def process_frame(pose_frame, target_index, overlay_image, draw_overlay=True):
     """Processes a single frame for pose estimation and control updates."""
-    global drone_cc, drone_ud, drone_fb, pid_cc, pid_ud, pid_fb
-    # image = cv2.resize(image, (640, 480))
-    
-    # Run YOLO Pose Estimation
-    # results = model(image, stream=False, verbose=False)
-    
-    largest_person_area = 0
-    largest_person_keypoints = None
-    if results:
-        if results[0].keypoints and results[0].boxes:
-            for i in range(len(results[0].keypoints.xy)):
-                area = (results[0].boxes.xywh[i][2] * results[0].boxes.xywh[i][3]).item()
-                if area > largest_person_area:
-                    largest_person_area = area
-                    largest_person_keypoints = results[0].keypoints.data[i]
-                
-
-    if largest_person_keypoints is not None:
-        kpts = largest_person_keypoints.cpu().numpy()
-        sees_body = False
-        for i in range(kpts.shape[0]): # Iterate through all 17 keypoints
-           x, y, conf = kpts[i]
-           if conf > MIN_DRAW_CONFIDENCE:
-               if i >= 6:
-                   sees_body=True
-               cv2.circle(overlay_image, (int(x), int(y)), POINT_RADIUS, POINT_COLOR, -1) # -1 means fill the circle
-
-
-        centerx = int(overlay_image.shape[1] / 2)
-        centery = int(overlay_image.shape[0] / 3)
-        
-        nosex, nosey, nose_conf = kpts[0]
-        if nose_conf > MIN_DRAW_CONFIDENCE:
-            cv2.line(overlay_image, (centerx, centery - 10), (int(nosex), int(nosey)), (255, 255, 0), 2)
-            errorx = nosex - centerx
-            errory = (centery - 10) - nosey
-            drone_cc = int(pid_cc(errorx)) if abs(errorx) > 20 else 0
-            drone_ud = int(pid_ud(errory)) if abs(errory) > 20 else 0
-        else:
-            if sees_body:
-                drone_ud=-50
-                print("moving up")
+    global drone_cc, drone_ud, drone_fb
+    target = measure_frame(pose_frame, target_index, overlay_image, draw_overlay)
+    drone_cc, drone_ud, drone_fb = follow_controller.update(target)
+
+def capture_stage(frame_read, frame_slot, last_frame, recorder, frame_pool, stats):
+    """
+    Pulls decoded frames from the Tello and stamps each new one with a sequence number.
+    BackgroundFrameRead hands back the same array until a new frame is decoded, so
+    repeated reads are skipped instead of being inferred twice. Frames are converted
+    into buffers from the frame pool, which get them back once every stage has let go.
+    """
+    print("Capture stage started")
+    seq = 0
+    previous_raw = None
+    while not stop_event.is_set():
+        try:
+            raw = frame_read.frame
+            if raw is None or raw is previous_raw:
+                stats.increment("idle_polls") # polls that found no new frame, not frames
+                sleep(CAPTURE_POLL_INTERVAL)
+                continue
+            previous_raw = raw
+            seq += 1
+            trace = FrameTrace(seq)
+
+            frame = cv2.cvtColor(raw, cv2.COLOR_RGB2BGR, dst=frame_pool.acquire(raw.shape)) # convert from RGB to BGR
+            trace.mark("converted")
+            stats.increment("captured")
+            with thread_lock: # Acquire lock to safely write to shared memory
+                last_frame["frame"] = frame
+            if recorder is not None:
+                recorder.record_frame(seq, frame, trace.arrival)
+            frame_slot.put(seq, (frame, trace))
+        except Exception as e:
+            # This will catch the decoding errors and others
+            print(f"Skipping a bad frame in capture_stage: {e}")
+            continue
+    print("Capture stage finished")
+
+def inference_stage(frame_slot, result_slot, drone_state, governor, target_lock, stats):
+    """
+    Runs YOLO on the newest captured frame, skipping any that arrived while busy.
+    In follow mode the target lock decides between a full-frame pass and a crop around the target,
+    and the governor picks input size, stride and max_det to stay within the latency budget.
+    """
+    print("Inference stage started")
+    seq = 0
+    while not stop_event.is_set():
+        try:
+            seq, item = frame_slot.get(seq, timeout=STAGE_WAIT_TIMEOUT)
+            if item is None:
+                continue
+            frame, trace = item
+            if not governor.should_infer():
+                stats.increment("stride_skipped")
+                continue
+
+            with thread_lock:
+                flight_mode = drone_state["flight_mode"]
+
+            trace.mark("inference_start")
+            if flight_mode == "follow" and TARGET_LOCK_ENABLED:
+                pose_frame, target_index = target_lock.infer(model, frame, imgsz=governor.imgsz, max_det=governor.max_det)
             else:
-                drone_cc, drone_ud = 0, 0
-                pid_cc.reset()
-                pid_ud.reset()
-
-        left_sh_x, _, left_sh_conf = kpts[6]
-        right_sh_x, _, right_sh_conf = kpts[7]
-        if left_sh_conf > MIN_DRAW_CONFIDENCE and right_sh_conf > MIN_DRAW_CONFIDENCE:
-            shoulder_dist = abs(left_sh_x - right_sh_x)
-            desired_dist = 150
-            errorFB = desired_dist - shoulder_dist
-            drone_fb = int(pid_fb(errorFB)) if abs(errorFB) > 25 else 0
+                target_lock.reset()
+                results = model.track(frame, imgsz=governor.imgsz, max_det=governor.max_det, persist=True, verbose=False)
+                pose_frame = extract_poses(results)
+                target_index = select_largest(pose_frame) if pose_frame is not None else None
+            trace.mark("inferred")
+            governor.record((trace.stamps["inferred"] - trace.arrival) * 1000)
+            stats.increment("inferred")
+            result_slot.put(seq, (frame, pose_frame, target_index, trace))
+        except Exception as e:
+            print(f"Skipping a bad frame in inference_stage: {e}")
+            continue
+    print(f"TARGET LOCK: {target_lock.full_passes} full-frame passes, {target_lock.roi_passes} crop passes")
+    print("Inference stage finished")
 
-        else:
-            drone_fb = 0
-            pid_fb.reset()
-    else:
-        drone_cc, drone_ud, drone_fb = 0, 0, 0
-        pid_cc.reset()
-        pid_ud.reset()
-        pid_fb.reset()
+def flow_stage(frame_slot, inference_slot, detection_slot, result_slot, drone_state, keypoint_flow, target_lock, frame_pool, stats):
+    """
+    Sits between capture and inference. In follow mode every frame gets the target carried
+    forward by optical flow, so the controller has a measurement per camera frame, and only
+    frames the flow asks a detection for go on to YOLO. Each detection re-anchors the flow on
+    the frame it was made from, and each flow step moves the target lock's crop along with it.
+    Outside follow mode frames and results pass straight through.
+    """
+    print("Flow stage started")
+    frame_seq = detection_seq = published_seq = 0
+    grays = {} # frame seq -> grayscale frame, for the last FLOW_HISTORY frames
+    while not stop_event.is_set():
+        try:
+            with thread_lock:
+                follow = drone_state["flight_mode"] == "follow"
+            if not follow and keypoint_flow.active:
+                keypoint_flow.reset()
+                grays.clear()
+
+            frame_seq, item = frame_slot.get(frame_seq, timeout=FLOW_POLL_INTERVAL)
+            if item is not None and not follow:
+                inference_slot.put(frame_seq, item)
+            elif item is not None:
+                frame, trace = item
+                gray = keypoint_flow.gray(frame)
+                grays[frame_seq] = gray
+                for old_seq in [seq for seq in grays if seq <= frame_seq - FLOW_HISTORY]:
+                    del grays[old_seq]
+                detecting = keypoint_flow.needs_detection()
+                if detecting:
+                    inference_slot.put(frame_seq, item)
+                    stats.increment("sent_to_inference")
+                if keypoint_flow.active:
+                    # the inference stage has its own trace for this frame
+                    flow_trace = FrameTrace(frame_seq, trace.arrival)
+                    flow_trace.mark("converted", at=trace.stamps["converted"])
+                    flow_trace.mark("inference_start")
+                    pose_frame, target_index = keypoint_flow.track(gray)
+                    flow_trace.mark("inferred")
+                    if pose_frame is not None:
+                        stats.increment("flow_tracked")
+                        target_lock.move(pose_frame.boxes[target_index])
+                        # YOLO may still be reading this frame, and the control stage draws on what it gets
+                        result_slot.put(frame_seq, (frame_pool.copy(frame) if detecting else frame, pose_frame, target_index, flow_trace))
+                        published_seq = frame_seq
+
+            new_detection_seq, detection = detection_slot.get(detection_seq, timeout=0)
+            if detection is None:
+                continue
+            detection_seq = new_detection_seq
+            frame, pose_frame, target_index, _ = detection
+            if follow and target_index is not None:
+                anchor = grays.get(detection_seq)
+                keypoint_flow.start(anchor if anchor is not None else keypoint_flow.gray(frame), pose_frame, target_index)
+            # a detection for a frame flow has already moved past only re-anchors it
+            if detection_seq > published_seq:
+                result_slot.put(detection_seq, detection)
+                published_seq = detection_seq
+        except Exception as e:
+            print(f"Skipping a bad frame in flow_stage: {e}")
+            continue
+    print(f"KEYPOINT FLOW: {keypoint_flow.tracked_frames} frames tracked, {keypoint_flow.lost_tracks} tracks lost")
+    print("Flow stage finished")
 
-def vision_thread(tello, frame_read, last_frame, drone_state):
+def remote_inference_stage(vision_process, tello_io, result_slot, last_frame, drone_state, recorder, frame_pool, stats):
     """
-    Displays video frames received from the control thread.
+    Receives pose results from the vision process and pairs each with its frame from the shared-memory ring.
+    Replaces the capture and inference stages when VISION_PROCESS_ENABLED is set.
+    If the vision process dies, follow mode drops to hover, since no more results will come.
     """
-    print("Vision thread started")
+    print("Remote inference stage started")
+    ring = vision_process.ring
+    reported_dead = False
+    while not stop_event.is_set():
+        try:
+            with thread_lock:
+                follow = drone_state["flight_mode"] == "follow"
+            if follow != vision_process.follow_event.is_set():
+                if follow:
+                    vision_process.follow_event.set()
+                else:
+                    vision_process.follow_event.clear()
+
+            message, skipped = vision_process.receive(timeout=STAGE_WAIT_TIMEOUT)
+            if message is None:
+                if not vision_process.alive and not reported_dead:
+                    print(f"Vision process exited (code {vision_process.exitcode}); no more inference results")
+                    stats.increment("vision_process_died")
+                    with thread_lock:
+                        following = drone_state["flight_mode"] == "follow"
+                        if following:
+                            drone_state["flight_mode"] = "hover"
+                    if following:
+                        tello_io.send_rc_control(0, 0, 0, 0)
+                    reported_dead = True
+                continue
+            stats.increment("remote_results_skipped", skipped)
+            if "counters" in message:
+                stats.set_many({f"process_{name}": value for name, value in message["counters"].items()})
+                print(f"INFERENCE SETTINGS: {message['settings']}")
+
+            seq = message["seq"]
+            view = ring.frame(seq)
+            if view is None:
+                stats.increment("remote_frames_lost")
+                continue
+            # copy out of the ring: the frame is drawn on and kept by the memory thread after the slot is reused
+            frame = frame_pool.copy(view)
+            if not ring.is_current(seq):
+                stats.increment("remote_frames_lost")
+                continue
+
+            # the vision process stamps arrival and inference on the same monotonic clock
+            trace = FrameTrace(seq, message["captured_at"])
+            trace.stamps.update(message["stamps"])
+
+            with thread_lock: # Acquire lock to safely write to shared memory
+                last_frame["frame"] = frame
+            if recorder is not None:
+                recorder.record_frame(seq, frame, trace.arrival)
+            stats.increment("inferred")
+            result_slot.put(seq, (frame, message["pose_frame"], message["target_index"], trace))
+        except Exception as e:
+            print(f"Skipping a bad result in remote_inference_stage: {e}")
+            continue
+    print("Remote inference stage finished")
+
+def check_gestures(gestures, tello_io, drone_state, pose_frame, target_index, flight_mode, captured_at, stats):
+    """
+    Acts on a gesture the target holds; only while flying, so nothing fires on the ground.
+    Land and hover go straight to the Tello I/O lanes rather than through command_queue,
+    where they could wait behind speech playback or other commands. Returns the flight mode.
+    """
+    if flight_mode not in ("hover", "follow"):
+        gestures.reset()
+        return flight_mode
+    keypoints = pose_frame.keypoints[target_index] if pose_frame is not None and target_index is not None else None
+    gesture = gestures.update(keypoints, captured_at)
+    if gesture is None:
+        return flight_mode
+    command_name = GESTURE_COMMANDS[gesture]
+    print(f"GESTURE: {gesture} -> {command_name}")
+    stats.increment("gestures")
+    if command_name == "land":
+        # leave follow mode straight away so no rc command races the landing
+        with thread_lock:
+            drone_state["flight_mode"] = "land"
+        tello_io.emergency("land", lambda response, error: command_done("land", response, error, drone_state))
+        return "land"
+    # hover: stop following but stay in the air
+    with thread_lock:
+        if drone_state["flight_mode"] == "follow":
+            drone_state["flight_mode"] = "hover"
+        flight_mode = drone_state["flight_mode"]
+    tello_io.send_rc_control(0, 0, 0, 0)
+    return flight_mode
+
+def control_stage(tello_io, result_slot, display_slot, drone_state, preview, recorder, tracer, follow_loop, gestures, keyframes, stats):
+    """
+    Turns inference results into rc commands while in follow mode. With a follow loop the
+    measurement is handed over instead, and the loop sends rc commands at its own fixed rate.
+    Full-frame results are also checked for memory keyframes before anything is drawn on the frame;
+    crop passes and flow only see the target, so the people around it would seem to come and go.
+    """
+    print("Control stage started")
     pdrone_cc, pdrone_ud, pdrone_fb = -111, -111, -111
-    last_frame_save = datetime.now()
+    seq = 0
     while not stop_event.is_set():
         try:
-            frame = frame_read.frame
-            if frame is not None:
-                frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR) # convert from RGB to BGR
-                # The frame from frame_read is BGR, not RGB.
-                with thread_lock: # Acquire lock to safely write to shared memory
-                    last_frame["frame"] = frame
-                results = model.track(frame, persist=True, verbose=False)
-                # annotated_frame = results[0].plot()
-                
-                with thread_lock:
-                    flight_mode = drone_state["flight_mode"]
-
-                if flight_mode == "follow":
-                    process_frame(results, frame)
-                    # Check if any control input has changed to avoid sending redundant commands
-                    if pdrone_cc != drone_cc or pdrone_ud != drone_ud or pdrone_fb != drone_fb:
-                        # Correct order: left_right, forward_backward, up_down, yaw
-                        # Using 0 for left_right as you don't calculate it
-                        # Applying sign changes based on PID error direction vs Tello's velocity convention
-                        tello.send_rc_control(0, -drone_fb, -drone_ud, -drone_cc) # <--- CRITICAL CHANGE
-                        pdrone_cc = drone_cc
-                        pdrone_ud = drone_ud
-                        pdrone_fb = drone_fb
+            seq, item = result_slot.get(seq, timeout=STAGE_WAIT_TIMEOUT)
+            if item is None:
+                continue
+            frame, pose_frame, target_index, trace = item
+            # an empty result is a full-frame pass unless it is the first miss after a crop,
+            # which still lets people that left time out
+            if keyframes is not None and (pose_frame is None or pose_frame.full_frame):
+                keyframes.update(frame, pose_frame)
+
+            with thread_lock:
+                flight_mode = drone_state["flight_mode"]
+
+            if gestures is not None:
+                flight_mode = check_gestures(gestures, tello_io, drone_state, pose_frame, target_index, flight_mode, trace.arrival, stats)
+
+            rc = None
+            if flight_mode == "follow":
+                draw_overlay = (not HEADLESS or (preview is not None and preview.has_clients)
+                                or (recorder is not None and recorder.overlay_enabled))
+                if follow_loop is not None:
+                    follow_loop.submit(measure_frame(pose_frame, target_index, frame, draw_overlay), trace.arrival, frame.shape)
+                    trace.mark("processed")
+                else:
+                    process_frame(pose_frame, target_index, frame, draw_overlay=draw_overlay)
+                    trace.mark("processed")
+                # Check if any control input has changed to avoid sending redundant commands
+                if follow_loop is None and (pdrone_cc != drone_cc or pdrone_ud != drone_ud or pdrone_fb != drone_fb):
+                    # Correct order: left_right, forward_backward, up_down, yaw
+                    # Using 0 for left_right as you don't calculate it
+                    # Applying sign changes based on PID error direction vs Tello's velocity convention
+                    tello_io.send_rc_control(0, -drone_fb, -drone_ud, -drone_cc) # <--- CRITICAL CHANGE
+                    trace.mark("rc_queued")
+                    pdrone_cc = drone_cc
+                    pdrone_ud = drone_ud
+                    pdrone_fb = drone_fb
+                    stats.increment("rc_sent")
+                rc = list((follow_loop.controller if follow_loop is not None else follow_controller).rc_command())
+            tracer.finish(trace)
+
+            if recorder is not None:
+                target_keypoints = pose_frame.keypoints[target_index].tolist() if target_index is not None else None
+                recorder.record_metadata(seq, flight_mode=flight_mode, rc=rc, target_keypoints=target_keypoints)
+                recorder.record_overlay(seq, frame)
+            stats.increment("controlled")
+            display_slot.put(seq, frame)
+        except Exception as e:
+            print(f"Skipping a bad frame in control_stage: {e}")
+            continue
+    print("Control stage finished")
 
+def display_stage(display_slot, stats):
+    """Shows the latest annotated frame and watches for the ESC key."""
+    print("Display stage started")
+    seq = 0
+    while not stop_event.is_set():
+        try:
+            seq, frame = display_slot.get(seq, timeout=DISPLAY_WAIT_TIMEOUT)
+            if frame is not None:
                 cv2.imshow('Drone', frame)
+                stats.increment("displayed")
 
             if cv2.waitKey(1) & 0xFF == 27: # ESC key
                 print("ESC key pressed. Shutting down.")
                 stop_event.set()
                 break
         except Exception as e:
-            # This will catch the decoding errors and others
-            print(f"Skipping a bad frame in vision_thread: {e}")
-            # Continue to the next iteration to get a new frame
+            print(f"Skipping a bad frame in display_stage: {e}")
             continue
 
     cv2.destroyAllWindows()
+    print("Display stage finished")
+
+def vision_process_settings():
+    """Inference settings handed to the vision process, which cannot see this module's globals."""
+    return {
+        "backend": INFERENCE_BACKEND,
+        "weights": INFERENCE_WEIGHTS,
+        "imgsz": INFERENCE_IMGSZ,
+        "int8": INFERENCE_INT8,
+        "calibration_dir": INFERENCE_CALIBRATION_DIR,
+        "dynamic": INFERENCE_DYNAMIC,
+        "latency_budget_ms": LATENCY_BUDGET_MS,
+        "target_lock_enabled": TARGET_LOCK_ENABLED,
+        "target_lock": {
+            "roi_imgsz": ROI_IMGSZ,
+            "reacquire_interval": ROI_REACQUIRE_INTERVAL,
+            "max_misses": ROI_MAX_MISSES,
+            "padding": ROI_PADDING,
+        },
+    }
+
+def vision_thread(tello, tello_io, frame_read, last_frame, drone_state, keyframes):
+    """
+    Runs the vision pipeline as capture -> inference -> control -> display stages,
+    each on its own thread and connected by latest-value-wins slots so a slow
+    YOLO call never stalls control or display.
+    """
+    print("Vision thread started")
+    stats = PipelineStats()
+    tracer = LatencyTracer(TRACE_FILE)
+    lag_probe = LagProbe()
+    threading.Thread(target=lag_probe.run, args=(stop_event,), daemon=True).start()
+    frame_slot = LatestSlot("frame")
+    result_slot = LatestSlot("result")
+    display_slot = LatestSlot("display")
+    vision_slots = [frame_slot, result_slot, display_slot]
+    keypoint_flow = None
+    if KEYPOINT_FLOW_ENABLED and not VISION_PROCESS_ENABLED:
+        inference_slot = LatestSlot("inference")
+        detection_slot = LatestSlot("detection")
+        keypoint_flow = KeypointFlow(redetect_confidence=FLOW_REDETECT_CONFIDENCE, max_age=FLOW_MAX_AGE)
+
+    frame_pool = FramePool(FRAME_POOL_MAX_BUFFERS, pooled=FRAME_POOL_ENABLED)
+    if keyframes is not None:
+        keyframes.copy = frame_pool.copy
+    recorder = None
+    if RECORDING_ENABLED:
+        recorder = FlightRecorder(RECORDING_DIR, RECORDING_SEGMENT_SECONDS, RECORDING_MAX_DISK_MB,
+                                  record_overlay=RECORDING_OVERLAY, frame_pool=frame_pool)
+        recorder.start()
+
+    preview = None
+    if PREVIEW_SERVER_ENABLED:
+        preview = PreviewServer(display_slot, port=PREVIEW_PORT, fps=PREVIEW_FPS, scale=PREVIEW_SCALE, quality=PREVIEW_JPEG_QUALITY)
+        preview.start()
+
+    follow_loop = None
+    if FIXED_RATE_CONTROL:
+        def follow_active():
+            with thread_lock:
+                return drone_state["flight_mode"] == "follow"
+        follow_loop = FollowLoop(follow_controller, tello_io.send_rc_control, follow_active, CONTROL_RATE_HZ,
+                                 TARGET_TIMEOUT, MAX_PREDICTION, tracer)
+
+    gestures = GestureRecognizer(GESTURE_HOLD_SECONDS, cooldown=GESTURE_COOLDOWN) if GESTURES_ENABLED else None
+
+    governor = None
+    vision_process = None
+    if VISION_PROCESS_ENABLED:
+        vision_process = VisionProcess(tello.get_udp_video_address(), VISION_FRAME_SHAPE, vision_process_settings(), VISION_RING_SLOTS)
+        vision_process.start()
+        stages = [
+            threading.Thread(target=remote_inference_stage, args=(vision_process, tello_io, result_slot, last_frame, drone_state, recorder, frame_pool, stats)),
+        ]
+    else:
+        governor = InferenceGovernor(LATENCY_BUDGET_MS, allow_resize=model.dynamic, max_imgsz=INFERENCE_IMGSZ)
+        target_lock = TargetLock(ROI_IMGSZ, ROI_REACQUIRE_INTERVAL, ROI_MAX_MISSES, ROI_PADDING)
+        stages = [threading.Thread(target=capture_stage, args=(frame_read, frame_slot, last_frame, recorder, frame_pool, stats))]
+        if keypoint_flow is not None:
+            stages += [
+                threading.Thread(target=flow_stage, args=(frame_slot, inference_slot, detection_slot, result_slot, drone_state, keypoint_flow, target_lock, frame_pool, stats)),
+                threading.Thread(target=inference_stage, args=(inference_slot, detection_slot, drone_state, governor, target_lock, stats)),
+            ]
+        else:
+            stages.append(threading.Thread(target=inference_stage, args=(frame_slot, result_slot, drone_state, governor, target_lock, stats)))
+    stages.append(threading.Thread(target=control_stage, args=(tello_io, result_slot, display_slot, drone_state, preview, recorder, tracer, follow_loop, gestures, keyframes, stats)))
+    if not HEADLESS:
+        stages.append(threading.Thread(target=display_stage, args=(display_slot, stats)))
+    if follow_loop is not None:
+        stages.append(threading.Thread(target=follow_loop.run, args=(stop_event,)))
+    for stage in stages:
+        stage.start()
+
+    while not stop_event.wait(timeout=STATS_PRINT_INTERVAL):
+        print(f"VISION STATS: {stats.summary(vision_slots)}")
+        print(f"SCHEDULING LAG: {lag_probe.summary()}")
+        print(f"FRAME POOL: {frame_pool.summary()}")
+        print(f"LATENCY (ms):\n{tracer.summary()}")
+        if follow_loop is not None:
+            print(f"FOLLOW LOOP: {follow_loop.ticks} ticks, {follow_loop.overruns} overruns, "
+                  f"{follow_loop.rc_sent} rc sent, measurement age {follow_loop.age_summary()}")
+        if keypoint_flow is not None:
+            print(f"KEYPOINT FLOW: {keypoint_flow.tracked_frames} frames tracked, {keypoint_flow.lost_tracks} tracks lost, "
+                  f"confidence {keypoint_flow.confidence:.2f}")
+        print(f"TELLO I/O:\n{tello_io.summary()}")
+        tracer.flush()
+        if governor is not None:
+            print(f"INFERENCE SETTINGS: {governor.settings()}")
+    for slot in vision_slots:
+        slot.close()
+    for stage in stages:
+        stage.join()
+    if vision_process is not None:
+        vision_process.stop()
+    if preview is not None:
+        preview.stop()
+    if recorder is not None:
+        recorder.stop()
+
+    tracer.close()
+    print(f"VISION STATS: {stats.summary(vision_slots)}")
+    print(f"FRAME POOL: {frame_pool.summary()}")
+    print(f"LATENCY (ms):\n{tracer.summary()}")
     print("Vision thread finished")
 
-def keep_alive_thread(tello):
-    print("Keep alive thread started")
-    while not stop_event.is_set():
-        tello.send_control_command("command")
-        sleep(3)
-
+def connect_fleet_drone(config):
+    """Connects one FLEET entry and gives it its own Tello I/O, state and command queue."""
+    tello = Tello(config["host"], vs_udp=config.get("video_port", Tello.VS_UDP_PORT))
+    tello.connect()
+    if tello.vs_udp_port != Tello.VS_UDP_PORT:
+        # every drone has to stream to its own port on this machine
+        tello.change_vs_udp(tello.vs_udp_port)
+    tello.streamon()
+    print(f"{config['name']} battery level:", tello.get_battery())
+    tello_io = TelloIO(tello, RC_RATE_HZ, KEEP_ALIVE_INTERVAL, MANEUVER_QUEUE_SIZE)
+    tello_io.start()
+    return {"name": config["name"], "tello": tello, "tello_io": tello_io, "drone_state": {"flight_mode": "land"},
+            "command_queue": queue.Queue()}
+
+def fleet_thread(drones, last_frame, keyframes):
+    """
+    Vision pipeline for several drones. Each drone keeps its own capture and
+    control stages, follow loop and gestures; one scheduler batches the newest
+    frame of every drone into shared inference calls.
+    """
+    print(f"Fleet thread started with {len(drones)} drones")
+    scheduler = BatchScheduler(model, FLEET_LATENCY_BUDGET_MS, INFERENCE_IMGSZ, FLEET_MAX_BATCH)
+    frame_pool = FramePool(FRAME_POOL_MAX_BUFFERS * len(drones), pooled=FRAME_POOL_ENABLED)
+    if keyframes is not None:
+        keyframes.copy = frame_pool.copy
+    stages = [threading.Thread(target=scheduler.run, args=(stop_event,))]
+    for index, drone in enumerate(drones):
+        drone_state = drone["drone_state"]
+        stats = PipelineStats()
+        frame_slot = LatestSlot("frame")
+        result_slot = LatestSlot("result")
+        display_slot = LatestSlot("display")
+
+        def follow_active(drone_state=drone_state):
+            with thread_lock:
+                return drone_state["flight_mode"] == "follow"
+        stream = FleetStream(drone["name"], frame_slot, result_slot, stats, follow_active)
+        scheduler.add_stream(stream)
+        tracer = LatencyTracer()
+        follow_loop = FollowLoop(FollowController(), drone["tello_io"].send_rc_control, follow_active, CONTROL_RATE_HZ,
+                                 TARGET_TIMEOUT, MAX_PREDICTION, tracer)
+        gestures = GestureRecognizer(GESTURE_HOLD_SECONDS, cooldown=GESTURE_COOLDOWN) if GESTURES_ENABLED else None
+        # the memory thread describes what the first drone sees
+        drone_last_frame = last_frame if index == 0 else {"frame": None}
+        drone_keyframes = keyframes if index == 0 else None
+        drone.update(stats=stats, stream=stream, tracer=tracer, follow_loop=follow_loop,
+                     slots=[frame_slot, result_slot, display_slot])
+
+        stages.extend([
+            threading.Thread(target=capture_stage, args=(drone["tello"].get_frame_read(), frame_slot, drone_last_frame, None, frame_pool, stats)),
+            threading.Thread(target=control_stage, args=(drone["tello_io"], result_slot, display_slot, drone_state, None, None,
+                                                         tracer, follow_loop, gestures, drone_keyframes, stats)),
+            threading.Thread(target=follow_loop.run, args=(stop_event,)),
+        ])
+    for stage in stages:
+        stage.start()
+
+    while not stop_event.wait(timeout=STATS_PRINT_INTERVAL):
+        print(f"FLEET INFERENCE: {scheduler.summary()}")
+        print(f"FRAME POOL: {frame_pool.summary()}")
+        for drone in drones:
+            print(f"[{drone['name']}] VISION STATS: {drone['stats'].summary(drone['slots'])}")
+            print(f"[{drone['name']}] SCHEDULER: {scheduler.stream_summary(drone['stream'])}")
+            print(f"[{drone['name']}] LATENCY (ms):\n{drone['tracer'].summary()}")
+            print(f"[{drone['name']}] FOLLOW LOOP: {drone['follow_loop'].rc_sent} rc sent, "
+                  f"measurement age {drone['follow_loop'].age_summary()}")
+            print(f"[{drone['name']}] TELLO I/O:\n{drone['tello_io'].summary()}")
+    for drone in drones:
+        for slot in drone["slots"]:
+            slot.close()
+    for stage in stages:
+        stage.join()
+    print("Fleet thread finished")
+
+def keyboard_thread():
+    """Stops everything when ESC is pressed in the terminal, for runs without an OpenCV window."""
+    with ConsoleKeyReader() as keys:
+        if not keys.available:
+            return
+        print("Keyboard thread started, press ESC to shut down")
+        while not stop_event.is_set():
+            if keys.read_key(timeout=0.5) == ESC:
+                print("ESC key pressed. Shutting down.")
+                stop_event.set()
 
-def command_thread(tello, command_queue, drone_state):
+def command_done(command_name, response, error, drone_state):
+    """Called by the Tello I/O lanes when a command from command_thread has finished."""
+    if error is not None:
+        print(f"Error in command_thread: {error}")
+        stop_event.set()
+        return
+    if response:
+        print("Command reponse: ", response)
+
+    if command_name == "takeoff":
+        with thread_lock:
+            drone_state["flight_mode"] = "hover"
+
+
+def safety_land(envelope, tello_io, drone_state):
+    """Lands for the safety monitor the same way a spoken land command does."""
+    with thread_lock:
+        drone_state["flight_mode"] = "land"
+    tello_io.emergency("land", lambda response, error: command_done("land", response, error, drone_state))
+
+def safety_monitor(drone):
+    """Builds the safety monitor for one entry of the drones list."""
+    drone_state = drone["drone_state"]
+    def is_flying():
+        with thread_lock:
+            return drone_state["flight_mode"] != "land"
+    on_land = lambda envelope: safety_land(envelope, drone["tello_io"], drone_state)
+    return SafetyMonitor(drone["tello"], drone["tello_io"], is_flying, on_land, SAFETY_MIN_TOF_CM,
+                         SAFETY_MAX_HEIGHT_CM, SAFETY_MIN_BATTERY, SAFETY_MAX_TEMPERATURE)
+
+def command_thread(tello_io, command_queue, drone_state):
     """
-    Manages commands.
+    Manages commands. Tello commands are handed to the Tello I/O lanes so a
+    long maneuver never blocks this thread, rc updates or keep-alives.
     """
     print("Control thread started")
     radio = Radio("192.168.132.1")
@@ -221,29 +742,33 @@ def command_thread(tello, command_queue, drone_state):
 
                 command_name = command['command']
                 params = command['params']  
-                params["self"] = tello
 
                 if command_name == "follow":
                     with thread_lock:
                         drone_state["flight_mode"] = "follow"
                     continue
 
-                method_to_call = getattr(Tello, command_name)
-                response = method_to_call(**params)
-                if response:
-                    print("Command reponse: ", response)
-
-                if command_name == "takeoff":
+                if command_name == "hover":
+                    # stop following but stay in the air
                     with thread_lock:
-                        drone_state["flight_mode"] = "hover"
+                        if drone_state["flight_mode"] == "follow":
+                            drone_state["flight_mode"] = "hover"
+                    tello_io.send_rc_control(0, 0, 0, 0)
+                    continue
 
-                if command_name == "land":
+                params["self"] = tello_io.tello
+                method_to_call = getattr(Tello, command_name)
+                on_done = lambda response, error, name=command_name: command_done(name, response, error, drone_state)
+                if command_name == "land" or command_name == "emergency":
+                    # leave follow mode straight away so no rc command races the landing
                     with thread_lock:
                         drone_state["flight_mode"] = "land"
-
-                if command_name == "follow":
-                    with thread_lock:
-                        drone_state["flight_mode"] = "follow"
+                    tello_io.emergency(command_name, on_done)
+                elif command_type == "query":
+                    # queries read the state djitellopy caches and never touch the command socket
+                    on_done(method_to_call(**params), None)
+                else:
+                    tello_io.submit(command_name, lambda method=method_to_call, params=params: method(**params), on_done)
 
             elif command_type == "memory_question":
                 print("MEMORY RESPONSE:")
@@ -261,10 +786,15 @@ def command_thread(tello, command_queue, drone_state):
             stop_event.set()
     print("Control thread finished")
 
-def process_text(text, command_queue, shared_memory):
+def process_text(text, command_queue, shared_memory, history=None):
     print(f"Processing text: {text}")
-    with thread_lock: # Acquire lock to safely read from shared memory
-        latest_cwm = shared_memory['cwm_data']
+    window = parse_time_window(text) if history is not None else None
+    if window is not None:
+        # a question about earlier on gets just that stretch of the history, not the current memory
+        latest_cwm = history.window_text(*window)
+    else:
+        with thread_lock: # Acquire lock to safely read from shared memory
+            latest_cwm = shared_memory['cwm_data']
     response = ttc_manager.get_drone_api_command(text, latest_cwm)
     print("\n", response)
 
@@ -282,19 +812,26 @@ def process_text(text, command_queue, shared_memory):
             print(f"Could not decode command from response: {response}")
 
 
-def speech_thread(command_queue, shared_memory):
+def speech_thread(command_queue, shared_memory, history):
     """
     Listens for speech and puts recognized commands into the command queue.
     """
     print("Speech thread started")
     try:
-        recorder = AudioToTextRecorder(language="en", no_log_file=True, spinner=True)
+        recording_stopped = {"at": None}
+        def on_recording_stop():
+            recording_stopped["at"] = monotonic()
+        recorder = AudioToTextRecorder(language="en", no_log_file=True, spinner=True, on_recording_stop=on_recording_stop)
         print("STT initialized")
         while not stop_event.is_set():
             print("STT Listening")
             text = recorder.text()
+            if recording_stopped["at"] is not None:
+                # end of speech to transcript, the part of STT latency that competes with the vision pipeline
+                print(f"STT latency: {(monotonic() - recording_stopped['at']) * 1000:.0f}ms")
+                recording_stopped["at"] = None
             print("Transcription: ", text)
-            process_text(text, command_queue, shared_memory)
+            process_text(text, command_queue, shared_memory, history)
 
     except Exception as e:
         print(f"Error in speech thread: {e}")
@@ -302,29 +839,64 @@ def speech_thread(command_queue, shared_memory):
         print("Speech thread finished")
         stop_event.set() # Ensure other threads know to stop if speech thread fails
 
-def memory_thread(shared_memory, last_frame):
+def memory_thread(shared_memory, last_frame, keyframes, history):
     """
-    This thread periodically calls get_updated_cwm and stores the result
-    in a thread-safe shared memory object.
+    This thread calls get_updated_cwm on keyframes from the vision pipeline, and
+    periodically on the latest frame, and stores the result in a thread-safe
+    shared memory object. Keyframes that queued up during the last update are
+    sent together, as many as the CWM manager's batch size allows. Each update
+    is also written to the memory history, if there is one.
     """
     print("Memory thread started")
-    cwm_manager = CWMManager()
+    cwm_manager = CWMManager(MEMORY_IMAGE_FORMAT, MEMORY_IMAGE_QUALITY, MEMORY_IMAGE_MAX_WIDTH, MEMORY_MAX_BATCH,
+                             MEMORY_KEYFRAME_MIN_INTERVAL, MEMORY_INCREMENTAL, MEMORY_RECONCILE_EVERY)
+    novelty = FrameNovelty(min_change=MEMORY_MIN_CHANGE, max_staleness=MEMORY_MAX_STALENESS)
+    refresh_interval = MEMORY_BACKGROUND_INTERVAL if keyframes is not None else MEMORY_UPDATE_INTERVAL
+    next_refresh = monotonic()
     while not stop_event.is_set():
-        # --- Update the shared memory ---
-        with thread_lock: # Acquire lock to safely write to shared memory
-            frame = last_frame["frame"]
-        cv2.imwrite("last_frame.png", frame) 
+        batch = []
+        if keyframes is not None:
+            batch = keyframes.wait(MEMORY_UPDATE_INTERVAL, cwm_manager.batch_size)
+            if batch:
+                novelty.mark(batch[-1][0])
+        if not batch and monotonic() >= next_refresh:
+            # --- Update the shared memory ---
+            next_refresh = monotonic() + refresh_interval
+            with thread_lock: # Acquire lock to safely write to shared memory
+                frame = last_frame["frame"]
+            # only frames that look different from the last one sent are worth an upload and an LLM call
+            reason = novelty.select(frame) if frame is not None else None
+            if reason is not None:
+                batch = [(frame, [reason], datetime.now().timestamp())]
+            del frame
+        if not batch:
+            if keyframes is None:
+                stop_event.wait(timeout=MEMORY_UPDATE_INTERVAL)
+            continue
+        reason = "+".join(dict.fromkeys(reason for _, reasons, _ in batch for reason in reasons))
+        times = [datetime.fromtimestamp(taken_at) for _, _, taken_at in batch]
+        image = cwm_manager.encode_batch([frame for frame, _, _ in batch], times)
+        batch_size = len(batch)
+        del batch # hands the buffers back to the frame pool instead of holding them through the upload
 
-        new_data = cwm_manager.get_updated_cwm("last_frame.png")
+        upload_started = monotonic()
+        new_data = cwm_manager.get_updated_cwm(image, times)
+        upload_ms = (monotonic() - upload_started) * 1000
 
         with thread_lock: # Acquire lock to safely write to shared memory
             shared_memory['cwm_data'] = new_data
+        if history is not None:
+            history.record(new_data, cwm_manager.last_edits)
         
-        print(f"MEMORY THREAD: CWM data has been updated.")
+        print(f"MEMORY THREAD: CWM data has been updated ({batch_size} {reason} frames, {cwm_manager.last_upload_bytes / 1024:.0f} KB "
+              f"{MEMORY_IMAGE_FORMAT} encoded in {cwm_manager.last_encode_ms:.1f} ms, update took {upload_ms:.0f} ms, "
+              f"next batch up to {cwm_manager.batch_size}). {cwm_manager.summary()}. "
+              f"{novelty.summary()}" + (f", {keyframes.summary()}" if keyframes is not None else ""))
         # --- End of critical section ---
 
-        # Wait for the next update interval, but exit immediately if stop_event is set
-        stop_event.wait(timeout=1)
+        if keyframes is None:
+            # Wait for the next update interval, but exit immediately if stop_event is set
+            stop_event.wait(timeout=MEMORY_UPDATE_INTERVAL)
 
     print("Memory thread finished")
 
@@ -337,44 +909,79 @@ if __name__ == "__main__":
         # --- Shared Memory for CWM data with a Lock for thread-safe access ---
         thread_lock = threading.Lock()
 
+        ttc_manager = TextToCommand()
+        # fleet mode batches every drone through one in-process model
+        if FLEET or not VISION_PROCESS_ENABLED:
+            model = load_backend(INFERENCE_BACKEND, INFERENCE_WEIGHTS, INFERENCE_IMGSZ, int8=INFERENCE_INT8,
+                                 calibration_dir=INFERENCE_CALIBRATION_DIR, dynamic=INFERENCE_DYNAMIC)
+
         shared_memory = {'cwm_data': 'No data yet.'}
         last_frame = {'frame': None}
-        drone_state = {"flight_mode": "land"}
-
+        keyframes = KeyframeTrigger(min_interval=MEMORY_KEYFRAME_MIN_INTERVAL) if MEMORY_KEYFRAME_TRIGGERS else None
+        # opening the history repairs whatever a crash left half written
+        history = (MemoryHistory(MEMORY_HISTORY_DIR, MEMORY_HISTORY_SNAPSHOT_EVERY, MEMORY_HISTORY_DURABLE)
+                   if MEMORY_HISTORY_DIR else None)
 
         # --- Tello Initialization ---
-        tello = Tello()
-        tello.connect()
-        tello.streamon()
-        frame_read = tello.get_frame_read()
-        print("Battery Level:", tello.get_battery())
+        if FLEET:
+            drones = [connect_fleet_drone(config) for config in FLEET]
+            vision = threading.Thread(target=fleet_thread, args=(drones, last_frame, keyframes))
+            # spoken commands go to every drone
+            command_queue = CommandFanout([drone["command_queue"] for drone in drones])
+        else:
+            tello = ReplayTello(REPLAY_CLIP) if REPLAY_CLIP else Tello()
+            tello.connect()
+            tello.streamon()
+            # in process mode the vision process decodes the stream itself, so it must not be opened here too
+            frame_read = None if VISION_PROCESS_ENABLED else tello.get_frame_read()
+            print("Battery Level:", tello.get_battery())
+            # from here on only tello_io sends commands, until it is stopped for the final landing
+            tello_io = TelloIO(tello, RC_RATE_HZ, KEEP_ALIVE_INTERVAL, MANEUVER_QUEUE_SIZE)
+            tello_io.start()
+            drones = [{"name": "tello", "tello": tello, "tello_io": tello_io, "drone_state": {"flight_mode": "land"},
+                       "command_queue": command_queue}]
+            vision = threading.Thread(target=vision_thread, args=(tello, tello_io, frame_read, last_frame,
+                                                                  drones[0]["drone_state"], keyframes))
 
         # Create and start the threads
-        vision = threading.Thread(target=vision_thread, args=(tello, frame_read, last_frame, drone_state))
-        control = threading.Thread(target=command_thread, args=(tello, command_queue, drone_state))
-        keep_alive = threading.Thread(target=keep_alive_thread, args=(tello,))
-        speech = threading.Thread(target=speech_thread, args=(command_queue, shared_memory))
-        memory = threading.Thread(target=memory_thread, args=(shared_memory, last_frame))
+        controls = [threading.Thread(target=command_thread, args=(drone["tello_io"], drone["command_queue"], drone["drone_state"]))
+                    for drone in drones]
+        monitors = []
+        if SAFETY_MONITOR_ENABLED:
+            monitors = [threading.Thread(target=safety_monitor(drone).run, args=(stop_event,)) for drone in drones]
+        speech = threading.Thread(target=speech_thread, args=(command_queue, shared_memory, history))
+        memory = threading.Thread(target=memory_thread, args=(shared_memory, last_frame, keyframes, history))
+        keyboard = threading.Thread(target=keyboard_thread, daemon=True)
+
+        signal.signal(signal.SIGTERM, lambda signum, frame: stop_event.set())
 
         vision.start()
-        control.start()
-        keep_alive.start()
+        for control in controls:
+            control.start()
+        for monitor in monitors:
+            monitor.start()
         speech.start()
         memory.start()
-
+        if HEADLESS:
+            keyboard.start()
 
         # Wait for all threads to complete
         vision.join()
-        control.join()
-        keep_alive.join()
+        for control in controls:
+            control.join()
+        for monitor in monitors:
+            monitor.join()
         speech.join()
         memory.join()
+        if history is not None:
+            history.close()
 
         print("All threads have been terminated.")
-
-        print("Landing drone.")
-        tello.land()
-        tello.streamoff()
+        for drone in drones:
+            drone["tello_io"].stop()
+            print(f"Landing {drone['name']}.")
+            drone["tello"].land()
+            drone["tello"].streamoff()
     except KeyboardInterrupt:
         print("SHUTTING DOWN")
         stop_event.set()
\ No newline at end of file
@@ -0,0 +1,104 @@
+import json
+from time import time
+
+EDIT_OPS = ("add", "update", "past", "present")
+
+
+def parse_json_reply(response):
+    """Loads a JSON reply from the model, with or without a ```json fence around it. None if it is not JSON."""
+    cleaned = response.strip().removeprefix("```json").removeprefix("```").removesuffix("```").strip()
+    try:
+        return json.loads(cleaned)
+    except (json.JSONDecodeError, TypeError):
+        return None
+
+
+class MemoryDocument:
+    """
+    The drone's memory as numbered entries, one per thing it has seen, built
+    up from the model's edits instead of rewritten by it on every update:
+
+      {"op": "add", "text": "..."}                  something new, gets the next ID
+      {"op": "update", "id": "e3", "text": "..."}   more or corrected detail
+      {"op": "past", "id": "e3"}                    no longer in view
+      {"op": "present", "id": "e3"}                 back in view
+
+    render() gives the text the rest of the system reads as the memory.
+    """
+    def __init__(self):
+        self.entries = {}  # ID -> {"text", "tense", "first_seen", "updated"}, in the order they were added
+        self.__next_id = 1
+        self.applied = 0
+        self.rejected = 0
+        self.last_applied = []  # the edits the last apply() made, with the IDs added entries got
+
+    def apply(self, edits):
+        """Applies a list of edits and returns the IDs given to added entries. Edits that do not fit are skipped."""
+        added = []
+        self.last_applied = []
+        now = time()
+        for edit in edits:
+            if not isinstance(edit, dict) or edit.get("op") not in EDIT_OPS:
+                self.rejected += 1
+                continue
+            op = edit["op"]
+            if op == "add":
+                if not edit.get("text"):
+                    self.rejected += 1
+                    continue
+                entry_id = f"e{self.__next_id}"
+                self.__next_id += 1
+                self.entries[entry_id] = {"text": edit["text"], "tense": "present", "first_seen": now, "updated": now}
+                added.append(entry_id)
+                edit = {**edit, "id": entry_id}
+            else:
+                entry = self.entries.get(str(edit.get("id")))
+                if entry is None:
+                    self.rejected += 1
+                    continue
+                if op == "update":
+                    entry["text"] = edit.get("text") or entry["text"]
+                else:
+                    entry["tense"] = op
+                    entry["text"] = edit.get("text") or entry["text"]
+                entry["updated"] = now
+            self.last_applied.append(edit)
+            self.applied += 1
+        return added
+
+    def replace(self, entries):
+        """
+        Takes the model's full list of entries ({"id", "text", "tense"}) as the truth.
+        Returns how many entries differed from what the edits had built.
+        """
+        entries = [entry for entry in entries if isinstance(entry, dict) and entry.get("text")]
+        # keep new IDs clear of any the model used
+        numbers = [int(str(entry.get("id"))[1:]) for entry in entries if str(entry.get("id"))[1:].isdigit()]
+        self.__next_id = max([self.__next_id] + [number + 1 for number in numbers])
+
+        now = time()
+        replaced = {}
+        for entry in entries:
+            entry_id = str(entry.get("id") or "")
+            if not entry_id or entry_id in replaced:
+                entry_id = f"e{self.__next_id}"
+                self.__next_id += 1
+            tense = "past" if entry.get("tense") == "past" else "present"
+            first_seen = self.entries.get(entry_id, {}).get("first_seen", now)
+            replaced[entry_id] = {"text": entry["text"], "tense": tense, "first_seen": first_seen, "updated": now}
+
+        state = lambda entries, entry_id: (entries[entry_id]["text"], entries[entry_id]["tense"]) if entry_id in entries else None
+        drift = sum(1 for entry_id in replaced.keys() | self.entries.keys()
+                    if state(replaced, entry_id) != state(self.entries, entry_id))
+        self.entries = replaced
+        return drift
+
+    def describe(self, entry_ids):
+        """Short 'e3 = ...' list of entries, to tell the model which IDs its additions got."""
+        return "; ".join(f"{entry_id} = {self.entries[entry_id]['text']}" for entry_id in entry_ids if entry_id in self.entries)
+
+    def render(self):
+        if not self.entries:
+            return "No data yet."
+        return "\n".join(f"{entry_id}{'' if entry['tense'] == 'present' else ' (no longer in view)'}: {entry['text']}"
+                         for entry_id, entry in self.entries.items())
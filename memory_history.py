@@ -0,0 +1,252 @@
+import json
+import mmap
+import os
+import re
+import struct
+import threading
+import zlib
+from datetime import datetime
+from time import time
+
+import numpy as np
+
+# each log record is a (payload length, CRC32 of payload) header followed by the JSON payload
+RECORD_HEADER = struct.Struct("<II")
+# one fixed-size index entry per log record, in time order
+INDEX_DTYPE = np.dtype([("time", "<f8"), ("offset", "<u8"), ("length", "<u4"), ("kind", "<u4")])
+SNAPSHOT, EDITS, SESSION = 0, 1, 2
+KINDS = {"snapshot": SNAPSHOT, "edits": EDITS, "session": SESSION}
+
+NUMBER_WORDS = {"a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+                "eight": 8, "nine": 9, "ten": 10, "fifteen": 15, "twenty": 20, "thirty": 30, "forty": 40,
+                "forty-five": 45, "sixty": 60, "few": 3, "couple": 2}
+UNIT_SECONDS = {"second": 1, "minute": 60, "hour": 3600}
+AMOUNT = r"(\d+|" + "|".join(NUMBER_WORDS) + r")"
+AGO_PATTERN = re.compile(AMOUNT + r"\s+(?:of\s+)?(second|minute|hour)s?\s+ago")
+LAST_PATTERN = re.compile(r"(?:last|past)\s+(?:" + AMOUNT + r"\s+)?(second|minute|hour)s?")
+
+
+def parse_time_window(text, now=None):
+    """
+    Finds a time window in a spoken question, e.g. "ten minutes ago" or "in the last hour".
+    Returns (start, end) as Unix times, or None when the question does not name one.
+    """
+    now = time() if now is None else now
+    text = text.lower()
+    match = AGO_PATTERN.search(text)
+    if match:
+        seconds = amount_seconds(match.group(1), match.group(2))
+        # "ten minutes ago" is rarely exact, so take a margin either side
+        margin = max(30, seconds * 0.25)
+        return now - seconds - margin, now - seconds + margin
+    match = LAST_PATTERN.search(text)
+    if match:
+        return now - amount_seconds(match.group(1) or "1", match.group(2)), now
+    return None
+
+
+def amount_seconds(amount, unit):
+    count = int(amount) if amount.isdigit() else NUMBER_WORDS[amount]
+    return count * UNIT_SECONDS[unit]
+
+
+class MemoryHistory:
+    """
+    Append-only, time-indexed log of what the drone remembered, kept on disk
+    so it survives restarts and can answer questions about a past window.
+
+    memory.log holds checksummed JSON records: full snapshots of the memory
+    text, and the edits made between them. memory.idx holds a fixed-size
+    (time, offset, length, kind) entry per record; both files are memory
+    mapped for reads, so a time range is a binary search over the index and
+    one slice of the log. A snapshot is written every snapshot_every edit
+    records, which bounds how far back a window has to look.
+
+    Each run starts a new memory model session, which numbers its entries
+    from e1 again. The first record of a run is therefore preceded by a
+    session record, and a window never replays edits across one.
+
+    Records are written to the log before the index. On opening, index
+    entries pointing past the log or at a record that fails its checksum are
+    dropped, log records the index is missing are indexed again, and a torn
+    record at the end of the log is cut off.
+    """
+    def __init__(self, directory="memory_history", snapshot_every=20, durable=True):
+        self.directory = directory
+        self.snapshot_every = snapshot_every
+        self.durable = durable
+        self.__lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.__log_path = os.path.join(directory, "memory.log")
+        self.__index_path = os.path.join(directory, "memory.idx")
+
+        self.recovered = 0
+        self.truncated_bytes = 0
+        self.__recover()
+        self.__log = open(self.__log_path, "ab")
+        self.__index_file = open(self.__index_path, "ab")
+        index = self.__index()
+        self.records = len(index)
+        self.__last_time = float(index["time"][-1]) if len(index) else 0.0
+        self.__session_started = False
+        self.__edits_since_snapshot = 0
+        print(f"Memory history: {self.records} records in {directory}, {self.recovered} re-indexed, "
+              f"{self.truncated_bytes} torn bytes dropped")
+
+    def close(self):
+        with self.__lock:
+            self.__log.close()
+            self.__index_file.close()
+
+    # --- Writing ---
+
+    def record(self, memory, edits=None):
+        """Stores one memory update: its edits when there are some, and a full snapshot when due."""
+        with self.__lock:
+            if not self.__session_started:
+                self.__append("session", {})
+                self.__session_started = True
+            if edits:
+                self.__append("edits", {"edits": edits})
+                self.__edits_since_snapshot += 1
+            if edits is None or self.__edits_since_snapshot >= self.snapshot_every:
+                self.__append("snapshot", {"memory": memory})
+                self.__edits_since_snapshot = 0
+
+    def __append(self, kind, fields):
+        # the index has to stay sorted, so a clock stepping back does not move a record before older ones
+        timestamp = max(time(), self.__last_time)
+        payload = json.dumps({"time": timestamp, "kind": kind, **fields}).encode()
+        offset = self.__log.tell()
+        self.__log.write(RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+        self.__flush(self.__log)
+        entry = np.array([(timestamp, offset, len(payload), KINDS[kind])], dtype=INDEX_DTYPE)
+        self.__index_file.write(entry.tobytes())
+        self.__flush(self.__index_file)
+        self.__last_time = timestamp
+        self.records += 1
+
+    def __flush(self, file):
+        file.flush()
+        if self.durable:
+            os.fsync(file.fileno())
+
+    # --- Reading ---
+
+    def window(self, start, end):
+        """
+        The memory as it stood at start and what changed up to end. Returns the last snapshot or
+        session record before start, or None, the edit records between it and start, and every
+        record from start up to end, oldest first.
+        """
+        with self.__lock:
+            index = self.__index()
+            if not len(index):
+                return None, [], []
+            first = np.searchsorted(index["time"], start, side="left")
+            last = np.searchsorted(index["time"], end, side="right")
+            # the edits before start only make sense on top of the latest snapshot or session start
+            bases = np.flatnonzero(index["kind"][:first] != EDITS)
+            since = bases[-1] + 1 if len(bases) else 0
+            with open(self.__log_path, "rb") as log, mmap.mmap(log.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                base = self.__read(data, index[since - 1]) if since else None
+                earlier = [self.__read(data, entry) for entry in index[since:first]]
+                return base, earlier, [self.__read(data, entry) for entry in index[first:last]]
+
+    def window_text(self, start, end):
+        """What the drone remembered between start and end, as text for the command model."""
+        base, earlier, records = self.window(start, end)
+        lines = []
+        # the edits since the base bring the memory up to start, and say what the IDs in the window are
+        for record in ([base] if base is not None else []) + earlier + records:
+            if record["kind"] == "snapshot":
+                lines += [f"Memory as of {clock(record['time'])}:", record["memory"]]
+            elif record["kind"] == "session":
+                lines.append(f"{clock(record['time'])} memory started over, empty; entry IDs from here on are new")
+            else:
+                lines += [f"{clock(record['time'])} {describe_edit(edit)}" for edit in record["edits"]]
+        if not lines:
+            return f"Nothing was remembered between {clock(start)} and {clock(end)}."
+        return "\n".join(lines)
+
+    def __index(self):
+        # mapped afresh for each read, since the file grows underneath it
+        count = os.path.getsize(self.__index_path) // INDEX_DTYPE.itemsize
+        if not count:
+            return np.zeros(0, dtype=INDEX_DTYPE)
+        return np.memmap(self.__index_path, dtype=INDEX_DTYPE, mode="r", shape=(count,))
+
+    @staticmethod
+    def __read(data, entry):
+        start = int(entry["offset"]) + RECORD_HEADER.size
+        return json.loads(data[start:start + int(entry["length"])])
+
+    # --- Recovery ---
+
+    def __recover(self):
+        for path in (self.__log_path, self.__index_path):
+            if not os.path.exists(path):
+                open(path, "wb").close()
+        log_size = os.path.getsize(self.__log_path)
+        index_bytes = os.path.getsize(self.__index_path)
+        index = np.fromfile(self.__index_path, dtype=INDEX_DTYPE, count=index_bytes // INDEX_DTYPE.itemsize)
+
+        with open(self.__log_path, "r+b") as log:
+            # drop index entries whose record never fully reached the log
+            valid = len(index)
+            while valid and not self.__intact(log, index[valid - 1], log_size):
+                valid -= 1
+            index = index[:valid]
+            scan_from = int(index["offset"][-1]) + RECORD_HEADER.size + int(index["length"][-1]) if valid else 0
+
+            # index whatever the log has beyond that
+            missing = []
+            log.seek(scan_from)
+            while scan_from < log_size:
+                header = log.read(RECORD_HEADER.size)
+                if len(header) < RECORD_HEADER.size:
+                    break
+                length, checksum = RECORD_HEADER.unpack(header)
+                payload = log.read(length)
+                if len(payload) < length or zlib.crc32(payload) != checksum:
+                    break
+                record = json.loads(payload)
+                missing.append((record["time"], scan_from, length, KINDS[record["kind"]]))
+                scan_from += RECORD_HEADER.size + length
+            if scan_from < log_size:
+                self.truncated_bytes = log_size - scan_from
+                log.truncate(scan_from)
+                log.flush()
+                os.fsync(log.fileno())
+
+        self.recovered = len(missing)
+        if missing or len(index) * INDEX_DTYPE.itemsize != index_bytes:
+            index = np.concatenate([index, np.array(missing, dtype=INDEX_DTYPE)])
+            with open(self.__index_path, "wb") as index_file:
+                index_file.write(index.tobytes())
+                index_file.flush()
+                os.fsync(index_file.fileno())
+
+    @staticmethod
+    def __intact(log, entry, log_size):
+        offset, length = int(entry["offset"]), int(entry["length"])
+        if offset + RECORD_HEADER.size + length > log_size:
+            return False
+        log.seek(offset)
+        stored_length, checksum = RECORD_HEADER.unpack(log.read(RECORD_HEADER.size))
+        return stored_length == length and zlib.crc32(log.read(length)) == checksum
+
+
+def clock(timestamp):
+    return datetime.fromtimestamp(timestamp).strftime("%H:%M:%S")
+
+
+def describe_edit(edit):
+    op, entry_id, text = edit.get("op"), edit.get("id"), edit.get("text")
+    if op == "add":
+        return f"saw {entry_id}: {text}"
+    if op == "update":
+        return f"{entry_id} now: {text}"
+    if op == "past":
+        return f"{entry_id} went out of view"
+    return f"{entry_id} came back into view"
@@ -0,0 +1,141 @@
+import cv2
+import numpy as np
+
+# KEYPOINT_DICT = {
+#    0: "nose",
+#    1: "left_eye",
+#    2: "right_eye",
+#    3: "left_ear",
+#    4: "right_ear",
+#    5: "left_shoulder",
+#    6: "right_shoulder",
+#    7: "left_elbow",
+#    8: "right_elbow",
+#    9: "left_wrist",
+#    10: "right_wrist",
+#    11: "left_hip",
+#    12: "right_hip",
+#    13: "left_knee",
+#    14: "right_knee",
+#    15: "left_ankle",
+#    16: "right_ankle",
+# }
+NOSE = 0
+LEFT_SHOULDER = 5
+RIGHT_SHOULDER = 6
+LEFT_ELBOW = 7
+RIGHT_ELBOW = 8
+LEFT_WRIST = 9
+RIGHT_WRIST = 10
+FIRST_BODY_KEYPOINT = 6 # any confident keypoint from here down means the body is in view
+
+# Define connections for drawing the skeleton
+# This is a list of tuples, where each tuple represents a connection between two keypoints (by index)
+POSE_CONNECTIONS = [
+   # Face
+   (0, 1), (0, 2), (1, 3), (2, 4),
+   # Torso
+   (5, 6), (5, 11), (6, 12), (11, 12),
+   # Left Arm
+   (5, 7), (7, 9),
+   # Right Arm
+   (6, 8), (8, 10),
+   # Left Leg
+   (11, 13), (13, 15),
+   # Right Leg
+   (12, 14), (14, 16)
+]
+
+# --- Drawing Parameters ---
+MIN_DRAW_CONFIDENCE = 0.3 # Only draw keypoints/lines if confidence is above this
+POINT_COLOR = (0, 255, 0) # Green for keypoints
+LINE_COLOR = (255, 0, 0)  # Blue for skeleton lines
+NOSE_LINE_COLOR = (255, 255, 0)
+POINT_RADIUS = 3
+LINE_THICKNESS = 2
+
+
+class PoseFrame:
+    """YOLO pose output for one frame, converted to NumPy once."""
+    def __init__(self, boxes, keypoints, track_ids=None, full_frame=True):
+        self.boxes = boxes           # (N, 4) xywh
+        self.keypoints = keypoints   # (N, 17, 3) x, y, conf
+        self.track_ids = track_ids   # (N,) or None when the tracker has not assigned IDs
+        self.full_frame = full_frame # False for crop passes and flow, which only see the target's surroundings
+
+    def __len__(self):
+        return len(self.boxes)
+
+
+class TargetMeasurement:
+    """Control error terms for the selected person, all in pixels."""
+    def __init__(self, keypoints, center, nose_visible, errorx, errory, shoulders_visible, shoulder_dist, sees_body):
+        self.keypoints = keypoints
+        self.center = center
+        self.nose_visible = nose_visible
+        self.errorx = errorx
+        self.errory = errory
+        self.shoulders_visible = shoulders_visible
+        self.shoulder_dist = shoulder_dist
+        self.sees_body = sees_body
+
+
+def extract_poses(results):
+    """Returns a PoseFrame for the first result, or None if no person was detected."""
+    if not results:
+        return None
+    result = results[0]
+    if not result.keypoints or not result.boxes:
+        return None
+
+    boxes = result.boxes.xywh.cpu().numpy()
+    keypoints = result.keypoints.data.cpu().numpy()
+    if len(boxes) == 0 or keypoints.ndim != 3 or keypoints.shape[2] < 3:
+        return None
+
+    track_ids = None
+    if result.boxes.id is not None:
+        track_ids = result.boxes.id.cpu().numpy().astype(int)
+    return PoseFrame(boxes, keypoints, track_ids)
+
+
+def select_largest(pose_frame):
+    """Index of the person with the largest bounding box area."""
+    areas = pose_frame.boxes[:, 2] * pose_frame.boxes[:, 3]
+    return int(np.argmax(areas))
+
+
+def measure_target(keypoints, frame_shape):
+    """Computes the nose offset, shoulder distance and body visibility for one person's keypoints."""
+    centerx = frame_shape[1] / 2
+    centery = frame_shape[0] / 3 - 10
+
+    confident = keypoints[:, 2] > MIN_DRAW_CONFIDENCE
+    nosex, nosey = keypoints[NOSE, :2]
+    shoulders_visible = bool(confident[LEFT_SHOULDER] and confident[RIGHT_SHOULDER])
+
+    return TargetMeasurement(
+        keypoints=keypoints,
+        center=(int(centerx), int(centery)),
+        nose_visible=bool(confident[NOSE]),
+        errorx=float(nosex - centerx),
+        errory=float(centery - nosey),
+        shoulders_visible=shoulders_visible,
+        shoulder_dist=float(abs(keypoints[LEFT_SHOULDER, 0] - keypoints[RIGHT_SHOULDER, 0])),
+        sees_body=bool(confident[FIRST_BODY_KEYPOINT:].any()),
+    )
+
+
+def draw_target(overlay_image, measurement):
+    """Draws the confident keypoints in one polylines call, and the nose guide line."""
+    keypoints = measurement.keypoints
+    points = keypoints[:, :2].astype(np.int32)
+    confident = keypoints[:, 2] > MIN_DRAW_CONFIDENCE
+
+    # a zero-length segment with a thick pen renders as a filled dot
+    dots = np.repeat(points[confident][:, None, :], 2, axis=1)
+    if len(dots):
+        cv2.polylines(overlay_image, list(dots), False, POINT_COLOR, POINT_RADIUS * 2)
+
+    if measurement.nose_visible:
+        cv2.line(overlay_image, measurement.center, tuple(points[NOSE]), NOSE_LINE_COLOR, 2)
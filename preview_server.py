@@ -0,0 +1,135 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import monotonic, sleep
+
+import cv2
+
+BOUNDARY = "heliosframe"
+INDEX_PAGE = b"""<html><head><title>Helios Preview</title></head>
+<body style="margin:0;background:#000"><img src="/stream" style="width:100%"></body></html>"""
+
+
+class PreviewServer:
+    """
+    Serves the annotated vision frames as an MJPEG stream over HTTP so the
+    drone can be watched from a browser without an OpenCV window on the ground
+    station. Frames are only encoded, at a reduced rate and size, while at
+    least one client is connected.
+    """
+    def __init__(self, frame_slot, host="0.0.0.0", port=8080, fps=10, scale=0.5, quality=70):
+        self.__frame_slot = frame_slot
+        self.__interval = 1 / fps
+        self.__scale = scale
+        self.__quality = quality
+
+        self.__condition = threading.Condition()
+        self.__jpeg = None
+        self.__jpeg_seq = 0
+        self.__clients = 0
+        self.__running = False
+
+        server = self
+        class Handler(_PreviewHandler):
+            preview = server
+        self.__httpd = ThreadingHTTPServer((host, port), Handler)
+        self.__httpd.daemon_threads = True
+        self.address = f"http://{host}:{port}/"
+
+    @property
+    def running(self):
+        return self.__running
+
+    @property
+    def has_clients(self):
+        return self.__clients > 0
+
+    def start(self):
+        self.__running = True
+        threading.Thread(target=self.__httpd.serve_forever, daemon=True).start()
+        threading.Thread(target=self.__encode_loop, daemon=True).start()
+        print(f"Preview server listening on {self.address}")
+
+    def stop(self):
+        self.__running = False
+        with self.__condition:
+            self.__condition.notify_all()
+        self.__httpd.shutdown()
+        self.__httpd.server_close()
+
+    def wait_for_frame(self, last_seq, timeout=1.0):
+        """Blocks a client handler until a newer JPEG than last_seq is ready. Returns (seq, jpeg)."""
+        with self.__condition:
+            self.__condition.wait_for(lambda: self.__jpeg_seq > last_seq or not self.__running, timeout)
+            return self.__jpeg_seq, self.__jpeg
+
+    def client_connected(self):
+        with self.__condition:
+            self.__clients += 1
+            self.__condition.notify_all()
+
+    def client_disconnected(self):
+        with self.__condition:
+            self.__clients -= 1
+
+    def __encode_loop(self):
+        last_seq = 0
+        while self.__running:
+            with self.__condition:
+                self.__condition.wait_for(lambda: self.__clients > 0 or not self.__running)
+            started = monotonic()
+
+            seq, frame = self.__frame_slot.peek()
+            if frame is not None and seq != last_seq:
+                last_seq = seq
+                if self.__scale != 1:
+                    frame = cv2.resize(frame, None, fx=self.__scale, fy=self.__scale, interpolation=cv2.INTER_AREA)
+                ok, encoded = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.__quality])
+                if ok:
+                    with self.__condition:
+                        self.__jpeg = encoded.tobytes()
+                        self.__jpeg_seq += 1
+                        self.__condition.notify_all()
+
+            sleep(max(0, self.__interval - (monotonic() - started)))
+
+
+class _PreviewHandler(BaseHTTPRequestHandler):
+    preview = None
+
+    def do_GET(self):
+        if self.path == "/":
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(INDEX_PAGE)))
+            self.end_headers()
+            self.wfile.write(INDEX_PAGE)
+        elif self.path == "/stream":
+            self.__stream()
+        else:
+            self.send_error(404)
+
+    def __stream(self):
+        self.send_response(200)
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={BOUNDARY}")
+        self.end_headers()
+
+        self.preview.client_connected()
+        try:
+            seq = 0
+            while self.preview.running:
+                new_seq, jpeg = self.preview.wait_for_frame(seq)
+                if new_seq == seq:
+                    continue
+                seq = new_seq
+                self.wfile.write(f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\nContent-Length: {len(jpeg)}\r\n\r\n".encode())
+                self.wfile.write(jpeg)
+                self.wfile.write(b"\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            self.preview.client_disconnected()
+
+    def log_message(self, format, *args):
+        # keep per-request access logs out of the drone console
+        pass
@@ -0,0 +1,108 @@
+import argparse
+import csv
+from time import monotonic, perf_counter, sleep
+
+import cv2
+
+from follow_controller import FollowController
+from inference_backends import BACKENDS, load_backend
+from pose_processing import extract_poses, measure_target, select_largest
+from stream_replay import ClipReader
+from target_lock import TargetLock
+
+STAGES = ("convert", "inference", "control", "total")
+
+
+def percentile(values, q):
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def run_clip(reader, model, realtime=False, use_lock=True):
+    """
+    Runs every frame of the clip through the follow-mode pipeline on one thread, so
+    the result only depends on the clip and settings. In real-time mode frames that
+    were superseded while the previous one was being processed are skipped, as on
+    the live stream.
+    """
+    target_lock = TargetLock()
+    controller = FollowController()
+    timings = {stage: [] for stage in STAGES}
+    rc_trace = []
+    skipped = 0
+
+    frames = list(reader.frame_times)
+    started = monotonic()
+    previous_t = None
+    for index, (t, bgr) in enumerate(reader.frames()):
+        if realtime:
+            elapsed = monotonic() - started
+            if index + 1 < len(frames) and frames[index + 1] <= elapsed:
+                skipped += 1
+                continue
+            sleep(max(0, t - elapsed))
+
+        frame_start = perf_counter()
+        # the live pipeline receives RGB from djitellopy and converts it, so pay the same cost here
+        frame = cv2.cvtColor(cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB), cv2.COLOR_RGB2BGR)
+        converted = perf_counter()
+
+        if use_lock:
+            pose_frame, target_index = target_lock.infer(model, frame)
+        else:
+            pose_frame = extract_poses(model.track(frame, persist=True, verbose=False))
+            target_index = select_largest(pose_frame) if pose_frame is not None else None
+        inferred = perf_counter()
+
+        target = None
+        if pose_frame is not None and target_index is not None:
+            target = measure_target(pose_frame.keypoints[target_index], frame.shape)
+        # recorded frame spacing, not wall time, so faster-than-real-time runs see the flight's dt
+        dt = None if previous_t is None else max(t - previous_t, 1e-3)
+        controller.update(target, dt=dt)
+        previous_t = t
+        controlled = perf_counter()
+
+        rc_trace.append((index, t, *controller.rc_command()))
+        timings["convert"].append((converted - frame_start) * 1000)
+        timings["inference"].append((inferred - converted) * 1000)
+        timings["control"].append((controlled - inferred) * 1000)
+        timings["total"].append((controlled - frame_start) * 1000)
+
+    wall_time = monotonic() - started
+    return timings, rc_trace, skipped, wall_time
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a recorded clip through the follow pipeline and report fps, stage latency and rc commands.")
+    parser.add_argument("clip", help="clip folder written by stream_replay.py")
+    parser.add_argument("--backend", choices=BACKENDS, default="pytorch")
+    parser.add_argument("--weights", default="yolo11n-pose.pt")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--dynamic", action="store_true", help="export with dynamic input shapes")
+    parser.add_argument("--realtime", action="store_true", help="pace frames at their recorded arrival times")
+    parser.add_argument("--no-lock", action="store_true", help="run full-frame tracking on every frame")
+    parser.add_argument("--rc-trace", default=None, help="write the rc command trace to this CSV file")
+    args = parser.parse_args()
+
+    reader = ClipReader(args.clip)
+    model = load_backend(args.backend, args.weights, args.imgsz, dynamic=args.dynamic)
+    timings, rc_trace, skipped, wall_time = run_clip(reader, model, args.realtime, not args.no_lock)
+
+    processed = len(timings["total"])
+    print(f"Clip: {len(reader)} frames, processed {processed}, skipped {skipped}, {processed / wall_time:.1f} fps")
+    print(f"{'stage':<12}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    for stage in STAGES:
+        values = timings[stage]
+        print(f"{stage:<12}{percentile(values, 0.5):>10.1f}{percentile(values, 0.95):>10.1f}{max(values, default=float('nan')):>10.1f}")
+
+    rc_changes = sum(1 for a, b in zip(rc_trace, rc_trace[1:]) if a[2:] != b[2:])
+    print(f"rc commands: {len(rc_trace)} computed, {rc_changes} changes")
+    if args.rc_trace:
+        with open(args.rc_trace, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["frame", "t", "left_right", "forward_backward", "up_down", "yaw"])
+            writer.writerows(rc_trace)
+        print(f"rc trace written to {args.rc_trace}")
@@ -0,0 +1,135 @@
+from time import monotonic
+
+from latency_trace import LatencyHistogram
+
+ENVELOPES = ("low_tof", "max_height", "low_battery", "over_temperature")
+# the time-of-flight sensor reads this when nothing is in range below the drone
+TOF_OUT_OF_RANGE = 6553
+
+
+class SafetyMonitor:
+    """
+    Watches the state packets djitellopy already receives and parses, about
+    ten a second, and steps in without going through speech or the LLM:
+
+      low_tof           time-of-flight distance below min_tof_cm: climb
+      max_height        height above max_height_cm: descend
+      low_battery       battery below min_battery percent: land
+      over_temperature  hottest sensor above max_temperature C: land
+
+    Climbs and descents are rc overrides on the up/down axis, which the rc
+    lane applies over whatever the follow loop asks for until the drone is
+    back inside the envelope plus a hysteresis margin. The Tello's ToF
+    sensor looks down, so low_tof guards against the floor and anything the
+    drone drifts over. Each packet is checked within poll_interval of
+    arriving, well inside one state period.
+    """
+    def __init__(self, tello, tello_io, is_flying, on_land, min_tof_cm=30, max_height_cm=300, min_battery=15,
+                 max_temperature=85, climb_speed=40, descend_speed=30, hysteresis_cm=10, poll_interval=0.01,
+                 stale_after=1.0):
+        self.tello = tello
+        self.tello_io = tello_io
+        self.is_flying = is_flying
+        self.on_land = on_land
+        self.min_tof_cm = min_tof_cm
+        self.max_height_cm = max_height_cm
+        self.min_battery = min_battery
+        self.max_temperature = max_temperature
+        self.climb_speed = climb_speed
+        self.descend_speed = descend_speed
+        self.hysteresis_cm = hysteresis_cm
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+
+        self.__override = None  # envelope currently held by an rc override
+        self.__landing = False
+        self.__last_packet = None
+        self.packet_interval = LatencyHistogram()
+
+        self.packets = 0
+        self.stale = 0
+        self.interventions = {envelope: 0 for envelope in ENVELOPES}
+
+    def run(self, stop_event):
+        print(f"Safety monitor started: ToF >= {self.min_tof_cm} cm, height <= {self.max_height_cm} cm, "
+              f"battery >= {self.min_battery}%, temperature <= {self.max_temperature} C")
+        state = None
+        stale = False
+        while not stop_event.wait(self.poll_interval):
+            try:
+                latest = self.tello.get_current_state()
+                now = monotonic()
+                if latest is state or not latest:
+                    # djitellopy swaps in a new dict for every packet
+                    if (self.__last_packet is not None and now - self.__last_packet > self.stale_after
+                            and not stale and self.is_flying()):
+                        self.stale += 1
+                        stale = True
+                        print(f"SAFETY: no Tello state for {self.stale_after} s")
+                    continue
+                state = latest
+                stale = False
+                if self.__last_packet is not None:
+                    self.packet_interval.add((now - self.__last_packet) * 1000)
+                self.__last_packet = now
+                self.packets += 1
+                self.check(state)
+            except Exception as e:
+                print(f"Error in safety monitor: {e}")
+        self.__release_override()
+        print(f"SAFETY: {self.summary()}")
+        print("Safety monitor finished")
+
+    def check(self, state):
+        """Applies the envelopes to one parsed state packet."""
+        if not self.is_flying():
+            self.__release_override()
+            self.__landing = False
+            return
+        if self.__landing:
+            return
+
+        battery = int(state.get("bat", 100))
+        temperature = max(int(state.get("templ", 0)), int(state.get("temph", 0)))
+        if battery < self.min_battery:
+            self.__land("low_battery", f"battery at {battery}%")
+            return
+        if temperature > self.max_temperature:
+            self.__land("over_temperature", f"temperature at {temperature} C")
+            return
+
+        tof = int(state.get("tof", TOF_OUT_OF_RANGE))
+        height = int(state.get("h", 0))
+        if self.__override == "low_tof":
+            if tof >= self.min_tof_cm + self.hysteresis_cm:
+                self.__release_override()
+        elif self.__override == "max_height":
+            if height <= self.max_height_cm - self.hysteresis_cm:
+                self.__release_override()
+        elif tof < self.min_tof_cm:
+            self.__hold("low_tof", self.climb_speed, f"ToF at {tof} cm")
+        elif height > self.max_height_cm:
+            self.__hold("max_height", -self.descend_speed, f"height at {height} cm")
+
+    def summary(self):
+        counts = ", ".join(f"{envelope} {count}" for envelope, count in self.interventions.items())
+        return (f"{self.packets} state packets (interval p50={self.packet_interval.percentile(0.5):.0f} "
+                f"p95={self.packet_interval.percentile(0.95):.0f}ms), {self.stale} stale, interventions: {counts}")
+
+    def __hold(self, envelope, up_down_velocity, reason):
+        self.interventions[envelope] += 1
+        self.__override = envelope
+        self.tello_io.override_rc((None, None, up_down_velocity, None))
+        print(f"SAFETY: {reason}, holding up/down at {up_down_velocity}")
+
+    def __release_override(self):
+        if self.__override is not None:
+            self.__override = None
+            self.tello_io.override_rc(None)
+
+    def __land(self, envelope, reason):
+        self.interventions[envelope] += 1
+        self.__landing = True
+        self.__release_override()
+        print(f"SAFETY: {reason}, landing")
+        self.on_land(envelope)
@@ -0,0 +1,292 @@
+import argparse
+import json
+import os
+import threading
+from time import monotonic, sleep
+
+import cv2
+
+VIDEO_FILE = "video.mkv"
+FRAMES_FILE = "frames.jsonl"
+STATE_FILE = "state.jsonl"
+POLL_INTERVAL = 0.002
+
+
+class ClipRecorder:
+    """
+    Records a Tello session for later replay: every decoded frame goes into a
+    lossless video with its arrival time, and every state packet djitellopy
+    parses is logged with its arrival time.
+    """
+    def __init__(self, tello, frame_read, directory, fps=30, codec="FFV1"):
+        self.directory = directory
+        self.__tello = tello
+        self.__frame_read = frame_read
+        self.__fps = fps
+        self.__fourcc = cv2.VideoWriter_fourcc(*codec)
+        self.__stop_event = threading.Event()
+        self.__threads = []
+        self.__started = None
+
+        self.frame_count = 0
+        self.state_count = 0
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self.__started = monotonic()
+        self.__threads = [
+            threading.Thread(target=self.__record_frames, daemon=True),
+            threading.Thread(target=self.__record_state, daemon=True),
+        ]
+        for thread in self.__threads:
+            thread.start()
+        print(f"Recording clip to {self.directory}")
+
+    def stop(self):
+        self.__stop_event.set()
+        for thread in self.__threads:
+            thread.join()
+        print(f"Clip recorded: {self.frame_count} frames, {self.state_count} state packets")
+
+    def __record_frames(self):
+        writer = None
+        previous = None
+        with open(os.path.join(self.directory, FRAMES_FILE), "w") as index:
+            while not self.__stop_event.is_set():
+                frame = self.__frame_read.frame
+                if frame is None or frame is previous:
+                    sleep(POLL_INTERVAL)
+                    continue
+                previous = frame
+                arrived = monotonic() - self.__started
+
+                bgr = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+                if writer is None:
+                    height, width = bgr.shape[:2]
+                    writer = cv2.VideoWriter(os.path.join(self.directory, VIDEO_FILE), self.__fourcc, self.__fps, (width, height))
+                writer.write(bgr)
+                index.write(json.dumps({"index": self.frame_count, "t": arrived}) + "\n")
+                self.frame_count += 1
+        if writer is not None:
+            writer.release()
+
+    def __record_state(self):
+        previous = None
+        with open(os.path.join(self.directory, STATE_FILE), "w") as log:
+            while not self.__stop_event.is_set():
+                # djitellopy swaps in a new dict for every state packet it parses
+                state = self.__tello.get_current_state()
+                if state and state is not previous:
+                    previous = state
+                    log.write(json.dumps({"t": monotonic() - self.__started, "state": state}) + "\n")
+                    self.state_count += 1
+                sleep(POLL_INTERVAL)
+
+
+class ClipReader:
+    """Reads a recorded clip back as (t, BGR frame) pairs plus its state log."""
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, FRAMES_FILE)) as f:
+            self.frame_times = [json.loads(line)["t"] for line in f if line.strip()]
+        self.states = []
+        state_path = os.path.join(directory, STATE_FILE)
+        if os.path.exists(state_path):
+            with open(state_path) as f:
+                self.states = [json.loads(line) for line in f if line.strip()]
+
+    @property
+    def video_path(self):
+        return os.path.join(self.directory, VIDEO_FILE)
+
+    def __len__(self):
+        return len(self.frame_times)
+
+    def frames(self):
+        capture = cv2.VideoCapture(self.video_path)
+        try:
+            for t in self.frame_times:
+                ok, frame = capture.read()
+                if not ok:
+                    break
+                yield t, frame
+        finally:
+            capture.release()
+
+    def state_at(self, t):
+        """The last state packet received at or before clip time t."""
+        latest = {}
+        for record in self.states:
+            if record["t"] > t:
+                break
+            latest = record["state"]
+        return latest
+
+
+class ReplayFrameRead:
+    """
+    Drop-in for djitellopy's BackgroundFrameRead that plays a recorded clip.
+
+    In real-time mode frames appear at their recorded arrival times and a slow
+    reader misses some, like on the live stream. Otherwise each frame is held
+    until it has been read once, so the run is as fast as the reader and no
+    frames are lost.
+    """
+    def __init__(self, directory, realtime=True, loop=False):
+        self.stopped = False
+        self.finished = threading.Event()
+        self.__reader = ClipReader(directory)
+        self.__realtime = realtime
+        self.__loop = loop
+        self.__condition = threading.Condition()
+        self.__frame = None
+        self.__read = True
+        self.__started = None
+        self.__thread = threading.Thread(target=self.__play, daemon=True)
+        self.__thread.start()
+
+    @property
+    def frame(self):
+        with self.__condition:
+            self.__read = True
+            self.__condition.notify_all()
+            return self.__frame
+
+    def clip_time(self):
+        """Seconds since playback started, on the clip's own clock."""
+        return 0 if self.__started is None else monotonic() - self.__started
+
+    def stop(self):
+        self.stopped = True
+        with self.__condition:
+            self.__condition.notify_all()
+
+    def __play(self):
+        while not self.stopped:
+            self.__started = monotonic()
+            for t, bgr in self.__reader.frames():
+                if self.stopped:
+                    return
+                if self.__realtime:
+                    sleep(max(0, t - (monotonic() - self.__started)))
+                rgb = cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB) # djitellopy hands out RGB frames
+                with self.__condition:
+                    if not self.__realtime:
+                        self.__condition.wait_for(lambda: self.__read or self.stopped)
+                    self.__frame = rgb
+                    self.__read = False
+            if not self.__loop:
+                break
+        self.finished.set()
+
+
+class ReplayTello:
+    """
+    Stands in for a Tello when replaying a clip: state getters answer from the
+    recorded state log, commands are acknowledged without flying, and
+    commands and rc commands are kept as traces for comparing runs.
+    """
+    def __init__(self, directory, realtime=True, loop=False):
+        self.directory = directory
+        self.__realtime = realtime
+        self.__loop = loop
+        self.__reader = ClipReader(directory)
+        self.__frame_read = None
+        self.rc_trace = []
+        self.command_trace = []
+
+    def connect(self, wait_for_state=True):
+        print(f"Replaying clip {self.directory} instead of connecting to a Tello")
+
+    def streamon(self):
+        pass
+
+    def streamoff(self):
+        if self.__frame_read is not None:
+            self.__frame_read.stop()
+
+    def get_frame_read(self, *args, **kwargs):
+        if self.__frame_read is None:
+            self.__frame_read = ReplayFrameRead(self.directory, self.__realtime, self.__loop)
+        return self.__frame_read
+
+    def get_udp_video_address(self):
+        return self.__reader.video_path
+
+    def clip_time(self):
+        return self.__frame_read.clip_time() if self.__frame_read is not None else 0
+
+    def get_current_state(self):
+        return self.__reader.state_at(self.clip_time())
+
+    def get_state_field(self, key):
+        return self.get_current_state().get(key)
+
+    def send_rc_control(self, left_right_velocity, forward_backward_velocity, up_down_velocity, yaw_velocity):
+        self.rc_trace.append((self.clip_time(), left_right_velocity, forward_backward_velocity, up_down_velocity, yaw_velocity))
+
+    def send_control_command(self, command, timeout=None):
+        print(f"REPLAY: ignoring command '{command}'")
+        self.command_trace.append((self.clip_time(), command))
+        return True
+
+    def send_read_command(self, command):
+        return "ok"
+
+    def send_command_without_return(self, command):
+        pass
+
+    def get_battery(self):
+        return self.get_state_field("bat")
+
+    # command_thread calls Tello's own methods with this as self, e.g. Tello.move_forward(self=replay_tello, x=50),
+    # and those go through these, as on a Tello, to send_control_command
+    def move(self, direction, x):
+        self.send_control_command(f"{direction} {x}")
+
+    def rotate_clockwise(self, x):
+        self.send_control_command(f"cw {x}")
+
+    def rotate_counter_clockwise(self, x):
+        self.send_control_command(f"ccw {x}")
+
+    def flip(self, direction):
+        self.send_control_command(f"flip {direction}")
+
+    def go_xyz_speed(self, x, y, z, speed):
+        self.send_control_command(f"go {x} {y} {z} {speed}")
+
+    def curve_xyz_speed(self, x1, y1, z1, x2, y2, z2, speed):
+        self.send_control_command(f"curve {x1} {y1} {z1} {x2} {y2} {z2} {speed}")
+
+    def set_speed(self, x):
+        self.send_control_command(f"speed {x}")
+
+    def land(self):
+        self.send_control_command("land")
+
+    def takeoff(self):
+        self.send_control_command("takeoff")
+
+    def emergency(self):
+        self.send_command_without_return("emergency")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record a Tello video and state clip for replay.")
+    parser.add_argument("directory", help="folder to write the clip into")
+    parser.add_argument("--seconds", type=float, default=60)
+    args = parser.parse_args()
+
+    from djitellopy import Tello
+    tello = Tello()
+    tello.connect()
+    tello.streamon()
+    clip_recorder = ClipRecorder(tello, tello.get_frame_read(), args.directory)
+    clip_recorder.start()
+    try:
+        sleep(args.seconds)
+    except KeyboardInterrupt:
+        pass
+    clip_recorder.stop()
+    tello.streamoff()
@@ -0,0 +1,112 @@
+import numpy as np
+
+from pose_processing import LEFT_SHOULDER, NOSE, RIGHT_SHOULDER
+
+# filtered coordinates: (keypoint index, axis) with axis 0 = x, 1 = y
+FILTERED_CHANNELS = ((NOSE, 0), (NOSE, 1), (LEFT_SHOULDER, 0), (RIGHT_SHOULDER, 0))
+
+
+class ConstantVelocityFilter:
+    """
+    Independent constant-velocity Kalman filters for a handful of scalar
+    channels, run together as array operations. Each channel's state is
+    position and velocity in pixels and pixels per second.
+    """
+    def __init__(self, channels, process_noise=2000.0, measurement_noise=25.0, initial_velocity_variance=1e4):
+        self.channels = channels
+        self.process_noise = process_noise
+        self.measurement_noise = measurement_noise
+        self.initial_velocity_variance = initial_velocity_variance
+        self.reset()
+
+    def reset(self):
+        self.x = np.zeros((self.channels, 2))
+        self.P = np.zeros((self.channels, 2, 2))
+        self.initialized = np.zeros(self.channels, dtype=bool)
+        self.t = None
+
+    def predict(self, t):
+        """Advances every channel to time t (seconds)."""
+        if self.t is None:
+            self.t = t
+            return
+        dt = t - self.t
+        if dt <= 0:
+            return
+        F = np.array([[1.0, dt], [0.0, 1.0]])
+        Q = self.process_noise * np.array([[dt ** 3 / 3, dt ** 2 / 2], [dt ** 2 / 2, dt]])
+        self.x = self.x @ F.T
+        self.P = F @ self.P @ F.T + Q
+        self.t = t
+
+    def update(self, z, visible):
+        """Corrects the channels marked visible with measured positions z."""
+        new = visible & ~self.initialized
+        self.x[new] = np.column_stack([z[new], np.zeros(new.sum())])
+        self.P[new] = np.diag([self.measurement_noise, self.initial_velocity_variance])
+        self.initialized |= new
+
+        update = visible & ~new
+        if not update.any():
+            return
+        P = self.P[update]
+        innovation = z[update] - self.x[update, 0]
+        S = P[:, 0, 0] + self.measurement_noise
+        K = P[:, :, 0] / S[:, None]
+        self.x[update] += K * innovation[:, None]
+        # P = (I - K H) P with H = [1, 0]
+        self.P[update] = P - K[:, :, None] * P[:, 0:1, :]
+
+    def position_at(self, t):
+        """Extrapolated positions at time t, without changing the filter."""
+        dt = 0.0 if self.t is None else max(t - self.t, 0.0)
+        return self.x[:, 0] + self.x[:, 1] * dt
+
+
+class TargetPredictor:
+    """
+    Filters the follow target's nose and shoulder keypoints from timestamped
+    detections so the controller can ask where the target is now rather than
+    where it was when the frame was captured.
+    """
+    def __init__(self, max_prediction=0.5, **filter_args):
+        self.max_prediction = max_prediction
+        self.__filter = ConstantVelocityFilter(len(FILTERED_CHANNELS), **filter_args)
+        self.__keypoints = None
+        self.__measured_at = None
+
+    def reset(self):
+        self.__filter.reset()
+        self.__keypoints = None
+        self.__measured_at = None
+
+    @property
+    def measured_at(self):
+        return self.__measured_at
+
+    def add(self, keypoints, confident, captured_at):
+        """Feeds one detection of the target, timed by when its frame was captured."""
+        if self.__measured_at is not None and captured_at <= self.__measured_at:
+            return
+        self.__filter.predict(captured_at)
+        z = np.array([keypoints[index, axis] for index, axis in FILTERED_CHANNELS])
+        visible = np.array([confident[index] for index, _ in FILTERED_CHANNELS])
+        self.__filter.update(z, visible)
+        self.__keypoints = keypoints
+        self.__measured_at = captured_at
+
+    def keypoints_at(self, t):
+        """
+        The last detection's keypoints with the filtered channels moved to their predicted
+        position at time t, or None before the first detection. Prediction is capped at
+        max_prediction seconds past the last measurement.
+        """
+        if self.__keypoints is None:
+            return None
+        t = min(t, self.__measured_at + self.max_prediction)
+        positions = self.__filter.position_at(t)
+        keypoints = self.__keypoints.copy()
+        for (index, axis), position, initialized in zip(FILTERED_CHANNELS, positions, self.__filter.initialized):
+            if initialized:
+                keypoints[index, axis] = position
+        return keypoints
@@ -0,0 +1,146 @@
+import numpy as np
+
+from pose_processing import PoseFrame, extract_poses, select_largest
+
+
+def xywh_to_xyxy(box):
+    x, y, w, h = box
+    return np.array([x - w / 2, y - h / 2, x + w / 2, y + h / 2])
+
+
+def iou(box, boxes):
+    """IoU between one xyxy box and an (N, 4) array of xyxy boxes."""
+    x1 = np.maximum(box[0], boxes[:, 0])
+    y1 = np.maximum(box[1], boxes[:, 1])
+    x2 = np.minimum(box[2], boxes[:, 2])
+    y2 = np.minimum(box[3], boxes[:, 3])
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    return intersection / np.maximum(area + areas - intersection, 1e-6)
+
+
+def shift_pose_frame(pose_frame, dx, dy):
+    """Moves crop-relative detections back into full-frame pixel coordinates."""
+    boxes = pose_frame.boxes.copy()
+    boxes[:, 0] += dx
+    boxes[:, 1] += dy
+    keypoints = pose_frame.keypoints.copy()
+    keypoints[:, :, 0] += dx
+    keypoints[:, :, 1] += dy
+    return PoseFrame(boxes, keypoints, pose_frame.track_ids, full_frame=False)
+
+
+class TargetLock:
+    """
+    Keeps follow mode locked onto one person.
+
+    Full-frame tracking passes pick the target and remember its track ID; in
+    between, inference only runs on a padded crop around the last known box at
+    a smaller input size, and the target is matched there by overlap. A lost
+    target or the periodic re-acquisition interval forces a full-frame pass.
+    """
+    def __init__(self, roi_imgsz=320, reacquire_interval=15, max_misses=5, padding=0.6, min_crop=160, min_iou=0.2):
+        self.roi_imgsz = roi_imgsz
+        self.reacquire_interval = reacquire_interval
+        self.max_misses = max_misses
+        self.padding = padding
+        self.min_crop = min_crop
+        self.min_iou = min_iou
+
+        self.full_passes = 0
+        self.roi_passes = 0
+        self.reset()
+
+    def reset(self):
+        self.locked_id = None
+        self.__last_box = None # xyxy, full-frame pixels
+        self.__misses = 0
+        self.__frames_since_full = 0
+
+    @property
+    def locked(self):
+        return self.__last_box is not None
+
+    def infer(self, model, frame, imgsz=None, **kwargs):
+        """Runs the next full-frame or crop pass. Returns (pose_frame, target_index)."""
+        region = self.next_region(frame.shape)
+        if region is None:
+            pose_frame = extract_poses(model.track(frame, imgsz=imgsz, persist=True, verbose=False, **kwargs))
+            self.full_passes += 1
+        else:
+            x1, y1, x2, y2 = region
+            crop = frame[y1:y2, x1:x2]
+            roi_imgsz = min(self.roi_imgsz, imgsz) if imgsz else self.roi_imgsz
+            pose_frame = extract_poses(model.predict(crop, imgsz=roi_imgsz, verbose=False, **kwargs))
+            if pose_frame is not None:
+                pose_frame = shift_pose_frame(pose_frame, x1, y1)
+            self.roi_passes += 1
+        return pose_frame, self.update(pose_frame, region is None)
+
+    def move(self, box):
+        """
+        Re-centres the next crop on an xywh box the target was carried to between passes, e.g. by
+        keypoint flow. Called from another thread; replacing the box is a single assignment.
+        """
+        if self.locked:
+            self.__last_box = xywh_to_xyxy(box)
+
+    def next_region(self, frame_shape):
+        """Crop to run on as (x1, y1, x2, y2), or None when a full-frame pass is due."""
+        if not self.locked or self.__misses > 0 or self.__frames_since_full >= self.reacquire_interval:
+            return None
+
+        height, width = frame_shape[:2]
+        x1, y1, x2, y2 = self.__last_box
+        # pad the box and square it up so little of the crop is lost to letterboxing
+        side = max(x2 - x1, y2 - y1) * (1 + 2 * self.padding)
+        side = min(max(side, self.min_crop), width, height)
+        cx, cy = (x1 + x2) / 2, (y1 + y2) / 2
+        left = int(np.clip(cx - side / 2, 0, width - side))
+        top = int(np.clip(cy - side / 2, 0, height - side))
+        return left, top, left + int(side), top + int(side)
+
+    def update(self, pose_frame, full_frame):
+        """Picks the locked person out of the detections, returning its index or None."""
+        if full_frame:
+            self.__frames_since_full = 0
+        else:
+            self.__frames_since_full += 1
+
+        index = None
+        if pose_frame is not None and len(pose_frame):
+            index = self.__match(pose_frame, full_frame)
+
+        if index is None:
+            if not self.locked:
+                return None
+            self.__misses += 1
+            if self.__misses > self.max_misses:
+                print(f"TARGET LOCK: lost track {self.locked_id}, re-acquiring")
+                self.reset()
+            return None
+
+        self.__misses = 0
+        self.__last_box = xywh_to_xyxy(pose_frame.boxes[index])
+        if full_frame and pose_frame.track_ids is not None:
+            track_id = int(pose_frame.track_ids[index])
+            if track_id != self.locked_id:
+                print(f"TARGET LOCK: locked onto track {track_id}")
+            self.locked_id = track_id
+        return index
+
+    def __match(self, pose_frame, full_frame):
+        if full_frame and self.locked_id is not None and pose_frame.track_ids is not None:
+            matches = np.flatnonzero(pose_frame.track_ids == self.locked_id)
+            if len(matches):
+                return int(matches[0])
+
+        if not self.locked:
+            return select_largest(pose_frame) if full_frame else None
+
+        # the tracker does not see crop passes, and may re-number a briefly lost person, so fall back to overlap
+        boxes = np.array([xywh_to_xyxy(box) for box in pose_frame.boxes])
+        overlaps = iou(self.__last_box, boxes)
+        best = int(np.argmax(overlaps))
+        return best if overlaps[best] >= self.min_iou else None
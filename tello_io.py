@@ -0,0 +1,284 @@
+import queue
+import threading
+from collections import deque
+from time import monotonic, sleep
+
+from latency_trace import LatencyHistogram
+from vision_pipeline import LatestSlot
+
+LANES = ("emergency", "rc", "maneuver", "keep_alive")
+# how long to let a reply to a command sent over an in-flight maneuver arrive before discarding it
+STRAY_RESPONSE_GRACE = 0.3
+# a keep-alive is over within this long; a maneuver is not, and the emergency lane sends without waiting for it
+EMERGENCY_LOCK_WAIT = 0.25
+
+
+def clear_responses(tello):
+    """Drops command replies djitellopy has buffered but nobody is waiting for."""
+    if hasattr(tello, "get_own_udp_object"):
+        tello.get_own_udp_object()["responses"].clear()
+
+
+class TelloIO:
+    """
+    The only code that talks to the Tello once flying. Commands go through
+    separate lanes, each served by its own thread:
+
+      emergency   land / emergency. Cancels queued maneuvers, zeroes the rc
+                  setpoint and goes out even while a maneuver is in flight.
+      rc          latest-value rc setpoint, sent when it changes at no more
+                  than rc_rate_hz. Older setpoints are overwritten, never queued.
+                  An override, e.g. from the safety monitor, replaces single
+                  axes of every setpoint until it is cleared.
+      maneuver    blocking SDK calls such as move_forward, run one at a time.
+      keep_alive  "command" every keep_alive_interval, skipped while other
+                  traffic already keeps the link alive.
+
+    djitellopy matches replies to commands by order, so only one command that
+    waits for a reply may be in flight. The maneuver and keep-alive lanes
+    share a thread for that reason; rc commands get no reply and never wait.
+    """
+    def __init__(self, tello, rc_rate_hz=20, keep_alive_interval=3.0, maneuver_queue_size=8):
+        self.tello = tello
+        self.rc_rate_hz = rc_rate_hz
+        self.keep_alive_interval = keep_alive_interval
+        self.__stop_event = threading.Event()
+        self.__threads = []
+
+        self.__rc_slot = LatestSlot("rc")
+        self.__rc_lock = threading.Lock()
+        self.__rc_seq = 0
+        self.__rc_setpoint = (0, 0, 0, 0)
+        self.__rc_override = None
+        self.__rc_taken_seq = 0
+        self.__emergency = deque()
+        self.__emergency_condition = threading.Condition()
+        self.__maneuvers = queue.Queue(maxsize=maneuver_queue_size)
+        # held while a command that waits for a reply is in flight
+        self.__response_lock = threading.Lock()
+        self.__stray_responses = False
+
+        self.__stats_lock = threading.Lock()
+        self.__rtt = {lane: LatencyHistogram() for lane in LANES}
+        self.__max_depth = {lane: 0 for lane in LANES}
+        self.__last_traffic = monotonic()
+        self.__next_keep_alive = self.__last_traffic + keep_alive_interval
+
+        self.sent = {lane: 0 for lane in LANES}
+        self.errors = {lane: 0 for lane in LANES}
+        self.keep_alive_suppressed = 0
+        self.maneuvers_cancelled = 0
+
+    def start(self):
+        self.__threads = [
+            threading.Thread(target=self.__emergency_loop, daemon=True),
+            threading.Thread(target=self.__rc_loop, daemon=True),
+            threading.Thread(target=self.__maneuver_loop, daemon=True),
+        ]
+        for thread in self.__threads:
+            thread.start()
+        print(f"Tello I/O started: rc at {self.rc_rate_hz} Hz, keep-alive every {self.keep_alive_interval} s")
+
+    def stop(self):
+        """Stops the lanes; afterwards the caller owns the Tello again, e.g. to land it."""
+        self.__stop_event.set()
+        self.__rc_slot.close()
+        with self.__emergency_condition:
+            self.__emergency_condition.notify_all()
+        for thread in self.__threads:
+            thread.join()
+        print("Tello I/O stopped")
+
+    # --- Lanes ---
+
+    def send_rc_control(self, left_right_velocity, forward_backward_velocity, up_down_velocity, yaw_velocity):
+        """Sets the rc setpoint; same signature as Tello.send_rc_control so it can stand in for it."""
+        with self.__rc_lock:
+            self.__rc_setpoint = (left_right_velocity, forward_backward_velocity, up_down_velocity, yaw_velocity)
+            self.__put_rc()
+        self.__note_depth("rc", self.__rc_depth())
+
+    def override_rc(self, rc=None):
+        """
+        Forces axes of every rc command sent from now on, e.g. override_rc((None, None, 40, None))
+        climbs whatever the setpoint says. None clears the override.
+        """
+        with self.__rc_lock:
+            self.__rc_override = rc
+            # resend the current setpoint so the change goes out now rather than with the next one
+            self.__put_rc()
+
+    def emergency(self, command="land", on_done=None):
+        """Sends "land" or "emergency" ahead of everything else."""
+        with self.__emergency_condition:
+            self.__emergency.append((command, on_done))
+            self.__note_depth("emergency", len(self.__emergency))
+            self.__emergency_condition.notify_all()
+
+    def submit(self, command_name, call, on_done=None):
+        """
+        Queues a blocking Tello call, e.g. submit("move_forward", lambda: tello.move_forward(50)).
+        on_done(response, error) is called from the maneuver thread when it finishes.
+        Returns False if the maneuver queue is full.
+        """
+        try:
+            self.__maneuvers.put_nowait((command_name, call, on_done))
+        except queue.Full:
+            print(f"TELLO I/O: maneuver queue full, dropping '{command_name}'")
+            return False
+        self.__note_depth("maneuver", self.__maneuvers.qsize())
+        return True
+
+    def summary(self):
+        depths = {
+            "emergency": len(self.__emergency),
+            "rc": self.__rc_depth(),
+            "maneuver": self.__maneuvers.qsize(),
+            "keep_alive": 0,
+        }
+        lines = []
+        with self.__stats_lock:
+            for lane in LANES:
+                rtt = self.__rtt[lane]
+                lines.append(f"{lane}: depth {depths[lane]} (max {self.__max_depth[lane]}), sent {self.sent[lane]}, "
+                             f"errors {self.errors[lane]}, rtt p50={rtt.percentile(0.5):.1f} "
+                             f"p95={rtt.percentile(0.95):.1f} max={rtt.max:.1f}ms")
+        lines.append(f"rc setpoints coalesced {self.__rc_slot.dropped_count}, keep-alives suppressed "
+                     f"{self.keep_alive_suppressed}, maneuvers cancelled {self.maneuvers_cancelled}")
+        return "\n".join(lines)
+
+    # --- Lane threads ---
+
+    def __emergency_loop(self):
+        while True:
+            with self.__emergency_condition:
+                self.__emergency_condition.wait_for(lambda: self.__emergency or self.__stop_event.is_set())
+                if not self.__emergency:
+                    return
+                command, on_done = self.__emergency.popleft()
+
+            self.__cancel_maneuvers()
+            self.__rc_override = None
+            self.send_rc_control(0, 0, 0, 0)
+            started = monotonic()
+            response, error = None, None
+            try:
+                if command == "emergency":
+                    # motor stop has no reply
+                    self.tello.emergency()
+                elif self.__response_lock.acquire(timeout=EMERGENCY_LOCK_WAIT):
+                    try:
+                        # through land() so djitellopy knows the drone is down and does not land again on exit
+                        response = self.tello.land()
+                    finally:
+                        self.__response_lock.release()
+                else:
+                    # a maneuver is waiting for its reply; send anyway and drop the extra reply afterwards
+                    self.tello.send_command_without_return(command)
+                    self.__stray_responses = True
+            except Exception as e:
+                error = e
+            self.__record("emergency", started, error)
+            if on_done is not None:
+                on_done(response, error)
+
+    def __rc_loop(self):
+        period = 1 / self.rc_rate_hz
+        last_seq = 0
+        last_rc = None
+        while not self.__stop_event.is_set():
+            last_seq, item = self.__rc_slot.get(last_seq, timeout=0.5)
+            if item is None:
+                continue
+            self.__rc_taken_seq = last_seq
+            rc, override, set_at = item
+            if override is not None:
+                rc = tuple(value if forced is None else forced for value, forced in zip(rc, override))
+            if rc != last_rc:
+                error = None
+                try:
+                    self.tello.send_rc_control(*rc)
+                    last_rc = rc
+                except Exception as e:
+                    error = e
+                # rc has no reply, so its round trip is setpoint to wire
+                self.__record("rc", set_at, error)
+                sleep(period)
+
+    def __maneuver_loop(self):
+        while not self.__stop_event.is_set():
+            try:
+                item = self.__maneuvers.get(timeout=max(0.05, min(0.5, self.__next_keep_alive - monotonic())))
+            except queue.Empty:
+                self.__keep_alive()
+                continue
+            command_name, call, on_done = item
+            response, error = None, None
+            with self.__response_lock:
+                self.__discard_stray_responses()
+                started = monotonic()
+                try:
+                    response = call()
+                except Exception as e:
+                    error = e
+                self.__record("maneuver", started, error)
+            if on_done is not None:
+                on_done(response, error)
+
+    def __keep_alive(self):
+        now = monotonic()
+        if now < self.__next_keep_alive:
+            return
+        self.__next_keep_alive = now + self.keep_alive_interval
+        if now - self.__last_traffic < self.keep_alive_interval:
+            # rc commands or maneuvers went out recently enough
+            self.keep_alive_suppressed += 1
+            return
+        with self.__response_lock:
+            self.__discard_stray_responses()
+            started = monotonic()
+            error = None
+            try:
+                self.tello.send_control_command("command")
+            except Exception as e:
+                error = e
+            self.__record("keep_alive", started, error)
+
+    # --- Helpers ---
+
+    def __cancel_maneuvers(self):
+        while True:
+            try:
+                command_name = self.__maneuvers.get_nowait()[0]
+            except queue.Empty:
+                return
+            self.maneuvers_cancelled += 1
+            print(f"TELLO I/O: cancelled '{command_name}'")
+
+    def __discard_stray_responses(self):
+        if self.__stray_responses:
+            sleep(STRAY_RESPONSE_GRACE)
+            clear_responses(self.tello)
+            self.__stray_responses = False
+
+    def __put_rc(self):
+        self.__rc_seq += 1
+        self.__rc_slot.put(self.__rc_seq, (self.__rc_setpoint, self.__rc_override, monotonic()))
+
+    def __rc_depth(self):
+        """1 while a setpoint is waiting to be sent; the lane never holds more."""
+        return int(self.__rc_slot.peek()[0] > self.__rc_taken_seq)
+
+    def __note_depth(self, lane, depth):
+        with self.__stats_lock:
+            self.__max_depth[lane] = max(self.__max_depth[lane], depth)
+
+    def __record(self, lane, started, error):
+        with self.__stats_lock:
+            self.__last_traffic = monotonic()
+            self.__rtt[lane].add((self.__last_traffic - started) * 1000)
+            self.sent[lane] += 1
+            if error is not None:
+                self.errors[lane] += 1
+        if error is not None:
+            print(f"TELLO I/O: {lane} command failed: {error}")
@@ -0,0 +1,416 @@
+"""
+A stand-in Tello that speaks the SDK over UDP: commands and replies on 8889,
+state packets to the client's 8890 and an H.264 camera stream to its 11111.
+
+djitellopy binds 8889 on every local address, so the simulator has to live at
+its own address, as the real drone does. On Linux a network namespace gives
+it the Tello's usual 192.168.10.1 and main.py runs against it unchanged:
+
+    sudo ip netns add tello
+    sudo ip link add tello-host type veth peer name tello-sim
+    sudo ip link set tello-sim netns tello
+    sudo ip addr add 192.168.10.2/24 dev tello-host && sudo ip link set tello-host up
+    sudo ip netns exec tello ip addr add 192.168.10.1/24 dev tello-sim
+    sudo ip netns exec tello ip link set tello-sim up
+    sudo ip netns exec tello python tello_simulator.py --video flight.mp4
+
+A container or a second machine on that address works the same way.
+"""
+import argparse
+import math
+import random
+import socket
+import threading
+from fractions import Fraction
+from time import monotonic, sleep
+
+from follow_simulator import DroneModel
+
+CONTROL_PORT = 8889
+STATE_PORT = 8890
+VIDEO_PORT = 11111
+STATE_RATE_HZ = 10
+AUTO_LAND_SECONDS = 15 # a real Tello lands after this long without any command
+VIDEO_PACKET_SIZE = 1460
+MOVE_SPEED = 60 # cm/s for up/down/forward/... x
+ROTATE_SPEED = 90 # degrees/s for cw/ccw x
+TAKEOFF_SECONDS = 4
+LAND_SECONDS = 3
+FLIP_SECONDS = 1.5
+TAKEOFF_HEIGHT = 80
+
+READ_COMMANDS = ("battery?", "speed?", "time?", "height?", "temp?", "attitude?", "baro?", "tof?", "wifi?", "sdk?", "sn?", "acceleration?")
+MOVES = {"up": (0, 0, 1), "down": (0, 0, -1), "forward": (1, 0, 0), "back": (-1, 0, 0), "left": (0, -1, 0), "right": (0, 1, 0)}
+ACKNOWLEDGED = ("speed", "wifi", "ap", "setfps", "setbitrate", "setresolution", "downvision", "keepalive", "motoron",
+                "motoroff", "mon", "moff", "mdirection")
+
+
+class SimulatedTello:
+    """
+    Answers SDK commands after latency_ms (plus up to jitter_ms), loses each
+    incoming command and each reply with probability loss, flies rc commands
+    through DroneModel and auto-lands after AUTO_LAND_SECONDS of silence.
+    Blocking commands such as takeoff or forward run one at a time and reply
+    when done, like the drone.
+    """
+    def __init__(self, host="0.0.0.0", video_path=None, latency_ms=20, jitter_ms=5, loss=0.0, seed=None,
+                 frame_size=(960, 720), fps=30, bitrate=1_500_000):
+        self.host = host
+        self.video_path = video_path
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.loss = loss
+        self.frame_size = frame_size
+        self.fps = fps
+        self.bitrate = bitrate
+        self.__random = random.Random(seed)
+        self.__stop_event = threading.Event()
+        self.__lock = threading.Lock()
+        self.__socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.__socket.settimeout(0.5)
+        self.__executor_queue = []
+        self.__executor_condition = threading.Condition()
+        self.__threads = []
+
+        self.__client = None # (ip, port) commands come from
+        self.__state_port = STATE_PORT
+        self.__video_port = VIDEO_PORT
+        self.__streaming = False
+        self.__drone = DroneModel(height=0.0)
+        self.__rc = (0, 0, 0, 0)
+        self.__flying = False
+        self.__battery = 100.0
+        self.__temperature = 40.0
+        self.__motor_time = 0.0
+        self.__speed = 10
+        self.__started = monotonic()
+        self.__last_command = None
+
+        self.commands = 0
+        self.rc_commands = 0
+        self.keep_alives = 0
+        self.replies = 0
+        self.lost = 0
+        self.longest_silence = 0.0
+        self.auto_landings = 0
+        self.state_packets = 0
+        self.frames_sent = 0
+        self.video_bytes = 0
+
+    def start(self):
+        self.__socket.bind((self.host, CONTROL_PORT))
+        self.__threads = [threading.Thread(target=loop, daemon=True)
+                          for loop in (self.__command_loop, self.__executor_loop, self.__state_loop, self.__video_loop)]
+        for thread in self.__threads:
+            thread.start()
+        print(f"Simulated Tello listening on {self.host}:{CONTROL_PORT} "
+              f"(latency {self.latency_ms}±{self.jitter_ms} ms, loss {self.loss:.0%})")
+
+    def stop(self):
+        self.__stop_event.set()
+        with self.__executor_condition:
+            self.__executor_condition.notify_all()
+        for thread in self.__threads:
+            thread.join()
+        self.__socket.close()
+
+    def summary(self):
+        uptime = monotonic() - self.__started
+        return (f"{self.commands} commands ({self.rc_commands} rc, {self.keep_alives} keep-alive), {self.replies} replies, "
+                f"{self.lost} lost, longest silence {self.longest_silence:.1f}s, {self.auto_landings} auto-landings, "
+                f"{self.state_packets} state packets, {self.frames_sent} frames ({self.frames_sent / uptime:.1f} fps, "
+                f"{self.video_bytes * 8 / uptime / 1e6:.2f} Mbit/s)")
+
+    # --- Commands ---
+
+    def __command_loop(self):
+        while not self.__stop_event.is_set():
+            try:
+                data, address = self.__socket.recvfrom(1024)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            if self.__random.random() < self.loss:
+                self.lost += 1
+                continue
+
+            command = data.decode("utf-8", errors="replace").strip()
+            if not command:
+                continue
+            now = monotonic()
+            with self.__lock:
+                self.__client = address
+                if self.__last_command is not None:
+                    self.longest_silence = max(self.longest_silence, now - self.__last_command)
+                self.__last_command = now
+            self.commands += 1
+
+            if command.startswith("rc "):
+                self.__set_rc(command)
+            elif command == "emergency":
+                # djitellopy does not wait for a reply to emergency
+                with self.__lock:
+                    self.__land()
+            elif command in READ_COMMANDS:
+                self.__reply(address, self.__read(command))
+            else:
+                if command in ("command", "keepalive"):
+                    self.keep_alives += 1
+                with self.__executor_condition:
+                    self.__executor_queue.append((command, address))
+                    self.__executor_condition.notify_all()
+
+    def __executor_loop(self):
+        """Runs commands that take time in order and replies once each is done."""
+        while True:
+            with self.__executor_condition:
+                self.__executor_condition.wait_for(lambda: self.__executor_queue or self.__stop_event.is_set())
+                if self.__stop_event.is_set():
+                    return
+                command, address = self.__executor_queue.pop(0)
+            self.__reply(address, self.__execute(command))
+
+    def __execute(self, command):
+        name, *args = command.split()
+        with self.__lock:
+            flying = self.__flying
+        values = [float(arg) for arg in args if arg.lstrip("-").replace(".", "", 1).isdigit()]
+
+        if name == "command":
+            return "ok"
+        if name == "takeoff":
+            if flying:
+                return "error"
+            sleep(TAKEOFF_SECONDS)
+            with self.__lock:
+                self.__flying = True
+                self.__drone.height = TAKEOFF_HEIGHT
+            return "ok"
+        if name == "land":
+            if not flying:
+                return "error"
+            sleep(LAND_SECONDS)
+            with self.__lock:
+                self.__land()
+            return "ok"
+        if name in ("streamon", "streamoff"):
+            self.__streaming = name == "streamon"
+            return "ok"
+        if name == "port" and len(values) == 2:
+            self.__state_port, self.__video_port = int(values[0]), int(values[1])
+            return "ok"
+        if name == "stop":
+            self.__rc = (0, 0, 0, 0)
+            return "ok"
+        if name in MOVES or name in ("cw", "ccw", "flip", "go", "curve"):
+            if not flying:
+                return "error Not joystick"
+            self.__maneuver(name, args, values)
+            return "ok"
+        if name in ACKNOWLEDGED:
+            if name == "speed" and values:
+                self.__speed = int(values[0])
+            return "ok"
+        return f"unknown command: {command}"
+
+    def __maneuver(self, name, args, values):
+        if name in MOVES:
+            distance = values[0] if values else 0
+            sleep(distance / MOVE_SPEED)
+            forward, right, up = (axis * distance for axis in MOVES[name])
+            with self.__lock:
+                self.__move(forward, right, up)
+        elif name in ("cw", "ccw"):
+            degrees = values[0] if values else 0
+            sleep(degrees / ROTATE_SPEED)
+            with self.__lock:
+                self.__drone.yaw += math.radians(degrees if name == "cw" else -degrees)
+        elif name == "flip":
+            sleep(FLIP_SECONDS)
+        else:
+            # go x y z speed / curve x1 y1 z1 x2 y2 z2 speed: fly to the last point at the given speed
+            x, y, z, speed = values[-4:] if len(values) >= 4 else (0, 0, 0, MOVE_SPEED)
+            sleep(math.sqrt(x * x + y * y + z * z) / max(speed, 1))
+            with self.__lock:
+                self.__move(x, y, z)
+
+    def __move(self, forward, right, up):
+        drone = self.__drone
+        drone.x += forward * math.cos(drone.yaw) - right * math.sin(drone.yaw)
+        drone.y += forward * math.sin(drone.yaw) + right * math.cos(drone.yaw)
+        drone.height = max(drone.height + up, 20)
+
+    def __set_rc(self, command):
+        self.rc_commands += 1
+        try:
+            rc = tuple(max(-100, min(100, int(value))) for value in command.split()[1:5])
+        except ValueError:
+            return
+        if len(rc) == 4:
+            self.__rc = rc
+
+    def __read(self, command):
+        with self.__lock:
+            drone = self.__drone
+            return {
+                "battery?": f"{int(self.__battery)}",
+                "speed?": f"{self.__speed}",
+                "time?": f"{int(self.__motor_time)}s",
+                "height?": f"{int(drone.height / 10)}dm",
+                "temp?": f"{int(self.__temperature)}~{int(self.__temperature) + 3}C",
+                "attitude?": f"pitch:0;roll:0;yaw:{self.__yaw_degrees()};",
+                "baro?": f"{drone.height / 100:.2f}",
+                "tof?": f"{self.__tof() * 10}mm",
+                "wifi?": "90",
+                "sdk?": "20",
+                "sn?": "0TQSIMULATOR000",
+                "acceleration?": "agx:0.00;agy:0.00;agz:-1000.00;",
+            }[command]
+
+    def __reply(self, address, response):
+        delay = (self.latency_ms + self.__random.uniform(0, self.jitter_ms)) / 1000
+        threading.Timer(delay, self.__send_reply, args=(address, response)).start()
+
+    def __send_reply(self, address, response):
+        if self.__stop_event.is_set():
+            return
+        if self.__random.random() < self.loss:
+            self.lost += 1
+            return
+        self.__socket.sendto(response.encode("utf-8"), address)
+        self.replies += 1
+
+    # --- Flight state ---
+
+    def __land(self):
+        self.__flying = False
+        self.__rc = (0, 0, 0, 0)
+        self.__drone.height = 0.0
+        self.__drone.velocity[:] = 0
+
+    def __tof(self):
+        # the time-of-flight sensor reads 10 cm on the ground
+        return max(10, int(self.__drone.height))
+
+    def __yaw_degrees(self):
+        return int((math.degrees(self.__drone.yaw) + 180) % 360 - 180)
+
+    def __state_loop(self):
+        period = 1 / STATE_RATE_HZ
+        state_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        while not self.__stop_event.wait(period):
+            with self.__lock:
+                now = monotonic()
+                if self.__flying:
+                    self.__drone.step(self.__rc, period)
+                    self.__drone.height = max(self.__drone.height, 20)
+                    self.__motor_time += period
+                    self.__battery = max(0.0, self.__battery - period / 15)
+                    self.__temperature = min(90.0, self.__temperature + period / 10)
+                    if self.__last_command is not None and now - self.__last_command > AUTO_LAND_SECONDS:
+                        print(f"SIMULATOR: no command for {AUTO_LAND_SECONDS}s, auto-landing")
+                        self.auto_landings += 1
+                        self.__land()
+                else:
+                    self.__temperature = max(40.0, self.__temperature - period / 20)
+                client = self.__client
+                state = self.__state_packet()
+            if client is not None:
+                state_socket.sendto(state.encode("ascii"), (client[0], self.__state_port))
+                self.state_packets += 1
+        state_socket.close()
+
+    def __state_packet(self):
+        drone = self.__drone
+        right, forward, up = (int(v / 10) for v in drone.velocity[:3])
+        return (f"mid:-1;x:-100;y:-100;z:-100;mpry:0,0,0;pitch:0;roll:0;yaw:{self.__yaw_degrees()};"
+                f"vgx:{forward};vgy:{right};vgz:{-up};templ:{int(self.__temperature)};temph:{int(self.__temperature) + 3};"
+                f"tof:{self.__tof()};h:{int(drone.height)};bat:{int(self.__battery)};baro:{drone.height / 100:.2f};"
+                f"time:{int(self.__motor_time)};agx:0.00;agy:0.00;agz:-1000.00;\r\n")
+
+    # --- Video ---
+
+    def __video_loop(self):
+        """Encodes the video file (or a test pattern) to H.264 and sends it in Tello-sized UDP packets."""
+        import av
+        import cv2
+        import numpy as np
+
+        video_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        width, height = self.frame_size
+        encoder = None
+        capture = None
+        index = 0
+        next_frame = monotonic()
+        while not self.__stop_event.is_set():
+            client = self.__client
+            if not self.__streaming or client is None:
+                encoder = None # a new stream starts with a key frame
+                sleep(0.05)
+                next_frame = monotonic()
+                continue
+
+            if encoder is None:
+                encoder = av.CodecContext.create("libx264", "w")
+                encoder.width, encoder.height = width, height
+                encoder.pix_fmt = "yuv420p"
+                encoder.time_base = Fraction(1, self.fps)
+                encoder.bit_rate = self.bitrate
+                # a key frame every second so a decoder that joins late starts quickly
+                encoder.options = {"preset": "ultrafast", "tune": "zerolatency", "g": str(self.fps)}
+
+            frame = None
+            if self.video_path:
+                if capture is None:
+                    capture = cv2.VideoCapture(self.video_path)
+                ok, frame = capture.read()
+                if not ok:
+                    capture.release()
+                    capture = None # loop the file
+                    continue
+                frame = cv2.resize(frame, (width, height))
+            else:
+                frame = np.full((height, width, 3), 64, dtype=np.uint8)
+                cv2.putText(frame, f"SIMULATED TELLO {index}", (40 + index % (width // 2), height // 2),
+                            cv2.FONT_HERSHEY_SIMPLEX, 1.5, (255, 255, 255), 3)
+
+            video_frame = av.VideoFrame.from_ndarray(frame, format="bgr24")
+            video_frame.pts = index
+            index += 1
+            for packet in encoder.encode(video_frame):
+                data = bytes(packet)
+                for offset in range(0, len(data), VIDEO_PACKET_SIZE):
+                    video_socket.sendto(data[offset:offset + VIDEO_PACKET_SIZE], (client[0], self.__video_port))
+                self.video_bytes += len(data)
+            self.frames_sent += 1
+
+            next_frame += 1 / self.fps
+            sleep(max(0.0, next_frame - monotonic()))
+        if capture is not None:
+            capture.release()
+        video_socket.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a simulated Tello that djitellopy and main.py can connect to.")
+    parser.add_argument("--host", default="0.0.0.0", help="address to listen on for commands")
+    parser.add_argument("--video", default=None, help="video file served as the camera stream (default: test pattern)")
+    parser.add_argument("--latency-ms", type=float, default=20, help="delay before each reply")
+    parser.add_argument("--jitter-ms", type=float, default=5, help="extra random delay, up to this much")
+    parser.add_argument("--loss", type=float, default=0.0, help="probability of losing each command and each reply")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--stats-interval", type=float, default=10)
+    args = parser.parse_args()
+
+    simulator = SimulatedTello(args.host, args.video, args.latency_ms, args.jitter_ms, args.loss, args.seed, fps=args.fps)
+    simulator.start()
+    try:
+        while True:
+            sleep(args.stats_interval)
+            print(f"SIMULATOR: {simulator.summary()}")
+    except KeyboardInterrupt:
+        pass
+    simulator.stop()
+    print(f"SIMULATOR: {simulator.summary()}")
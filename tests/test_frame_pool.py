@@ -0,0 +1,61 @@
+import gc
+
+import numpy as np
+
+from frame_pool import FramePool
+
+SHAPE = (4, 6, 3)
+
+
+def test_dropped_frame_goes_back_to_the_pool():
+    pool = FramePool(max_buffers=4)
+    frame = pool.acquire(SHAPE)
+    assert pool.in_use == 1
+    del frame
+    assert pool.in_use == 0
+
+    pool.acquire(SHAPE)
+    assert (pool.allocations, pool.reuses, pool.buffers) == (1, 1, 1)
+
+
+def test_slice_keeps_the_buffer_in_use():
+    pool = FramePool(max_buffers=4)
+    frame = pool.acquire(SHAPE)
+    crop = frame[1:3, 2:4]
+    del frame
+    assert pool.in_use == 1
+    del crop
+    assert pool.in_use == 0
+
+
+def test_reused_buffer_is_not_shared_while_held():
+    pool = FramePool(max_buffers=4)
+    first = pool.copy(np.full(SHAPE, 1, dtype=np.uint8))
+    second = pool.copy(np.full(SHAPE, 2, dtype=np.uint8))
+    assert (first == 1).all() and (second == 2).all()
+    assert pool.buffers == 2
+
+
+def test_buffers_are_kept_per_shape_and_dtype():
+    pool = FramePool(max_buffers=4)
+    pool.acquire(SHAPE)  # dropped straight away
+    pool.acquire((2, 2), np.float32)
+    assert pool.reuses == 0
+    assert pool.buffers == 2
+
+
+def test_past_max_buffers_frames_are_plain_allocations():
+    pool = FramePool(max_buffers=2)
+    frames = [pool.acquire(SHAPE) for _ in range(3)]
+    assert pool.buffers == 2
+    assert pool.in_use == 2
+    del frames
+    gc.collect()
+    assert pool.in_use == 0
+
+
+def test_unpooled_allocates_every_time():
+    pool = FramePool(pooled=False)
+    for _ in range(3):
+        pool.acquire(SHAPE)
+    assert (pool.allocations, pool.reuses, pool.buffers) == (3, 0, 0)
@@ -0,0 +1,65 @@
+import numpy as np
+
+from frame_ring import FrameRing
+
+SHAPE = (4, 6, 3)
+
+
+def filled(value):
+    return np.full(SHAPE, value, dtype=np.uint8)
+
+
+def test_reader_sees_the_newest_frame_once():
+    ring = FrameRing(SHAPE, slots=3, create=True)
+    reader = FrameRing.attach(ring.name, SHAPE, 3)
+    try:
+        assert reader.latest() is None
+        ring.write(filled(1), captured_at=10.0)
+        seq = ring.write(filled(2), captured_at=11.0)
+
+        latest_seq, view, captured_at = reader.latest()
+        assert (latest_seq, captured_at) == (seq, 11.0)
+        assert (view == 2).all()
+        assert reader.latest(latest_seq) is None
+    finally:
+        reader.close()
+        ring.close()
+
+
+def test_overwritten_frame_is_no_longer_current():
+    ring = FrameRing(SHAPE, slots=2, create=True)
+    try:
+        first = ring.write(filled(1), captured_at=0.0)
+        assert ring.is_current(first)
+        ring.write(filled(2), captured_at=1.0)
+        ring.write(filled(3), captured_at=2.0)  # lands in the first frame's slot
+        assert not ring.is_current(first)
+        assert ring.frame(first) is None
+    finally:
+        ring.close()
+
+
+def test_slot_being_written_is_not_current():
+    ring = FrameRing(SHAPE, slots=2, create=True)
+    try:
+        first = ring.write(filled(1), captured_at=0.0)
+        ring.write(filled(2), captured_at=1.0)
+        seq, view = ring.begin_write()
+        assert not ring.is_current(first)
+        view[:] = 3
+        ring.commit(seq, captured_at=2.0)
+        assert ring.is_current(seq)
+        assert (ring.frame(seq) == 3).all()
+    finally:
+        ring.close()
+
+
+def test_writer_reattaching_continues_the_sequence():
+    ring = FrameRing(SHAPE, slots=2, create=True)
+    try:
+        seq = ring.write(filled(1), captured_at=0.0)
+        writer = FrameRing.attach(ring.name, SHAPE, 2)
+        assert writer.write(filled(2), captured_at=1.0) == seq + 1
+        writer.close()
+    finally:
+        ring.close()
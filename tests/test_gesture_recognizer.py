@@ -0,0 +1,72 @@
+import numpy as np
+
+from gesture_recognizer import ARM_OUT, BOTH_HANDS_UP, GestureRecognizer, classify_pose
+from pose_processing import (LEFT_ELBOW, LEFT_SHOULDER, LEFT_WRIST, NOSE, RIGHT_ELBOW, RIGHT_SHOULDER,
+                             RIGHT_WRIST)
+
+
+def pose(points):
+    """Keypoints with the given (x, y) points confident and every other one hidden."""
+    keypoints = np.zeros((17, 3))
+    for index, (x, y) in points.items():
+        keypoints[index] = (x, y, 0.9)
+    return keypoints
+
+
+STANDING = {NOSE: (300, 100), LEFT_SHOULDER: (340, 200), RIGHT_SHOULDER: (260, 200),
+            LEFT_ELBOW: (350, 280), RIGHT_ELBOW: (250, 280), LEFT_WRIST: (350, 350), RIGHT_WRIST: (250, 350)}
+HANDS_UP = {**STANDING, LEFT_ELBOW: (350, 130), RIGHT_ELBOW: (250, 130), LEFT_WRIST: (350, 60), RIGHT_WRIST: (250, 60)}
+ARM_OUT_LEFT = {**STANDING, LEFT_ELBOW: (400, 205), LEFT_WRIST: (460, 200)}
+
+
+def test_classify_pose():
+    assert classify_pose(pose(STANDING)) is None
+    assert classify_pose(pose(HANDS_UP)) == BOTH_HANDS_UP
+    assert classify_pose(pose(ARM_OUT_LEFT)) == ARM_OUT
+
+
+def test_hands_up_without_nose_uses_shoulder_width():
+    hands_up = dict(HANDS_UP)
+    del hands_up[NOSE]
+    assert classify_pose(pose(hands_up)) == BOTH_HANDS_UP
+
+
+def test_no_gesture_without_both_shoulders():
+    hands_up = dict(HANDS_UP)
+    del hands_up[RIGHT_SHOULDER]
+    assert classify_pose(pose(hands_up)) is None
+
+
+def test_gesture_fires_once_after_hold():
+    recognizer = GestureRecognizer(hold_seconds=0.6, min_frames=4, cooldown=0)
+    fired = [recognizer.update(pose(HANDS_UP), now=step * 0.1) for step in range(12)]
+    assert fired.count(BOTH_HANDS_UP) == 1
+    assert fired.index(BOTH_HANDS_UP) == 6
+    assert recognizer.recognized[BOTH_HANDS_UP] == 1
+
+
+def test_gesture_needs_release_and_cooldown_to_fire_again():
+    recognizer = GestureRecognizer(hold_seconds=0.2, min_frames=2, cooldown=3.0)
+    now = 0.0
+
+    def hold(points, seconds):
+        nonlocal now
+        fired = []
+        for _ in range(int(seconds / 0.1)):
+            fired.append(recognizer.update(pose(points), now))
+            now += 0.1
+        return [gesture for gesture in fired if gesture]
+
+    assert hold(ARM_OUT_LEFT, 0.5) == [ARM_OUT]
+    assert hold(STANDING, 0.2) == []
+    assert hold(ARM_OUT_LEFT, 0.5) == []  # within the cooldown
+    assert hold(STANDING, 3.0) == []
+    assert hold(ARM_OUT_LEFT, 0.5) == [ARM_OUT]
+
+
+def test_losing_the_target_restarts_the_hold():
+    recognizer = GestureRecognizer(hold_seconds=0.3, min_frames=1, cooldown=0)
+    assert recognizer.update(pose(HANDS_UP), now=0.0) is None
+    assert recognizer.update(None, now=0.2) is None
+    assert recognizer.update(pose(HANDS_UP), now=0.4) is None
+    assert recognizer.update(pose(HANDS_UP), now=0.8) == BOTH_HANDS_UP
@@ -0,0 +1,63 @@
+from inference_governor import DEFAULT_LEVELS, InferenceGovernor
+
+
+def feed(governor, latency_ms, samples):
+    for _ in range(samples):
+        governor.record(latency_ms)
+
+
+def test_degrades_after_consecutive_late_frames():
+    governor = InferenceGovernor(100, degrade_samples=5, cooldown_samples=0)
+    feed(governor, 200, 4)
+    assert governor.settings()["level"] == 0
+    feed(governor, 200, 1)
+    assert governor.settings()["level"] == 1
+    assert governor.imgsz == DEFAULT_LEVELS[1][0]
+
+
+def test_one_slow_frame_does_not_change_level():
+    governor = InferenceGovernor(100, smoothing=0.2)
+    feed(governor, 50, 10)
+    feed(governor, 400, 1)
+    feed(governor, 50, 10)
+    assert governor.changes == 0
+
+
+def test_upgrades_back_with_headroom_after_cooldown():
+    governor = InferenceGovernor(100, degrade_samples=1, upgrade_samples=3, cooldown_samples=5, smoothing=1.0)
+    feed(governor, 200, 1)
+    assert governor.settings()["level"] == 1
+    feed(governor, 10, 5)  # cooldown
+    assert governor.settings()["level"] == 1
+    feed(governor, 10, 3)
+    assert governor.settings()["level"] == 0
+
+
+def test_stops_at_the_ends_of_the_ladder():
+    governor = InferenceGovernor(100, degrade_samples=1, cooldown_samples=0, smoothing=1.0)
+    feed(governor, 1000, 50)
+    assert governor.settings()["level"] == len(DEFAULT_LEVELS) - 1
+    assert (governor.imgsz, governor.stride, governor.max_det) == DEFAULT_LEVELS[-1]
+
+
+def test_never_steps_above_max_imgsz():
+    governor = InferenceGovernor(100, max_imgsz=416, degrade_samples=1, upgrade_samples=1, cooldown_samples=0,
+                                 smoothing=1.0)
+    assert governor.imgsz == 416
+    seen = set()
+    for latency in [1000] * 10 + [10] * 10:
+        governor.record(latency)
+        seen.add(governor.imgsz)
+    assert max(seen) == 416
+    # levels that only differed in imgsz above the cap collapse into one
+    assert (governor.imgsz, governor.max_det) == (416, 10)
+    governor.record(1000)
+    assert (governor.imgsz, governor.max_det) == (416, 5)
+
+
+def test_fixed_shape_keeps_imgsz_and_only_strides():
+    governor = InferenceGovernor(100, allow_resize=False, degrade_samples=1, cooldown_samples=0, smoothing=1.0)
+    feed(governor, 1000, 50)
+    assert governor.imgsz == DEFAULT_LEVELS[0][0]
+    assert governor.stride == 3
+    assert [governor.should_infer() for _ in range(6)] == [False, False, True, False, False, True]
@@ -0,0 +1,68 @@
+import numpy as np
+
+from keyframe_trigger import KeyframeTrigger
+from pose_processing import PoseFrame
+
+FRAME = np.zeros((4, 4, 3), dtype=np.uint8)
+
+
+def people(*track_ids):
+    count = len(track_ids)
+    ids = np.array(track_ids) if track_ids and track_ids[0] is not None else None
+    return PoseFrame(np.zeros((count, 4)), np.zeros((count, 17, 3)), ids)
+
+
+def test_new_track_is_a_keyframe_once():
+    trigger = KeyframeTrigger()
+    assert trigger.update(FRAME, people(1), now=0.0) == ["new_track"]
+    assert trigger.update(FRAME, people(1), now=0.1) == []
+    assert trigger.update(FRAME, people(1, 2), now=2.0) == ["new_track"]
+
+
+def test_track_leaves_after_time_and_passes():
+    trigger = KeyframeTrigger(leave_after=3.0, leave_passes=3)
+    trigger.update(FRAME, people(1), now=0.0)
+    # long enough, but not enough results since: a slow full-frame pass in follow mode
+    assert trigger.update(FRAME, people(), now=5.0) == []
+    trigger.update(FRAME, people(), now=5.1)
+    assert trigger.update(FRAME, people(), now=5.2) == ["track_left"]
+    assert trigger.events["track_left"] == 1
+
+
+def test_count_change_without_track_ids_needs_min_frames():
+    trigger = KeyframeTrigger(min_frames=3)
+    untracked = people(None, None)
+    assert trigger.update(FRAME, untracked, now=0.0) == []
+    assert trigger.update(FRAME, untracked, now=0.1) == []
+    assert trigger.update(FRAME, untracked, now=0.2) == ["count_changed"]
+    assert trigger.update(FRAME, untracked, now=0.3) == []
+
+
+def test_close_keyframes_coalesce_and_wait_returns_them():
+    trigger = KeyframeTrigger(min_interval=1.0)
+    trigger.update(FRAME, people(1), now=0.0)
+    trigger.update(FRAME, people(1, 2), now=0.5)
+    trigger.update(FRAME, people(1, 2, 3), now=2.0)
+    assert trigger.coalesced == 1
+
+    batch = trigger.wait(timeout=0, max_count=5)
+    assert [reasons for _, reasons, _ in batch] == [["new_track"], ["new_track"]]
+    assert trigger.wait(timeout=0) == []
+    assert trigger.keyframes == 2
+
+
+def test_oldest_pending_keyframe_is_dropped():
+    trigger = KeyframeTrigger(min_interval=0.0, max_pending=2)
+    for track_id in range(3):
+        trigger.update(FRAME, people(track_id), now=float(track_id))
+    assert trigger.dropped == 1
+    assert len(trigger.wait(timeout=0, max_count=5)) == 2
+
+
+def test_keyframe_is_a_copy():
+    trigger = KeyframeTrigger()
+    frame = FRAME.copy()
+    trigger.update(frame, people(1), now=0.0)
+    frame[:] = 255
+    (keyframe, _, _), = trigger.wait(timeout=0)
+    assert not keyframe.any()
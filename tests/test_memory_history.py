@@ -0,0 +1,108 @@
+import os
+
+import pytest
+
+import memory_history
+from memory_history import INDEX_DTYPE, MemoryHistory, parse_time_window
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(memory_history, "time", lambda: now[0])
+    return now
+
+
+def add(entry_id, text):
+    return [{"op": "add", "id": entry_id, "text": text}]
+
+
+def test_window_starts_from_the_last_snapshot(tmp_path, clock):
+    history = MemoryHistory(str(tmp_path), snapshot_every=2, durable=False)
+    history.record("e1 red car", add("e1", "red car"))
+    clock[0] = 1010.0
+    history.record("e1 red car\ne2 dog", add("e2", "dog"))  # second edit record, so a snapshot follows
+    clock[0] = 1020.0
+    history.record("...", add("e3", "bench"))
+    clock[0] = 1030.0
+    history.record("...", add("e4", "tree"))
+
+    base, earlier, records = history.window(1025.0, 1035.0)
+    assert base["kind"] == "snapshot" and base["memory"] == "e1 red car\ne2 dog"
+    assert [record["edits"][0]["id"] for record in earlier] == ["e3"]
+    # e4 is the second edit record since the snapshot, so another snapshot follows it
+    assert [record["kind"] for record in records] == ["edits", "snapshot"]
+    assert records[0]["edits"][0]["id"] == "e4"
+    history.close()
+
+
+def test_empty_window_says_so(tmp_path, clock):
+    history = MemoryHistory(str(tmp_path), durable=False)
+    assert history.window(0, 10) == (None, [], [])
+    assert history.window_text(0, 10).startswith("Nothing was remembered")
+    history.close()
+
+
+def test_restart_does_not_replay_edits_across_sessions(tmp_path, clock):
+    history = MemoryHistory(str(tmp_path), durable=False)
+    history.record("e1 red car", add("e1", "red car"))
+    history.close()
+
+    clock[0] = 2000.0
+    history = MemoryHistory(str(tmp_path), durable=False)
+    assert history.records == 2  # session + edits from the first run
+    history.record("e1 blue van", add("e1", "blue van"))
+    clock[0] = 2010.0
+    history.record("...", add("e2", "cat"))
+
+    base, earlier, records = history.window(2005.0, 2020.0)
+    assert base["kind"] == "session"
+    assert [record["edits"][0]["text"] for record in earlier] == ["blue van"]
+    assert "red car" not in history.window_text(2005.0, 2020.0)
+    # a window across the restart shows where the entry IDs were reused
+    lines = history.window_text(1500.0, 2020.0).splitlines()
+    assert [line.split(" ", 1)[1] for line in lines] == [
+        "memory started over, empty; entry IDs from here on are new",
+        "saw e1: red car",
+        "memory started over, empty; entry IDs from here on are new",
+        "saw e1: blue van",
+        "saw e2: cat",
+    ]
+    history.close()
+
+
+def test_torn_record_at_the_end_is_cut_off(tmp_path, clock):
+    history = MemoryHistory(str(tmp_path), durable=False)
+    history.record("e1 red car", add("e1", "red car"))
+    history.close()
+    with open(tmp_path / "memory.log", "ab") as log:
+        log.write(b"\x40\x00\x00\x00\x01\x02")
+
+    history = MemoryHistory(str(tmp_path), durable=False)
+    assert history.truncated_bytes == 6
+    assert history.records == 2
+    history.record("...", add("e2", "dog"))
+    assert [record["kind"] for record in history.window(0, 5000)[2]] == ["session", "edits", "session", "edits"]
+    history.close()
+
+
+def test_lost_index_entries_are_rebuilt_from_the_log(tmp_path, clock):
+    history = MemoryHistory(str(tmp_path), durable=False)
+    history.record("e1 red car", add("e1", "red car"))
+    history.record("...", add("e2", "dog"))
+    history.close()
+    index_path = tmp_path / "memory.idx"
+    # keep one entry and half of the next, as if the process died mid-write
+    os.truncate(index_path, INDEX_DTYPE.itemsize + INDEX_DTYPE.itemsize // 2)
+
+    history = MemoryHistory(str(tmp_path), durable=False)
+    assert history.recovered == 2
+    assert history.records == 3
+    assert os.path.getsize(index_path) == 3 * INDEX_DTYPE.itemsize
+    history.close()
+
+
+def test_parse_time_window():
+    assert parse_time_window("what did you see ten minutes ago", now=10000) == (9250, 9550)
+    assert parse_time_window("anything in the last hour?", now=10000) == (6400, 10000)
+    assert parse_time_window("what do you see", now=10000) is None
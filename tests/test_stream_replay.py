@@ -0,0 +1,43 @@
+import json
+import threading
+
+from djitellopy import Tello
+
+from stream_replay import FRAMES_FILE, STATE_FILE, ReplayTello
+from tello_io import TelloIO
+
+
+def write_clip(directory):
+    (directory / FRAMES_FILE).write_text(json.dumps({"index": 0, "t": 0.0}) + "\n")
+    (directory / STATE_FILE).write_text(json.dumps({"t": 0.0, "state": {"bat": 87, "h": 0}}) + "\n")
+
+
+def test_maneuver_goes_through_replay_tello(tmp_path):
+    write_clip(tmp_path)
+    tello = ReplayTello(str(tmp_path))
+    tello_io = TelloIO(tello, keep_alive_interval=60)
+    tello_io.start()
+    done = threading.Event()
+    outcome = {}
+
+    def on_done(response, error):
+        outcome.update(response=response, error=error)
+        done.set()
+
+    # the way command_thread calls a spoken maneuver
+    params = {"self": tello_io.tello, "x": 50}
+    tello_io.submit("move_forward", lambda: Tello.move_forward(**params), on_done)
+    try:
+        assert done.wait(timeout=5)
+    finally:
+        tello_io.stop()
+
+    assert outcome["error"] is None
+    assert [command for _, command in tello.command_trace] == ["forward 50"]
+
+
+def test_state_getters_answer_from_the_clip(tmp_path):
+    write_clip(tmp_path)
+    tello = ReplayTello(str(tmp_path))
+    assert tello.get_battery() == 87
+    assert Tello.get_height(tello) == 0
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from pose_processing import LEFT_SHOULDER, NOSE, RIGHT_SHOULDER
+from target_filter import ConstantVelocityFilter, TargetPredictor
+
+
+def keypoints_at_x(x, y=100.0):
+    keypoints = np.zeros((17, 2))
+    keypoints[:, 0] = x
+    keypoints[:, 1] = y
+    keypoints[LEFT_SHOULDER, 0] = x - 20
+    keypoints[RIGHT_SHOULDER, 0] = x + 20
+    return keypoints
+
+
+def test_filter_learns_a_constant_velocity():
+    kalman = ConstantVelocityFilter(1)
+    for step in range(30):
+        t = step * 0.1
+        kalman.predict(t)
+        kalman.update(np.array([100.0 * t]), np.array([True]))
+    assert kalman.x[0, 1] == pytest.approx(100.0, rel=0.05)
+    assert kalman.position_at(3.4)[0] == pytest.approx(340.0, rel=0.02)
+
+
+def test_hidden_channel_keeps_its_prediction():
+    kalman = ConstantVelocityFilter(2)
+    kalman.predict(0.0)
+    kalman.update(np.array([10.0, 50.0]), np.array([True, True]))
+    before = kalman.x[1].copy()
+    kalman.predict(0.1)
+    kalman.update(np.array([12.0, 999.0]), np.array([True, False]))
+    assert kalman.x[1] == pytest.approx(before)
+
+
+def test_predictor_extrapolates_the_target():
+    predictor = TargetPredictor(max_prediction=0.5)
+    assert predictor.keypoints_at(0.0) is None
+    confident = np.ones(17, dtype=bool)
+    for step in range(20):
+        t = step * 0.05
+        predictor.add(keypoints_at_x(200.0 + 200.0 * t), confident, t)
+
+    predicted = predictor.keypoints_at(predictor.measured_at + 0.2)
+    assert predicted[NOSE, 0] == pytest.approx(200.0 + 200.0 * 1.15, abs=5)
+    # unfiltered keypoints stay where they were last seen
+    assert predicted[10, 0] == pytest.approx(200.0 + 200.0 * 0.95)
+
+
+def test_prediction_is_capped_at_max_prediction():
+    predictor = TargetPredictor(max_prediction=0.1)
+    confident = np.ones(17, dtype=bool)
+    for step in range(20):
+        predictor.add(keypoints_at_x(100.0 * step * 0.05), confident, step * 0.05)
+    capped = predictor.keypoints_at(predictor.measured_at + 0.1)
+    assert predictor.keypoints_at(predictor.measured_at + 5.0)[NOSE, 0] == pytest.approx(capped[NOSE, 0])
+
+
+def test_out_of_order_detection_is_ignored():
+    predictor = TargetPredictor()
+    confident = np.ones(17, dtype=bool)
+    predictor.add(keypoints_at_x(100.0), confident, 1.0)
+    predictor.add(keypoints_at_x(500.0), confident, 0.5)
+    assert predictor.measured_at == 1.0
+    assert predictor.keypoints_at(1.0)[NOSE, 0] == pytest.approx(100.0)
@@ -0,0 +1,117 @@
+import threading
+from collections import deque
+from time import monotonic, sleep
+
+
+class LatestSlot:
+    """
+    Single-slot handoff between two pipeline stages.
+    A newer value always replaces an unread older one, so a slow consumer
+    only ever sees the freshest frame and never builds up a backlog.
+    """
+    def __init__(self, name):
+        self.name = name
+        self.__condition = threading.Condition()
+        self.__seq = 0
+        self.__item = None
+        self.__closed = False
+
+        self.put_count = 0
+        self.taken_count = 0
+        self.dropped_count = 0
+
+    def put(self, seq, item):
+        with self.__condition:
+            self.__seq = seq
+            self.__item = item
+            self.put_count += 1
+            self.__condition.notify_all()
+
+    def get(self, last_seq, timeout=None):
+        """
+        Waits for an item newer than last_seq.
+        Returns (seq, item), or (last_seq, None) on timeout or when the slot is closed.
+        """
+        with self.__condition:
+            if not self.__condition.wait_for(lambda: self.__seq > last_seq or self.__closed, timeout):
+                return last_seq, None
+            if self.__seq <= last_seq:
+                return last_seq, None
+
+            # every sequence number between the last one taken and this one was overwritten unseen
+            if last_seq > 0:
+                self.dropped_count += self.__seq - last_seq - 1
+            self.taken_count += 1
+            return self.__seq, self.__item
+
+    def peek(self):
+        with self.__condition:
+            return self.__seq, self.__item
+
+    def close(self):
+        with self.__condition:
+            self.__closed = True
+            self.__condition.notify_all()
+
+
+class PipelineStats:
+    """Thread-safe named counters shared by the vision pipeline stages."""
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__counters = {}
+        self.__started = monotonic()
+
+    def increment(self, name, amount=1):
+        with self.__lock:
+            self.__counters[name] = self.__counters.get(name, 0) + amount
+
+    def set_many(self, values):
+        """Overwrites counters with totals reported from elsewhere, e.g. the vision process."""
+        with self.__lock:
+            self.__counters.update(values)
+
+    def get(self, name):
+        with self.__lock:
+            return self.__counters.get(name, 0)
+
+    def snapshot(self):
+        with self.__lock:
+            return dict(self.__counters)
+
+    def summary(self, slots=()):
+        elapsed = max(monotonic() - self.__started, 1e-6)
+        counters = self.snapshot()
+        parts = [f"{name}={value} ({value / elapsed:.1f}/s)" for name, value in sorted(counters.items())]
+        for slot in slots:
+            parts.append(f"{slot.name}_dropped={slot.dropped_count}")
+        return " | ".join(parts)
+
+
+class LagProbe:
+    """
+    Measures how late a sleeping Python thread wakes up. Growing lag means the
+    interpreter is starved (GIL contention from inference, busy threads), which
+    is exactly what the speech and command threads feel.
+    """
+    def __init__(self, interval=0.01, window=1000):
+        self.interval = interval
+        self.__lock = threading.Lock()
+        self.__lags = deque(maxlen=window)
+
+    def run(self, stop_event):
+        while not stop_event.is_set():
+            started = monotonic()
+            sleep(self.interval)
+            lag = monotonic() - started - self.interval
+            with self.__lock:
+                self.__lags.append(lag * 1000)
+
+    def summary(self):
+        with self.__lock:
+            lags = sorted(self.__lags)
+            self.__lags.clear()
+        if not lags:
+            return "no samples"
+        p50 = lags[len(lags) // 2]
+        p99 = lags[min(len(lags) - 1, int(len(lags) * 0.99))]
+        return f"p50={p50:.1f}ms p99={p99:.1f}ms max={lags[-1]:.1f}ms"
@@ -0,0 +1,159 @@
+import multiprocessing
+import threading
+from time import monotonic, sleep
+
+import cv2
+import numpy as np
+
+from frame_ring import FrameRing
+from inference_backends import load_backend
+from inference_governor import InferenceGovernor
+from pose_processing import extract_poses, select_largest
+from target_lock import TargetLock
+
+POLL_INTERVAL = 0.002
+COUNTER_INTERVAL = 1.0
+
+
+class VisionProcess:
+    """
+    Hosts video decoding and YOLO inference in a separate process so they do
+    not compete with the speech, HTTP and control threads for the GIL.
+
+    Decoded frames go into a shared-memory FrameRing that both processes map.
+    The parent reads them as NumPy views without a pickling copy. Pose results
+    come back over a one-way pipe, and follow mode is mirrored into the child
+    through an Event.
+    """
+    def __init__(self, video_address, frame_shape, settings, slots=8):
+        context = multiprocessing.get_context("spawn")
+        self.ring = FrameRing(frame_shape, slots, create=True)
+        self.follow_event = context.Event()
+        self.__stop_event = context.Event()
+        self.__results_recv, results_send = context.Pipe(duplex=False)
+        self.__process = context.Process(
+            target=run_vision_process,
+            args=(video_address, self.ring.name, frame_shape, slots, results_send,
+                  self.follow_event, self.__stop_event, settings),
+            daemon=True,
+        )
+
+    def start(self):
+        self.__process.start()
+        print(f"Vision process started (pid {self.__process.pid})")
+
+    @property
+    def alive(self):
+        return self.__process.is_alive()
+
+    @property
+    def exitcode(self):
+        return self.__process.exitcode
+
+    def stop(self):
+        self.__stop_event.set()
+        self.__process.join(timeout=5)
+        if self.__process.is_alive():
+            self.__process.terminate()
+        self.ring.close()
+
+    def receive(self, timeout):
+        """
+        Returns the newest result message, discarding any older ones still queued,
+        as (message, skipped), or (None, 0) on timeout.
+        """
+        if not self.__results_recv.poll(timeout):
+            return None, 0
+        message = self.__results_recv.recv()
+        skipped = 0
+        while self.__results_recv.poll(0):
+            message = self.__results_recv.recv()
+            skipped += 1
+        return message, skipped
+
+
+def run_vision_process(video_address, ring_name, frame_shape, slots, results_send, follow_event, stop_event, settings):
+    ring = FrameRing.attach(ring_name, frame_shape, slots)
+    counters = {"captured": 0, "decode_errors": 0, "inferred": 0, "inference_errors": 0, "torn": 0, "stride_skipped": 0}
+
+    decoder = threading.Thread(target=_decode_loop, args=(video_address, ring, stop_event, counters), daemon=True)
+    decoder.start()
+
+    model = load_backend(settings["backend"], settings["weights"], settings["imgsz"], int8=settings["int8"],
+                         calibration_dir=settings["calibration_dir"], dynamic=settings["dynamic"])
+    governor = InferenceGovernor(settings["latency_budget_ms"], allow_resize=model.dynamic,
+                                 max_imgsz=settings["imgsz"])
+    target_lock = TargetLock(**settings["target_lock"])
+
+    seq = 0
+    last_counters_sent = 0
+    try:
+        while not stop_event.is_set():
+            latest = ring.latest(seq)
+            if latest is None:
+                sleep(POLL_INTERVAL)
+                continue
+            seq, frame, captured_at = latest
+            if not governor.should_infer():
+                counters["stride_skipped"] += 1
+                continue
+
+            inference_start = monotonic()
+            try:
+                if follow_event.is_set() and settings["target_lock_enabled"]:
+                    pose_frame, target_index = target_lock.infer(model, frame, imgsz=governor.imgsz, max_det=governor.max_det)
+                else:
+                    target_lock.reset()
+                    results = model.track(frame, imgsz=governor.imgsz, max_det=governor.max_det, persist=True, verbose=False)
+                    pose_frame = extract_poses(results)
+                    target_index = select_largest(pose_frame) if pose_frame is not None else None
+            except Exception as e:
+                # one bad frame must not end inference for the rest of the flight
+                counters["inference_errors"] += 1
+                print(f"Skipping a bad frame in the vision process: {e}")
+                continue
+
+            # the decoder may have lapped the ring while we were inferring on this view
+            if not ring.is_current(seq):
+                counters["torn"] += 1
+                continue
+            inferred = monotonic()
+            governor.record((inferred - captured_at) * 1000)
+            counters["inferred"] += 1
+
+            message = {
+                "seq": seq,
+                "captured_at": captured_at,
+                "stamps": {"inference_start": inference_start, "inferred": inferred},
+                "pose_frame": pose_frame,
+                "target_index": target_index,
+            }
+            if monotonic() - last_counters_sent > COUNTER_INTERVAL:
+                message["counters"] = dict(counters)
+                message["settings"] = governor.settings()
+                last_counters_sent = monotonic()
+            results_send.send(message)
+    except (KeyboardInterrupt, BrokenPipeError, EOFError):
+        pass
+    finally:
+        stop_event.set()
+        decoder.join(timeout=2)
+        ring.close()
+
+
+def _decode_loop(video_address, ring, stop_event, counters):
+    capture = cv2.VideoCapture(video_address, cv2.CAP_FFMPEG)
+    capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    while not stop_event.is_set():
+        seq, view = ring.begin_write()
+        # decode straight into shared memory; OpenCV only reallocates if the stream size differs from the ring
+        ok, frame = capture.read(view)
+        if not ok:
+            counters["decode_errors"] += 1
+            sleep(POLL_INTERVAL)
+            continue
+        if not np.shares_memory(frame, view):
+            view[:] = frame if frame.shape == view.shape else cv2.resize(frame, (view.shape[1], view.shape[0]))
+        ring.commit(seq, monotonic())
+        counters["captured"] += 1
+    capture.release()
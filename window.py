@@ -1,16 +1,16 @@
 import prompting as prompting
 import image_parsing as image_parsing
+from memory_document import MemoryDocument, parse_json_reply
 from dotenv import load_dotenv
-from time import sleep
+from time import sleep, monotonic
+import math
 import os
+import numpy as np
 
 load_dotenv()
 api_key = os.getenv('MSI_GEN_AI_API_KEY')
 
-class CWMManager:
-    def __init__(self):
-        # first prompt required for session ID generation
-        self.initial_prompt = """
+MEMORY_INSTRUCTIONS = """
 You are the memory manager for a drone named Helios. You will be periodically sent frames from the drones' live video feed.
 Your job is to describe the image frames as best as possible to create a text story that can be referred to later to remember what the drone has seen.
 Do your best to describe every object in frame, remembering every detail about them including color and location relative to the drone.
@@ -22,25 +22,153 @@ Make your responses as efficient as possible. Do not describe things that are no
 Keep your descriptions as short as possible while still describing anything that may be important to recall later.
 You do not need to use complete sentences.
 
+DO NOT describe features of the image itself such as glare. Only describe it as what the drone sees and do your best to interpret what is actually occurring, not if the image is blurry.
+"""
+
+# the model returns the whole memory string every time
+FULL_MEMORY_FORMAT = """
 Your main priority is maintaining a text string that encapsulates everything the drone has seen. 
 When you are first sent a frame, build an initial memory string. As you are sent more frames, only modify the original story, do not rewrite eveything.
 If there is nothing new in the frame, simply return the last memory string without modifying it.
-
-DO NOT describe features of the image itself such as glare. Only describe it as what the drone sees and do your best to interpret what is actually occurring, not if the image is blurry.
 If the image is too blurry to tell anything, simply return the last memory string without modifying it.
 
 Never return anything other than the memory string. Do not put quotes around it.
 
 If something was in view, but no longer is, update the memory to be in past tense. However, if something comes back in view refer to it in present tense.
 """
+
+# the model returns edits against numbered entries, applied here to a MemoryDocument
+EDIT_FORMAT = """
+The memory is kept as a list of numbered entries, one per person, car or object, e.g. "e3: red Toyota Camry, plate 7ABC123, parked left of the drone".
+Never return the memory itself. Return only a JSON array of edits to it:
+{"op": "add", "text": "..."} for something that is not in memory yet
+{"op": "update", "id": "e3", "text": "..."} to add detail to or correct an entry, giving its whole new text
+{"op": "past", "id": "e3"} when something in memory is no longer in view
+{"op": "present", "id": "e3"} when it comes back into view
+After each update you are told which IDs your additions were given.
+If there is nothing new in the frame, or the image is too blurry to tell anything, return [].
+"""
+
+RECONCILE_REQUEST = ("This time, instead of edits, return the complete memory as a JSON array with one "
+                     "{\"id\": \"e3\", \"text\": \"...\", \"tense\": \"present\" or \"past\"} object per entry, keeping the IDs.")
+
+class CWMManager:
+    def __init__(self, image_format="jpeg", image_quality=80, max_width=640, max_batch=4, frame_interval=1.0,
+                 incremental=True, reconcile_every=20):
+        # frames handed over as arrays are encoded in memory with these settings
+        self.image_format = image_format
+        self.image_quality = image_quality
+        self.max_width = max_width
+        self.last_upload_bytes = 0
+        self.last_encode_ms = 0.0
+
+        # frames arrive at most every frame_interval seconds, so one update cycle's worth of them is sent together
+        self.max_batch = max_batch
+        self.frame_interval = frame_interval
+        self.batch_size = 1
+        self.gateway_ms = None
+
+        # incremental: the model sends edits, so its replies stay short however much it has seen,
+        # and every reconcile_every updates it sends the whole memory to correct any drift
+        self.incremental = incremental
+        self.reconcile_every = reconcile_every
+        self.document = MemoryDocument()
+        self.__added = []
+        self.updates = 0
+        self.reconciliations = 0
+        self.last_drift = 0
+        # edits the last update made to the memory, or None when it was replaced as a whole
+        self.last_edits = None
+        self.unusable_replies = 0
+        self.last_reply_chars = 0
+
+        # first prompt required for session ID generation
+        self.initial_prompt = MEMORY_INSTRUCTIONS + (EDIT_FORMAT if incremental else FULL_MEMORY_FORMAT)
         self.__sessionId, _ = prompting.send_chat(api_key, self.initial_prompt)
 
-    def get_updated_cwm(self, image_path):
-        #uploads file to Claude
-        image_parsing.send_file(api_key, image_path, self.__sessionId)
+    def encode(self, frame, max_width=None):
+        """Encodes a BGR frame for upload. Returns (bytes, filename) to pass to get_updated_cwm."""
+        started = monotonic()
+        encoded = image_parsing.encode_frame(frame, self.image_format, self.image_quality, max_width or self.max_width)
+        self.last_encode_ms = (monotonic() - started) * 1000
+        return encoded
+
+    def encode_batch(self, frames, times):
+        """Encodes several frames, oldest first, as one grid image captioned with their times (datetimes)."""
+        if len(frames) == 1:
+            return self.encode(frames[0])
+        grid = image_parsing.tile_frames(frames, [time.strftime("%H:%M:%S") for time in times], self.max_width)
+        return self.encode(grid, max_width=grid.shape[1])
+
+    def get_updated_cwm(self, image, times=None):
+        """
+        image is a file path, a BGR frame, or (bytes, filename) from encode() or encode_batch().
+        times are the datetimes of the frames in a batch, so the model knows what it is looking at.
+        """
+        started = monotonic()
+        if isinstance(image, np.ndarray):
+            image = self.encode(image)
+        if isinstance(image, tuple):
+            data, filename = image
+            self.last_upload_bytes = len(data)
+            #uploads the encoded image without touching the disk
+            image_parsing.send_file(api_key, data, self.__sessionId, filename)
+        else:
+            self.last_upload_bytes = os.path.getsize(image)
+            #uploads file to Claude
+            image_parsing.send_file(api_key, image, self.__sessionId)
         # promts Claude about the image with sessionID as referance to previously uploaded image; if no ID it will not know the image to analyze
-        _, response = prompting.send_chat_withID(api_key, f"Provide an updated memory description", self.__sessionId)
-        return response
+        prompt = "Provide the memory edits for this image" if self.incremental else "Provide an updated memory description"
+        if times is not None and len(times) > 1:
+            prompt = (f"This image is a grid of {len(times)} frames in the order they were seen, left to right and top "
+                      f"to bottom, captioned with the times {', '.join(time.strftime('%H:%M:%S') for time in times)}. "
+                      f"{prompt}")
+        if not self.incremental:
+            _, response = prompting.send_chat_withID(api_key, prompt, self.__sessionId)
+            self.__adapt_batch_size((monotonic() - started) * 1000)
+            self.last_reply_chars = len(response)
+            self.last_edits = None
+            return response
+
+        self.updates += 1
+        reconcile = self.reconcile_every and self.updates % self.reconcile_every == 0
+        if reconcile:
+            prompt = f"{prompt}. {RECONCILE_REQUEST}"
+        elif self.__added:
+            prompt = f"Your last additions were stored as {self.document.describe(self.__added)}. {prompt}"
+        _, response = prompting.send_chat_withID(api_key, prompt, self.__sessionId)
+        self.__adapt_batch_size((monotonic() - started) * 1000)
+        self.last_reply_chars = len(response)
+
+        reply = parse_json_reply(response)
+        if isinstance(reply, dict):
+            reply = reply.get("edits", reply.get("entries"))
+        self.__added = []
+        self.last_edits = []
+        if not isinstance(reply, list):
+            self.unusable_replies += 1
+            print(f"CWM: could not read the memory {'entries' if reconcile else 'edits'} from: {response}")
+        elif reconcile:
+            self.last_drift = self.document.replace(reply)
+            self.reconciliations += 1
+            self.last_edits = None
+        else:
+            self.__added = self.document.apply(reply)
+            self.last_edits = self.document.last_applied
+        return self.document.render()
+
+    def summary(self):
+        if not self.incremental:
+            return f"last reply {self.last_reply_chars} chars"
+        return (f"{len(self.document.entries)} entries, last reply {self.last_reply_chars} chars, "
+                f"{self.document.rejected} edits rejected, {self.reconciliations} reconciliations "
+                f"(last drift {self.last_drift} entries), {self.unusable_replies} unusable replies")
+
+    def __adapt_batch_size(self, cycle_ms):
+        # about as many frames as arrive while one upload-and-prompt cycle is under way
+        self.gateway_ms = cycle_ms if self.gateway_ms is None else self.gateway_ms + 0.3 * (cycle_ms - self.gateway_ms)
+        frames_per_cycle = math.ceil(self.gateway_ms / 1000 / self.frame_interval)
+        self.batch_size = max(1, min(self.max_batch, frames_per_cycle))
 
 if __name__ == '__main__':
     cwm_manager = CWMManager()